@@ -0,0 +1,69 @@
+"""
+Entry point for the offline pipeline benchmarks.
+
+Provides a CLI menu to generate a synthetic BIDS dataset, time the
+pipeline configs on it, compare the timings across commits and check
+that two versions of a config's outputs agree numerically.
+"""
+
+from os import getenv
+from os.path import isdir
+
+from benchmarks.regression import compare_processed, print_regression_report
+from benchmarks.runner import read_benchmarks, run_benchmark, summarize_benchmarks
+from benchmarks.synthetic import make_synthetic_dataset
+from utils.utils import get_config_ids, get_config_path
+
+
+def main():
+    """Interactive CLI for generating benchmark data and running benchmarks.
+
+    Reads BENCH_ROOT (the synthetic dataset, default:
+    ../benchmark_data/) and CONFIG_ROOT from environment variables,
+    then prompts the user to choose an action.
+    """
+    bench_root = getenv("BENCH_ROOT", "../benchmark_data/")
+    bench_root = bench_root.rstrip("/")
+    config_root = getenv("CONFIG_ROOT", "../config/")
+    config_root = config_root.rstrip("/")
+
+    configs = get_config_ids(config_root)
+    print(f"Configs: {configs}\n")
+
+    print("Which action do you want to perform?")
+    print("1 - Generate synthetic dataset")
+    print("2 - Benchmark specific config")
+    print("3 - Benchmark all configs")
+    print("4 - Compare benchmark results across commits")
+    print("5 - Compare outputs of two pipeline versions (regression check)")
+    i = input(": ")
+    if i.lower() == "1":
+        n_subjects = int(input("Number of subjects: "))
+        duration = int(input("Recording duration per subject (seconds): "))
+        make_synthetic_dataset(bench_root, n_subjects, duration)
+        print(f"\nSynthetic dataset written to {bench_root}")
+    elif i.lower() in ("2", "3"):
+        if not isdir(bench_root):
+            print(f"No dataset in {bench_root}, generate one first (option 1)")
+            return
+        if i.lower() == "2":
+            configs = [int(input("Config ID: "))]
+        repeats = int(input("Runs per config: "))
+        config_paths = {c: get_config_path(config_root, c) for c in configs}
+        run_benchmark(bench_root, config_paths, repeats=repeats)
+        print(summarize_benchmarks(read_benchmarks(bench_root)).round(2).to_string())
+    elif i.lower() == "4":
+        print(summarize_benchmarks(read_benchmarks(bench_root)).round(2).to_string())
+    elif i.lower() == "5":
+        reference = input("Reference config folder (e.g. old/processed/1): ")
+        candidate = input("Candidate config folder (e.g. ../data/processed/1): ")
+        report = compare_processed(reference.rstrip("/"), candidate.rstrip("/"))
+        report.to_csv(f"{candidate.rstrip("/")}/regression_report.csv", index=False)
+        print_regression_report(report)
+        print(f"\nFull report written to {candidate.rstrip("/")}/regression_report.csv")
+    else:
+        print("Invalid input")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Numerical regression checks between two versions of pipeline outputs.
+
+Compares two ``processed/<config>/`` folders, e.g. produced by the
+same config before and after an optimization, subject by subject:
+
+- Presence of the subject's epochs in both folders.
+- Number of epochs per condition.
+- Drop log (reasons for every rejected epoch).
+- Bad channels (from run_stats.parquet; reported as "unknown" and
+  not checked if either folder has none, e.g. older outputs, since
+  the epochs' info lists no bads after interpolation).
+- ICA components excluded.
+- Maximum and RMS differences of the evoked PO7/PO8 waveforms per
+  condition, in µV, against tolerances.
+
+Counts, drop logs and channel lists have to match exactly. Subjects
+are read concurrently in a thread pool, without preloading the
+epochs, so only the compared channels are read.
+
+Typical usage:
+    report = compare_processed("old/processed/1", "new/processed/1")
+    print(report[~report["passed"]].to_string())
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from os import getenv
+from os.path import isfile
+
+from mne import read_epochs
+from mne.preprocessing import read_ica
+import numpy as np
+import pandas as pd
+
+from utils.files import artifact_path
+
+# Allowed differences of the evoked waveforms in µV
+REGRESSION_TOLERANCES = {"evoked_max_uV": 0.05, "evoked_rms_uV": 0.01}
+
+# Channels whose evoked waveforms are compared
+REGRESSION_CHANNELS = ["PO7", "PO8"]
+
+
+def compare_processed(
+    reference_folder: str,
+    candidate_folder: str,
+    subject_ids: list[str] | None = None,
+    tolerances: dict[str, float] | None = None,
+) -> pd.DataFrame:
+    """Compare the outputs of two pipeline versions subject by subject.
+
+    Args:
+        reference_folder (str): Config output directory of the
+            reference version (e.g. "data/processed/1").
+        candidate_folder (str): Config output directory of the
+            version under test.
+        subject_ids (list[str] | None): Zero-padded subject
+            identifiers. Defaults to all subjects with epochs in
+            either folder.
+        tolerances (dict[str, float] | None): Overrides of
+            REGRESSION_TOLERANCES.
+
+    Returns:
+        pd.DataFrame: One row per subject and check with columns
+            subject, check, reference, candidate, difference,
+            tolerance and passed. Checks other than the evoked
+            differences pass only if both values are equal.
+    """
+    tolerances = {**REGRESSION_TOLERANCES, **(tolerances or {})}
+    if subject_ids is None:
+        subject_ids = sorted(
+            {
+                file.split("sub-")[-1].split("_epo")[0]
+                for folder in (reference_folder, candidate_folder)
+                for file in glob(f"{folder}/sub-*_epo.fif")
+            }
+        )
+
+    bad_channels = {
+        folder: _read_bad_channels(folder)
+        for folder in (reference_folder, candidate_folder)
+    }
+    tasks = [
+        (folder, subject_id)
+        for subject_id in subject_ids
+        for folder in (reference_folder, candidate_folder)
+    ]
+    with ThreadPoolExecutor(max_workers=int(getenv("MAX_WORKERS", 2))) as executor:
+        summaries = list(
+            executor.map(
+                lambda task: summarize_outputs(*task, bad_channels[task[0]]), tasks
+            )
+        )
+
+    rows = []
+    for i, subject_id in enumerate(subject_ids):
+        reference, candidate = summaries[2 * i], summaries[2 * i + 1]
+        rows += [
+            {"subject": subject_id, **row}
+            for row in compare_summaries(reference, candidate, tolerances)
+        ]
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "subject",
+            "check",
+            "reference",
+            "candidate",
+            "difference",
+            "tolerance",
+            "passed",
+        ],
+    )
+
+
+def summarize_outputs(
+    output_folder: str, subject_id: str, bad_channels: dict[str, list[str]]
+) -> dict | None:
+    """Read the values compared for one subject of one version.
+
+    Args:
+        output_folder (str): Config output directory.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        bad_channels (dict[str, list[str]]): Bad channels per subject
+            from the folder's run statistics, see _read_bad_channels().
+
+    Returns:
+        dict | None: Epoch counts per condition ("n_epochs"), the drop
+            log, bad channels (None if not in the run statistics),
+            excluded ICA components (None without ICA), the evoked
+            waveforms in µV per (condition, channel) ("evoked") and
+            their times, or None if the subject has no epochs in this
+            folder.
+    """
+    path = artifact_path(output_folder, subject_id, "epo")
+    if not isfile(path):
+        return None
+    epochs = read_epochs(path, preload=False, verbose=False)
+
+    channels = [ch for ch in REGRESSION_CHANNELS if ch in epochs.ch_names]
+    evoked = {}
+    n_epochs = {}
+    for condition in sorted(epochs.event_id):
+        data = epochs[condition].get_data(picks=channels, verbose=False)
+        n_epochs[condition] = len(data)
+        if len(data):
+            mean = data.mean(axis=0) * 1e6
+            evoked.update({(condition, ch): mean[i] for i, ch in enumerate(channels)})
+
+    ica_exclude = None
+    ica_path = artifact_path(output_folder, subject_id, "ica")
+    if isfile(ica_path):
+        ica_exclude = sorted(int(c) for c in read_ica(ica_path, verbose=False).exclude)
+
+    # Not taken from epochs.info["bads"], which is empty after interpolation
+    bads = bad_channels.get(subject_id)
+
+    return {
+        "n_epochs": n_epochs,
+        "drop_log": epochs.drop_log,
+        "bad_channels": None if bads is None else sorted(bads),
+        "ica_exclude": ica_exclude,
+        "evoked": evoked,
+        "times": epochs.times,
+    }
+
+
+def compare_summaries(
+    reference: dict | None, candidate: dict | None, tolerances: dict[str, float]
+) -> list[dict]:
+    """Compare the summaries of one subject from two versions.
+
+    Args:
+        reference (dict | None): Summary of the reference version,
+            from summarize_outputs().
+        candidate (dict | None): Summary of the version under test.
+        tolerances (dict[str, float]): Allowed evoked differences,
+            see REGRESSION_TOLERANCES.
+
+    Returns:
+        list[dict]: Report rows without the subject column.
+    """
+    rows = [
+        _exact(
+            "outputs",
+            "missing" if reference is None else "present",
+            "missing" if candidate is None else "present",
+        )
+    ]
+    if reference is None or candidate is None:
+        return rows
+
+    conditions = reference["n_epochs"].keys() | candidate["n_epochs"].keys()
+    for condition in sorted(conditions):
+        rows.append(
+            _exact(
+                f"n_epochs_{condition}",
+                reference["n_epochs"].get(condition, 0),
+                candidate["n_epochs"].get(condition, 0),
+            )
+        )
+
+    drop_logs = reference["drop_log"], candidate["drop_log"]
+    n_changed = sum(a != b for a, b in zip(*drop_logs)) + abs(
+        len(drop_logs[0]) - len(drop_logs[1])
+    )
+    rows.append(
+        {
+            "check": "drop_log",
+            "reference": f"{sum(map(bool, drop_logs[0]))} dropped",
+            "candidate": f"{sum(map(bool, drop_logs[1]))} dropped",
+            "difference": float(n_changed),
+            "tolerance": 0.0,
+            "passed": n_changed == 0,
+        }
+    )
+
+    # Without run statistics on either side the bad channels are unknown
+    bads = reference["bad_channels"], candidate["bad_channels"]
+    if None in bads:
+        rows.append(
+            {
+                "check": "bad_channels",
+                "reference": "unknown" if bads[0] is None else str(bads[0]),
+                "candidate": "unknown" if bads[1] is None else str(bads[1]),
+                "difference": np.nan,
+                "tolerance": 0.0,
+                "passed": True,
+            }
+        )
+    else:
+        rows.append(_exact("bad_channels", *bads))
+    rows.append(
+        _exact("ica_exclude", reference["ica_exclude"], candidate["ica_exclude"])
+    )
+
+    same_times = np.array_equal(reference["times"], candidate["times"])
+    for key in sorted(reference["evoked"].keys() | candidate["evoked"].keys()):
+        condition, channel = key
+        a, b = reference["evoked"].get(key), candidate["evoked"].get(key)
+        if a is None or b is None or not same_times:
+            diff = np.full(1, np.inf)
+        else:
+            diff = b - a
+        for measure, value in (
+            ("max", np.max(np.abs(diff))),
+            ("rms", np.sqrt(np.mean(diff**2))),
+        ):
+            tolerance = tolerances[f"evoked_{measure}_uV"]
+            rows.append(
+                {
+                    "check": f"evoked_{condition}_{channel}_{measure}_uV",
+                    "reference": "missing" if a is None else f"{np.ptp(a):.3f} ptp",
+                    "candidate": "missing" if b is None else f"{np.ptp(b):.3f} ptp",
+                    "difference": float(value),
+                    "tolerance": tolerance,
+                    "passed": bool(value <= tolerance),
+                }
+            )
+    return rows
+
+
+def print_regression_report(report: pd.DataFrame) -> bool:
+    """Print the outcome of compare_processed() per subject.
+
+    Args:
+        report (pd.DataFrame): Report as returned by
+            compare_processed().
+
+    Returns:
+        bool: Whether all checks of all subjects passed.
+    """
+    for subject_id, checks in report.groupby("subject"):
+        failed = checks[~checks["passed"]]
+        if failed.empty:
+            print(f"PASS   subject={subject_id} ({len(checks)} checks)")
+            continue
+        print(f"FAIL   subject={subject_id} ({len(failed)}/{len(checks)} checks)")
+        for row in failed.itertuples():
+            print(
+                f"    {row.check}: {row.reference} -> {row.candidate} "
+                f"(difference {row.difference:.4g}, tolerance {row.tolerance:.4g})"
+            )
+
+    passed = bool(report["passed"].all())
+    print(f"\n{"PASS" if passed else "FAIL"}: {report["subject"].nunique()} subject(s)")
+    return passed
+
+
+def _exact(check: str, reference, candidate) -> dict:
+    """Report row of a check that requires equal values."""
+    equal = reference == candidate
+    if isinstance(reference, int) and isinstance(candidate, int):
+        difference = float(candidate - reference)
+    else:
+        difference = 0.0 if equal else np.nan
+    return {
+        "check": check,
+        "reference": str(reference),
+        "candidate": str(candidate),
+        "difference": difference,
+        "tolerance": 0.0,
+        "passed": bool(equal),
+    }
+
+
+def _read_bad_channels(output_folder: str) -> dict[str, list[str]]:
+    """Bad channels per subject from a config's run statistics table.
+
+    Args:
+        output_folder (str): Config output directory.
+
+    Returns:
+        dict[str, list[str]]: Bad channel names per subject ID, empty
+            if the folder has no run statistics with bad channels.
+    """
+    path = f"{output_folder}/run_stats.parquet"
+    if not isfile(path):
+        return {}
+    stats = pd.read_parquet(path)
+    if "bad_channels" not in stats:
+        return {}
+    return {
+        subject_id: [ch for ch in bads.split(",") if ch]
+        for subject_id, bads in zip(stats["subject"], stats["bad_channels"].fillna(""))
+    }
@@ -0,0 +1,263 @@
+"""Benchmark runner for the preprocessing pipeline.
+
+Runs configs end to end on a dataset (usually a synthetic one from
+benchmarks/synthetic.py) and records the runtime of every pipeline
+step, as measured by run_pipeline(), together with the wall-clock
+time of the whole config. Results are appended to a history table,
+``<bids_root>/benchmarks.parquet``, tagged with the git commit of the
+code, so the effect of each change can be tracked over commits.
+
+Each config run happens in a fresh worker process, one at a time,
+so runs do not compete for CPU and in-process caches start empty.
+By default the on-disk cache (``<bids_root>/cache/``) is cleared
+before each run as well, so every step is timed cold.
+
+Typical usage:
+    results = run_benchmark(bids_root, {1: "../config/1_default"}, repeats=3)
+    print(summarize_benchmarks(read_benchmarks(bids_root)).to_string())
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from json import load
+from os import getpid, mkdir, replace
+from os.path import dirname, isdir, isfile
+from shutil import rmtree
+from subprocess import run
+from time import perf_counter
+
+import pandas as pd
+
+from pipeline.analyze_subject import run_pipeline
+from utils.config import load_config
+from utils.utils import get_subject_list
+
+
+def run_benchmark(
+    bids_root: str,
+    config_paths: dict[int, str],
+    subject_ids: list[str] | None = None,
+    repeats: int = 1,
+    cold: bool = True,
+) -> pd.DataFrame:
+    """Time configs end to end and add the results to the history.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset to run on.
+            Outputs are written to its processed/ folder.
+        config_paths (dict[int, str]): Mapping of config ID to TOML
+            config path.
+        subject_ids (list[str] | None): Zero-padded subject
+            identifiers. Defaults to all subjects of the dataset.
+        repeats (int): Number of runs of each config.
+        cold (bool): Clear the on-disk cache before each run.
+
+    Returns:
+        pd.DataFrame: One row per config, run and subject with the
+            run statistics of run_pipeline() (including the time_*
+            step timings), the wall-clock time of the whole config
+            run (time_config) and the commit, dataset and run
+            identification.
+    """
+    if subject_ids is None:
+        subject_ids = get_subject_list(bids_root)
+    if not isdir(f"{bids_root}/processed"):
+        mkdir(f"{bids_root}/processed")
+
+    commit = git_commit()
+    dataset = describe_dataset(bids_root, subject_ids)
+    timestamp = datetime.now().isoformat(timespec="seconds")
+
+    tables = []
+    for config_id, config_path in config_paths.items():
+        for repeat in range(repeats):
+            if cold:
+                rmtree(f"{bids_root}/cache", ignore_errors=True)
+
+            # A fresh process per run, so in-process caches start empty
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                rows, error = executor.submit(
+                    benchmark_config, config_path, bids_root, config_id, subject_ids
+                ).result()
+            if error:
+                print(f"FAILED config={config_id} run={repeat + 1}: {error}")
+                continue
+
+            table = pd.DataFrame(rows)
+            table["repeat"] = repeat
+            print(
+                f"DONE   config={config_id} run={repeat + 1}/{repeats}: "
+                f"{table["time_config"].iloc[0]:.1f}s"
+            )
+            tables.append(table)
+
+    if not tables:
+        return pd.DataFrame()
+    results = pd.concat(tables, ignore_index=True)
+    results.insert(0, "commit", commit)
+    results.insert(1, "timestamp", timestamp)
+    results.insert(2, "dataset", dataset)
+    results["cold"] = cold
+    append_benchmarks(bids_root, results)
+    return results
+
+
+def benchmark_config(
+    config_path: str, bids_root: str, config_id: int, subject_ids: list[str]
+) -> tuple[list[dict], str | None]:
+    """Run one config on all subjects in a worker process.
+
+    Subjects run one after another, so the step timings are not
+    affected by other runs.
+
+    Args:
+        config_path (str): Path to the TOML configuration file.
+        bids_root (str): Root directory of the BIDS dataset.
+        config_id (int): Numeric config identifier.
+        subject_ids (list[str]): Zero-padded subject identifiers.
+
+    Returns:
+        tuple[list[dict], str | None]: The run statistics of each
+            subject with the config's total wall-clock time added as
+            time_config, and an error message (None on success).
+    """
+    config = load_config(config_path)
+    start_time = perf_counter()
+    try:
+        rows = [
+            run_pipeline(config, bids_root, config_id, subject_id)
+            for subject_id in subject_ids
+        ]
+    except Exception as e:
+        return [], str(e)
+
+    total_time = perf_counter() - start_time
+    for row in rows:
+        row["time_config"] = total_time
+    return rows, None
+
+
+def git_commit() -> str:
+    """Identify the code being benchmarked.
+
+    Returns:
+        str: Short hash of the checked out commit, with "+dirty"
+            appended if there are uncommitted changes, or "unknown"
+            outside of a git repository.
+    """
+    folder = dirname(__file__)
+    head = run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=folder,
+        capture_output=True,
+        text=True,
+    )
+    if head.returncode != 0:
+        return "unknown"
+    status = run(
+        ["git", "status", "--porcelain", "--untracked-files=no"],
+        cwd=folder,
+        capture_output=True,
+        text=True,
+    )
+    return head.stdout.strip() + ("+dirty" if status.stdout.strip() else "")
+
+
+def describe_dataset(bids_root: str, subject_ids: list[str]) -> str:
+    """Summarize the benchmarked data, so only like runs are compared.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        subject_ids (list[str]): Zero-padded subject identifiers.
+
+    Returns:
+        str: Description like "4 subjects, 2400 s" with the total
+            recording duration from the eeg.json sidecars, if present.
+    """
+    duration = 0.0
+    for subject_id in subject_ids:
+        sidecar = (
+            f"{bids_root}/sub-{subject_id}/eeg/sub-{subject_id}_task-jacobsen_eeg.json"
+        )
+        if isfile(sidecar):
+            with open(sidecar) as f:
+                duration += load(f).get("RecordingDuration", 0)
+    return f"{len(subject_ids)} subjects, {duration:.0f} s"
+
+
+def append_benchmarks(bids_root: str, results: pd.DataFrame) -> None:
+    """Add benchmark results to the history table.
+
+    Like update_run_stats(), the table is written under a temporary
+    name and moved into place.
+
+    Args:
+        bids_root (str): Root directory of the benchmarked dataset.
+        results (pd.DataFrame): Rows as returned by run_benchmark().
+    """
+    path = f"{bids_root}/benchmarks.parquet"
+    if isfile(path):
+        results = pd.concat([pd.read_parquet(path), results], ignore_index=True)
+    tmp_path = path.replace(".parquet", f"-{getpid()}.parquet")
+    results.to_parquet(tmp_path, index=False)
+    replace(tmp_path, path)
+
+
+def read_benchmarks(bids_root: str) -> pd.DataFrame:
+    """Load the benchmark history of a dataset.
+
+    Args:
+        bids_root (str): Root directory of the benchmarked dataset.
+
+    Returns:
+        pd.DataFrame: All recorded results, empty if none exist.
+    """
+    path = f"{bids_root}/benchmarks.parquet"
+    if not isfile(path):
+        return pd.DataFrame()
+    return pd.read_parquet(path)
+
+
+def summarize_benchmarks(history: pd.DataFrame, last: int = 5) -> pd.DataFrame:
+    """Compare step timings across the most recently benchmarked commits.
+
+    Only runs on the same dataset and with the same cache mode as
+    the latest run are compared. Step times are summed over subjects
+    per run and the median over repeated runs is reported.
+
+    Args:
+        history (pd.DataFrame): Benchmark history from
+            read_benchmarks().
+        last (int): Number of most recent commits to show.
+
+    Returns:
+        pd.DataFrame: Median time in seconds per config and step (rows)
+            and commit (columns, oldest first), with the relative
+            change of the latest commit against the one before in a
+            "change_%" column.
+    """
+    if history.empty:
+        return pd.DataFrame()
+    latest = history.iloc[-1]
+    history = history[
+        (history["dataset"] == latest["dataset"]) & (history["cold"] == latest["cold"])
+    ]
+    commits = list(dict.fromkeys(history["commit"]))[-last:]
+    history = history[history["commit"].isin(commits)]
+
+    steps = [c for c in history.columns if c.startswith("time_") and c != "time_config"]
+    per_run = history.groupby(["commit", "timestamp", "config", "repeat"])
+    per_run = per_run[steps].sum(min_count=1).join(per_run["time_config"].first())
+
+    summary = (
+        per_run.groupby(["commit", "config"])
+        .median()
+        .stack()
+        .unstack("commit")
+        .dropna(how="all")
+        .reindex(columns=commits)
+    )
+    summary.index.names = ["config", "step"]
+    if len(commits) > 1:
+        summary["change_%"] = (summary[commits[-1]] / summary[commits[-2]] - 1) * 100
+    return summary
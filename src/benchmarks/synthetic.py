@@ -0,0 +1,300 @@
+"""Synthetic BIDS dataset generator for offline benchmarks.
+
+Writes a small dataset shaped like ds004347, so the pipeline and the
+blink analysis can run (and be timed) without the real recordings:
+
+- BioSemi BDF files with the 64 EEG channels of the biosemi64
+  montage, the external electrodes EXG1-EXG8 and the Status channel
+  carrying the trigger codes.
+- Pink background noise, DC offsets, 50 Hz line noise with
+  harmonics and one noisy channel per subject.
+- Blinks on the EOG electrodes (EXG5/EXG6) that spread to the
+  frontal EEG channels.
+- Stimulus events with the values 1 (regular) and 3 (random) in
+  events.tsv and on the Status channel, with a small posterior ERP
+  (a sustained negativity for regular patterns).
+- The BIDS sidecars mne-bids needs (dataset_description.json,
+  participants.tsv, *_eeg.json, *_channels.tsv).
+
+Typical usage:
+    make_synthetic_dataset("../benchmark_data", n_subjects=4, duration_s=600)
+"""
+
+from json import dump
+from os import makedirs
+
+import mne
+import numpy as np
+
+# BioSemi ActiveTwo: 24-bit samples, 1/32 µV per bit
+BDF_DIGITAL_RANGE = (-8388608, 8388607)
+BDF_PHYSICAL_RANGE_UV = (-262144, 262143)
+
+EXG_CHANNELS = [f"EXG{i}" for i in range(1, 9)]
+
+
+def make_synthetic_dataset(
+    bids_root: str,
+    n_subjects: int = 2,
+    duration_s: int = 300,
+    sfreq: int = 512,
+    blinks_per_minute: float = 15.0,
+    line_freq: float = 50.0,
+    seed: int = 0,
+) -> list[str]:
+    """Write a synthetic BIDS dataset.
+
+    Each subject's recording is generated from its own seed, so a
+    dataset can be extended with more subjects without changing the
+    existing ones.
+
+    Args:
+        bids_root (str): Root directory of the dataset to write.
+            Existing subject files are overwritten.
+        n_subjects (int): Number of subjects.
+        duration_s (int): Recording duration per subject in seconds.
+        sfreq (int): Sampling frequency in Hz.
+        blinks_per_minute (float): Average blink rate.
+        line_freq (float): Power line frequency in Hz.
+        seed (int): Base random seed.
+
+    Returns:
+        list[str]: Zero-padded IDs of the subjects written.
+    """
+    makedirs(bids_root, exist_ok=True)
+    with open(f"{bids_root}/dataset_description.json", "w") as f:
+        dump(
+            {
+                "Name": "Synthetic symmetry perception benchmark data",
+                "BIDSVersion": "1.8.0",
+                "DatasetType": "raw",
+            },
+            f,
+            indent=2,
+        )
+
+    subject_ids = [f"{s:03d}" for s in range(1, n_subjects + 1)]
+    with open(f"{bids_root}/participants.tsv", "w") as f:
+        f.write("participant_id\n")
+        f.writelines(f"sub-{subject_id}\n" for subject_id in subject_ids)
+
+    for s, subject_id in enumerate(subject_ids, start=1):
+        print(f"Writing synthetic subject {subject_id}")
+        write_synthetic_subject(
+            bids_root,
+            subject_id,
+            duration_s,
+            sfreq,
+            blinks_per_minute,
+            line_freq,
+            np.random.default_rng(seed * 1000 + s),
+        )
+    return subject_ids
+
+
+def write_synthetic_subject(
+    bids_root: str,
+    subject_id: str,
+    duration_s: int,
+    sfreq: int,
+    blinks_per_minute: float,
+    line_freq: float,
+    rng: np.random.Generator,
+) -> None:
+    """Generate and write the recording and sidecars of one subject.
+
+    Args:
+        bids_root (str): Root directory of the dataset.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        duration_s (int): Recording duration in seconds.
+        sfreq (int): Sampling frequency in Hz.
+        blinks_per_minute (float): Average blink rate.
+        line_freq (float): Power line frequency in Hz.
+        rng (np.random.Generator): Random generator of this subject.
+    """
+    montage = mne.channels.make_standard_montage("biosemi64")
+    eeg_chs = montage.ch_names
+    positions = np.array([montage.get_positions()["ch_pos"][ch] for ch in eeg_chs])
+    n_eeg = len(eeg_chs)
+    n_times = duration_s * sfreq
+    times = np.arange(n_times) / sfreq
+
+    # EEG and EXG channels in µV
+    data = pink_noise(n_eeg + len(EXG_CHANNELS), n_times, rng) * 10.0
+
+    # One noisy EEG channel per subject, for the bad channel detection
+    data[rng.integers(n_eeg)] *= 8.0
+
+    # Slow drifts and electrode offsets, removed by the high-pass
+    data += rng.uniform(-20e3, 20e3, (len(data), 1))
+    data += 20.0 * np.sin(2 * np.pi * 0.05 * times + rng.uniform(0, 2 * np.pi))
+
+    # Line noise and its harmonics, strongest on the external electrodes
+    for harmonic, amplitude in ((1, 4.0), (2, 1.0), (3, 0.5)):
+        phases = rng.uniform(0, 2 * np.pi, (len(data), 1))
+        gains = rng.uniform(0.5, 1.5, (len(data), 1))
+        gains[n_eeg:] *= 3.0
+        data += amplitude * gains * np.sin(
+            2 * np.pi * harmonic * line_freq * times + phases
+        )
+
+    # Blinks: large on the EOG electrodes (EXG5 above, EXG6 below the
+    # eye), spreading to the frontal EEG channels
+    frontal = np.clip((positions[:, 1] - 0.02) / 0.07, 0, 1) ** 2
+    propagation = np.concatenate((frontal * 0.5, np.zeros(len(EXG_CHANNELS))))
+    propagation[n_eeg + 4] = 1.0
+    propagation[n_eeg + 5] = -0.6
+    n_blinks = rng.poisson(blinks_per_minute * duration_s / 60)
+    blink_onsets = np.sort(rng.uniform(1.0, duration_s - 1.0, n_blinks))
+    blinks = np.zeros(n_times)
+    for onset, width, amplitude in zip(
+        blink_onsets, rng.uniform(0.06, 0.12, n_blinks), rng.uniform(150, 400, n_blinks)
+    ):
+        start = int((onset - 4 * width) * sfreq)
+        stop = int((onset + 4 * width) * sfreq)
+        blinks[start:stop] += amplitude * np.exp(
+            -0.5 * ((times[start:stop] - onset) / width) ** 2
+        )
+    data += propagation[:, None] * blinks
+
+    # Stimuli every 2.0-2.5 s, with a posterior ERP
+    onsets = np.cumsum(rng.uniform(2.0, 2.5, int(duration_s / 2.0)))
+    onsets = onsets[onsets < duration_s - 2.0] + 1.0
+    values = rng.choice([1, 3], len(onsets))
+    posterior = np.exp(-(((positions[:, 1] + 0.08) / 0.04) ** 2))
+    erp_times = np.arange(int(1.0 * sfreq)) / sfreq
+    erp = {
+        value: -4.0 * np.exp(-0.5 * ((erp_times - 0.2) / 0.04) ** 2)
+        - (2.5 if value == 1 else 0.0)
+        * (1 / (1 + np.exp(-(erp_times - 0.3) / 0.03)))
+        * np.exp(-(np.maximum(erp_times - 0.9, 0) / 0.05) ** 2)
+        for value in (1, 3)
+    }
+    samples = np.round(onsets * sfreq).astype(int)
+    for sample, value in zip(samples, values):
+        data[:n_eeg, sample : sample + len(erp_times)] += (
+            posterior[:, None] * erp[value]
+        )
+
+    # Trigger codes on the Status channel, held for 10 ms
+    status = np.zeros(n_times)
+    for sample, value in zip(samples, values):
+        status[sample : sample + int(0.01 * sfreq)] = value
+
+    eeg_folder = f"{bids_root}/sub-{subject_id}/eeg"
+    makedirs(eeg_folder, exist_ok=True)
+    prefix = f"{eeg_folder}/sub-{subject_id}_task-jacobsen"
+    ch_names = eeg_chs + EXG_CHANNELS + ["Status"]
+    write_bdf(f"{prefix}_eeg.bdf", np.vstack((data, status)), ch_names, sfreq)
+
+    with open(f"{prefix}_events.tsv", "w") as f:
+        f.write("onset\tduration\tsample\tvalue\n")
+        f.writelines(
+            f"{onset:.6f}\t0\t{sample}\t{value}\n"
+            for onset, sample, value in zip(samples / sfreq, samples, values)
+        )
+    with open(f"{prefix}_channels.tsv", "w") as f:
+        f.write("name\ttype\tunits\n")
+        f.writelines(f"{ch}\tEEG\tµV\n" for ch in eeg_chs)
+        f.writelines(f"{ch}\tMISC\tµV\n" for ch in EXG_CHANNELS)
+        f.write("Status\tTRIG\tn/a\n")
+    with open(f"{prefix}_eeg.json", "w") as f:
+        dump(
+            {
+                "TaskName": "jacobsen",
+                "SamplingFrequency": sfreq,
+                "PowerLineFrequency": line_freq,
+                "EEGReference": "CMS/DRL",
+                "SoftwareFilters": "n/a",
+                "RecordingDuration": duration_s,
+                "EEGChannelCount": n_eeg,
+                "MiscChannelCount": len(EXG_CHANNELS),
+                "TriggerChannelCount": 1,
+                "Manufacturer": "BioSemi",
+                "ManufacturersModelName": "ActiveTwo (synthetic)",
+            },
+            f,
+            indent=2,
+        )
+
+
+def pink_noise(n_channels: int, n_times: int, rng: np.random.Generator) -> np.ndarray:
+    """Generate independent 1/f noise with unit standard deviation.
+
+    Args:
+        n_channels (int): Number of channels.
+        n_times (int): Number of samples.
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        np.ndarray: Noise of shape (n_channels, n_times).
+    """
+    spectrum = np.fft.rfft(rng.standard_normal((n_channels, n_times)), axis=1)
+    scale = 1 / np.sqrt(np.maximum(np.arange(spectrum.shape[1]), 1))
+    noise = np.fft.irfft(spectrum * scale, n=n_times, axis=1)
+    return noise / noise.std(axis=1, keepdims=True)
+
+
+def write_bdf(
+    path: str, data: np.ndarray, ch_names: list[str], sfreq: int
+) -> None:
+    """Write a BioSemi BDF file.
+
+    Channels named "Status" are stored as raw trigger codes, all
+    others as µV in the ActiveTwo range. The data is truncated to
+    whole one-second records.
+
+    Args:
+        path (str): Output file path.
+        data (np.ndarray): Data of shape (n_channels, n_times), in µV
+            (trigger codes for the Status channel).
+        ch_names (list[str]): Channel names (at most 16 characters).
+        sfreq (int): Sampling frequency in Hz, used as the number of
+            samples per record.
+    """
+    n_channels = len(ch_names)
+    n_records = data.shape[1] // sfreq
+    dmin, dmax = BDF_DIGITAL_RANGE
+
+    is_status = np.array([ch == "Status" for ch in ch_names])
+    pmin = np.where(is_status, dmin, BDF_PHYSICAL_RANGE_UV[0])
+    pmax = np.where(is_status, dmax, BDF_PHYSICAL_RANGE_UV[1])
+    gain = (dmax - dmin) / (pmax - pmin)
+    digital = np.round((data[:, : n_records * sfreq] - pmin[:, None]) * gain[:, None])
+    digital = np.clip(digital + dmin, dmin, dmax).astype("<i4")
+
+    def field(value, width: int) -> bytes:
+        return str(value)[:width].ljust(width).encode("ascii")
+
+    header = (
+        b"\xffBIOSEMI"
+        + field("X X X X", 80)
+        + field("Startdate 01-JAN-2020 X X X", 80)
+        + field("01.01.20", 8)
+        + field("00.00.00", 8)
+        + field(256 * (n_channels + 1), 8)
+        + field("24BIT", 44)
+        + field(n_records, 8)
+        + field(1, 8)
+        + field(n_channels, 4)
+    )
+    columns = {
+        16: ch_names,
+        80: ["Active electrode" if not s else "Triggers and Status" for s in is_status],
+        8: ["Boolean" if s else "uV" for s in is_status],
+    }
+    header += b"".join(field(v, 16) for v in columns[16])
+    header += b"".join(field(v, 80) for v in columns[80])
+    header += b"".join(field(v, 8) for v in columns[8])
+    for values in (pmin, pmax, [dmin] * n_channels, [dmax] * n_channels):
+        header += b"".join(field(v, 8) for v in values)
+    header += b"".join(field("HP:DC; LP:417 Hz", 80) for _ in ch_names)
+    header += b"".join(field(sfreq, 8) for _ in ch_names)
+    header += b"".join(field("", 32) for _ in ch_names)
+
+    # Records of sfreq samples per channel, 3 little-endian bytes each
+    records = digital.reshape(n_channels, n_records, sfreq).transpose(1, 0, 2)
+    body = records.copy().view(np.uint8).reshape(-1, 4)[:, :3]
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(body.tobytes())
@@ -4,18 +4,23 @@ Provides a CLI for investigating the impact of eye blinks on ERP
 results, particularly in relation to ASR artifact correction.
 Supports plotting EOG channels, visualizing blink-epoch overlays
 for individual subjects, precomputing blink-labelled epochs across
-all subjects, and generating grand average plots split by blink
-presence.
+all subjects or for the stored epochs of any config, generating
+grand average plots split by blink presence, streaming blink
+detection over a recording on disk, and sweeping the blink detector
+parameters.
 """
 
 from time import time
-from os import getenv
+from os import getenv, mkdir
+from os.path import isdir
 
 from utils.config import load_config
 from utils.utils import get_config_path
 
 from blinks.plots import plot_eog, plot_eeg_plus_eog_one_subject, all_subjects_plotting
-from blinks.blinks import precompute_all_epochs
+from blinks.blinks import label_processed_epochs, precompute_all_epochs
+from blinks.streaming import stream_subject_blinks
+from blinks.sweep import blink_parameter_sweep
 
 
 def main():
@@ -39,9 +44,12 @@ def main():
 
     print("Which action do you want to perform?")
     print("1 - Plot blink detection for one subjects")
-    print("2 - Process data for for blink comparison (all subjects)")
+    print("2 - Process data for blink comparison (all subjects, with and without ASR)")
     print("3 - Plot data for blink comparison (all subjects)")
     print("4 - Plot presumable EOG5 and 6 channels (one subject)")
+    print("5 - Stream blink detection over the recording (one subject)")
+    print("6 - Label processed epochs of a config with blinks (all subjects)")
+    print("7 - Sweep blink detector parameters (all subjects)")
 
     i = input(": ")
     if i.lower() == "1":
@@ -49,9 +57,8 @@ def main():
         plot_eeg_plus_eog_one_subject(bids_root, s, config)
 
     elif i.lower() == "2":
-        with_asr = input("With ASR (y/n)") == "y"
         start_time = time()
-        precompute_all_epochs(bids_root, config, output_folder, with_asr)
+        precompute_all_epochs(bids_root, config_path, output_folder)
         total_time = time() - start_time
         print(f"\nElapsed time: {total_time} seconds\n")
 
@@ -69,6 +76,68 @@ def main():
         total_time = time() - start_time
         print(f"\nElapsed time: {total_time} seconds\n")
 
+    elif i.lower() == "5":
+        s = f"{int(input("Subject ID: ")):03d}"
+        start_time = time()
+        blinks = stream_subject_blinks(bids_root, s)
+        total_time = time() - start_time
+        print(f"Detected blinks: {len(blinks)}")
+        print(f"\nElapsed time: {total_time} seconds\n")
+
+    elif i.lower() == "6":
+        config_id = int(input("Config ID: "))
+        start_time = time()
+        label_processed_epochs(
+            bids_root,
+            get_config_path(config_root, config_id),
+            config_id,
+            output_folder,
+        )
+        total_time = time() - start_time
+        print(f"\nElapsed time: {total_time} seconds\n")
+
+    elif i.lower() == "7":
+        start_time = time()
+        sweep_blink_parameters(bids_root, config_path, output_folder)
+        total_time = time() - start_time
+        print(f"\nElapsed time: {total_time} seconds\n")
+
+
+def sweep_blink_parameters(bids_root: str, config_path: str, output_folder: str):
+    """Evaluate a grid of blink detector settings on all subjects.
+
+    Writes the full table to blink_sweep.csv in the output folder and
+    prints the per-setting means across subjects, for the default
+    smoothing width and merge gap.
+
+    Args:
+        bids_root: Root directory of the BIDS dataset.
+        config_path: Path to the TOML config defining the epochs.
+        output_folder: Directory for the sweep table.
+    """
+    sweep = blink_parameter_sweep(
+        bids_root,
+        config_path,
+        mad_mults=[3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 10.0],
+        envelope_smooth_ms=[10.0, 20.0, 40.0],
+        min_distances_s=[0.05, 0.1, 0.2],
+        merge_gaps_s=[0.02, 0.05, 0.1],
+    )
+    if not isdir(output_folder):
+        mkdir(output_folder)
+    sweep.to_csv(f"{output_folder}/blink_sweep.csv", index=False)
+
+    means = (
+        sweep[(sweep["envelope_smooth_ms"] == 20.0) & (sweep["merge_gap_s"] == 0.02)]
+        .groupby(["mad_mult", "min_distance_s"])[
+            ["blinks_per_minute", "mean_duration_s", "affected_epochs"]
+        ]
+        .mean()
+    )
+    print("\nMean across subjects (20 ms smoothing, 20 ms merge gap):")
+    print(means.round(3).to_string())
+    print(f"\nFull table written to {output_folder}/blink_sweep.csv")
+
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,25 @@
 """Blink detection and blink-conditioned epoch analysis.
 
 Implements automatic blink detection on EOG channels using a
-threshold-based algorithm, and provides utilities to split epochs
-into blink-present and blink-absent subsets. This module supports
+threshold-based algorithm, and provides utilities to label epochs
+with their blink overlap (stored as epochs metadata) and to select
+blink-present and blink-absent subsets. This module supports
 the investigation of how ASR artifact correction interacts with
 blink-contaminated epochs (see Section 5 of the report).
 """
 
-from mne_bids import BIDSPath
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from json import dumps
+from os import getenv, makedirs, mkdir, stat
+from os.path import isdir, isfile
+
+from mne_bids import BIDSPath, read_raw_bids
 import mne
 from mne.io.edf.edf import RawEDF
 from mne import Epochs
 import numpy as np
+import pandas as pd
 from scipy import signal
 
 from pipeline.step01_loading import load_data
@@ -22,13 +30,27 @@ from pipeline.step05_referencing import rereference_data
 from pipeline.step06_asr import run_asr
 from pipeline.step07_ica import run_ica
 from pipeline.step08_interpolation import interpolate_bad_channels
-from pipeline.step09_epoching import epoch_data
+from pipeline.step09_epoching import epoch_data, load_event_index
 
-from utils.config import PipelineConfig
+from utils.cache import get_cache_folder, hash_config_sections, save_arrays_atomic
+from utils.config import PipelineConfig, StepASR, load_config
+from utils.intervals import interval_overlap, merge_intervals
 from utils.utils import get_subject_list
 
 from blinks.files import save_blink_epochs
 
+# Blink detector settings used for all subjects; cached blink
+# intervals are recomputed when these change
+BLINK_DETECTION = {
+    "l_freq": 1.0,
+    "h_freq": 15.0,
+    "envelope_smooth_ms": 20.0,
+    "mad_mult": 6.0,
+}
+
+# Sampling rate in Hz the EOG is decimated to before blink detection
+BLINK_SFREQ = 128.0
+
 
 def epochs_have_blinks(
     epochs: mne.Epochs, blink_intervals
@@ -50,23 +72,34 @@ def epochs_have_blinks(
         NDArray[np.bool_]: Boolean array of shape (n_epochs,) where
             True indicates the epoch overlaps at least one blink.
     """
-    sfreq = epochs.info["sfreq"]
-    event_samples = epochs.events[:, 0]
-    epoch_start_times = event_samples / sfreq + epochs.tmin
-    epoch_duration = epochs.times[-1] - epochs.times[0]
-    epoch_end_times = epoch_start_times + epoch_duration
+    counts, _ = epochs_blink_overlap(epochs, blink_intervals)
+    return counts > 0
+
 
-    has_blink = np.zeros(len(epoch_start_times), dtype=bool)
-    if not blink_intervals:
-        return has_blink
+def epochs_blink_overlap(
+    epochs: mne.Epochs, blink_intervals
+) -> tuple[np.ndarray, np.ndarray]:
+    """Count the blinks in each epoch and the blink time they cover.
 
-    bi = np.array(blink_intervals)
-    for i, (s0, e0) in enumerate(zip(epoch_start_times, epoch_end_times)):
-        overlaps = np.logical_not((bi[:, 1] <= s0) | (bi[:, 0] >= e0))
-        if overlaps.any():
-            has_blink[i] = True
+    Args:
+        epochs (Epochs): Epoched EEG data. Event sample indices and
+            epoch tmin/tmax are used to compute absolute time windows.
+        blink_intervals (list[tuple[float, float]]): List of
+            (start_seconds, end_seconds) pairs defining each detected
+            blink in absolute recording time.
 
-    return has_blink
+    Returns:
+        tuple[np.ndarray, np.ndarray]: A tuple of:
+            - Number of blinks overlapping each epoch, shape
+              (n_epochs,).
+            - Seconds of each epoch covered by blinks, shape
+              (n_epochs,).
+    """
+    sfreq = epochs.info["sfreq"]
+    epoch_start_times = epochs.events[:, 0] / sfreq + epochs.tmin
+    epoch_duration = epochs.times[-1] - epochs.times[0]
+    windows = np.column_stack((epoch_start_times, epoch_start_times + epoch_duration))
+    return interval_overlap(windows, np.array(blink_intervals))
 
 
 def detect_blinks_on_raw(
@@ -120,148 +153,391 @@ def detect_blinks_on_raw(
     """
 
     sfreq = raw.info["sfreq"]
+    env_smooth = smooth_envelope(
+        eog_envelope(raw, eog_chs, l_freq, h_freq), sfreq, envelope_smooth_ms
+    )
+
+    # robust baseline & threshold
+    med = np.median(env_smooth)
+    mad = np.median(np.abs(env_smooth - med))
+    thresh = med + mad_mult * mad
+    baseline_level = med + 0.5 * mad
+
+    min_dist = int(round(min_distance_s * sfreq))
+    peaks, _ = signal.find_peaks(env_smooth, height=thresh, distance=min_dist)
+
+    if not peaks.size:
+        return [], np.array([])
+
+    # convert to seconds and merge nearby/overlapping intervals
+    intervals = expand_peaks(env_smooth, peaks, baseline_level) / sfreq
+    merged = merge_intervals(intervals, merge_gap_s)
+    durations = merged[:, 1] - merged[:, 0]
+
+    return [(s, e) for s, e in merged.tolist()], durations
+
+
+def eog_envelope(
+    raw: mne.io.BaseRaw, eog_chs: list[str], l_freq: float, h_freq: float
+) -> np.ndarray:
+    """Band-pass filter the EOG channels and take their amplitude envelope.
+
+    Args:
+        raw (BaseRaw): Continuous data containing the EOG channels.
+        eog_chs (list[str]): Names of the EOG channels.
+        l_freq (float): Lower bandpass frequency in Hz.
+        h_freq (float): Upper bandpass frequency in Hz.
+
+    Returns:
+        np.ndarray: Maximum absolute filtered value across the EOG
+            channels, shape (n_times,).
+    """
     eog_idx = mne.pick_channels(raw.ch_names, include=eog_chs)
     eog_data = raw.get_data(picks=eog_idx)
 
     # Bandpass filter for blink detection
     eog_filtered = mne.filter.filter_data(
-        eog_data, sfreq=sfreq, l_freq=l_freq, h_freq=h_freq, method="iir", verbose=False
+        eog_data,
+        sfreq=raw.info["sfreq"],
+        l_freq=l_freq,
+        h_freq=h_freq,
+        method="iir",
+        verbose=False,
     )
 
     # envelope: max absolute across eog channels
-    env = np.max(np.abs(eog_filtered), axis=0)
+    return np.max(np.abs(eog_filtered), axis=0)
+
+
+def smooth_envelope(
+    env: np.ndarray, sfreq: float, envelope_smooth_ms: float
+) -> np.ndarray:
+    """Smooth an amplitude envelope with a centered moving average.
 
-    # smooth envelope
+    Args:
+        env (np.ndarray): Envelope, shape (n_times,).
+        sfreq (float): Sampling frequency in Hz.
+        envelope_smooth_ms (float): Window width in milliseconds.
+
+    Returns:
+        np.ndarray: Smoothed envelope, shape (n_times,).
+    """
     win = int(round(envelope_smooth_ms * 1e-3 * sfreq))
     win = max(1, win)
     kernel = np.ones(win) / win
-    env_smooth = np.convolve(env, kernel, mode="same")
+    return np.convolve(env, kernel, mode="same")
 
-    # robust baseline & threshold
-    med = np.median(env_smooth)
-    mad = np.median(np.abs(env_smooth - med))
-    thresh = med + mad_mult * mad
-    baseline_level = med + 0.5 * mad
 
-    min_dist = int(round(min_distance_s * sfreq))
-    peaks, _ = signal.find_peaks(env_smooth, height=thresh, distance=min_dist)
+def expand_peaks(
+    env_smooth: np.ndarray, peaks: np.ndarray, baseline_level: float
+) -> np.ndarray:
+    """Expand blink peaks to the surrounding samples above the baseline.
+
+    Each peak is expanded to the nearest samples at or below the
+    baseline level on either side, falling back to the first/last
+    sample.
 
-    intervals = []
+    Args:
+        env_smooth (np.ndarray): Smoothed envelope, shape (n_times,).
+        peaks (np.ndarray): Peak sample indices.
+        baseline_level (float): Envelope level that ends a blink.
+
+    Returns:
+        np.ndarray: (start, end) sample indices, shape (n_peaks, 2).
+    """
     n = env_smooth.size
-    for p in peaks:
-        s = p
-        while s > 0 and env_smooth[s] > baseline_level:
-            s -= 1
-        e = p
-        while e < n - 1 and env_smooth[e] > baseline_level:
-            e += 1
-        intervals.append((max(0, s), min(n - 1, e)))
-
-    # convert to seconds
-    intervals_s = [(s / sfreq, e / sfreq) for s, e in intervals]
-    if not intervals_s:
-        return [], np.array([])
+    below = np.flatnonzero(env_smooth <= baseline_level)
+    left_edges = np.concatenate(([0], below))
+    right_edges = np.concatenate((below, [n - 1]))
+    starts = left_edges[np.searchsorted(left_edges, peaks, side="right") - 1]
+    ends = right_edges[np.searchsorted(right_edges, peaks, side="left")]
+    return np.column_stack((starts, ends))
+
+
+def detect_subject_blinks(
+    bids_root: str, subject_id: str, cache_folder: str | None = None
+) -> tuple[list[tuple[float, float]], np.ndarray]:
+    """Detect the blinks of a subject on the unprocessed EOG channels.
+
+    Only the EOG channels are read from the recording and decimated
+    to BLINK_SFREQ, so no preprocessing is needed. The intervals are
+    cached per subject and recomputed when the recording or
+    BLINK_DETECTION change. Since they are in recording time, they
+    apply to the epochs of any config.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        cache_folder (str | None): Directory for the ``.npz`` cache,
+            or None to always detect.
+
+    Returns:
+        tuple[list[tuple[float, float]], np.ndarray]: Blink intervals
+            and durations, as returned by detect_blinks_on_raw().
+    """
+    bids_path = BIDSPath(
+        subject=subject_id,
+        root=bids_root,
+        datatype="eeg",
+        suffix="eeg",
+        task="jacobsen",
+    )
+    st = stat(bids_path.fpath)
+    settings = dumps({**BLINK_DETECTION, "sfreq": BLINK_SFREQ}, sort_keys=True)
+
+    cache_file = None
+    if cache_folder is not None:
+        cache_file = f"{cache_folder}/sub-{subject_id}_blinks.npz"
+    if cache_file is not None and isfile(cache_file):
+        with np.load(cache_file) as cached:
+            if (
+                int(cached["source_mtime_ns"]) == st.st_mtime_ns
+                and int(cached["source_size"]) == st.st_size
+                and str(cached["settings"]) == settings
+            ):
+                intervals = cached["intervals"]
+                return [(s, e) for s, e in intervals.tolist()], cached["durations"]
+
+    raw = load_eog(bids_path)
+    intervals, durations = detect_blinks_on_raw(
+        raw, eog_chs=["EOG5", "EOG6"], **BLINK_DETECTION
+    )
+    if cache_file is not None:
+        save_arrays_atomic(
+            cache_file,
+            intervals=np.array(intervals).reshape(-1, 2),
+            durations=durations,
+            source_mtime_ns=st.st_mtime_ns,
+            source_size=st.st_size,
+            settings=settings,
+        )
+    return intervals, durations
+
+
+def load_eog(bids_path: BIDSPath) -> mne.io.BaseRaw:
+    """Read only the EOG channels of a recording.
 
-    # merge nearby/overlapping intervals
-    intervals_s.sort()
-    merged = []
-    cur_s, cur_e = intervals_s[0]
-    for s, e in intervals_s[1:]:
-        if s <= cur_e + merge_gap_s:
-            cur_e = max(cur_e, e)
-        else:
-            merged.append((cur_s, cur_e))
-            cur_s, cur_e = s, e
-    merged.append((cur_s, cur_e))
+    Applies the channel naming of step01_loading.py (EXG5/EXG6 →
+    EOG5/EOG6) and decimates to BLINK_SFREQ if the recording is
+    sampled faster.
 
-    durations = np.array([e - s for s, e in merged])
+    Args:
+        bids_path (BIDSPath): BIDS path of the subject's recording.
+
+    Returns:
+        BaseRaw: Preloaded EOG channels EOG5 and EOG6.
+    """
+    raw = read_raw_bids(bids_path, verbose=False)
+    raw.pick(["EXG5", "EXG6"]).load_data()
+    raw.set_channel_types({"EXG5": "eog", "EXG6": "eog"})
+    raw.rename_channels({"EXG5": "EOG5", "EXG6": "EOG6"})
+    if raw.info["sfreq"] > BLINK_SFREQ:
+        raw.resample(BLINK_SFREQ, verbose=False)
+    return raw
+
+
+def label_processed_epochs(
+    bids_root: str, config_path: str, config_id: int, output_folder: str
+) -> None:
+    """Label the stored epochs of a config with blinks, without reprocessing.
+
+    Uses the cached blink intervals of each subject (see
+    detect_subject_blinks()) on the epochs in
+    ``<bids_root>/processed/<config_id>/`` and saves the labelled
+    epochs to ``<output_folder>/<config_id>/``, named like the
+    precomputed ones, in parallel worker processes.
 
-    return merged, durations
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        config_path (str): Path to the TOML config of the processed
+            epochs. Whether it enables ASR sets the file names.
+        config_id (int): Numeric config identifier.
+        output_folder (str): Directory for the blink-labelled epochs.
+    """
+    data_folder = f"{bids_root}/processed/{config_id}"
+    subject_ids = [
+        path.split("sub-")[-1].split("_epo")[0]
+        for path in sorted(glob(f"{data_folder}/sub-*_epo.fif"))
+    ]
+    with_asr = load_config(config_path).asr.enabled
+    config_output_folder = f"{output_folder}/{config_id}"
+    if not isdir(config_output_folder):
+        makedirs(config_output_folder)
+
+    with ProcessPoolExecutor(max_workers=int(getenv("MAX_WORKERS", 2))) as executor:
+        futures = [
+            executor.submit(
+                label_processed_subject,
+                bids_root,
+                data_folder,
+                subject_id,
+                config_output_folder,
+                with_asr,
+            )
+            for subject_id in subject_ids
+        ]
+        for future in as_completed(futures):
+            subject_id, error = future.result()
+            if error:
+                print(f"FAILED blinks config={config_id} subject={subject_id}: {error}")
+            else:
+                print(f"DONE   blinks config={config_id} subject={subject_id}")
+
+
+def label_processed_subject(
+    bids_root: str,
+    data_folder: str,
+    subject_id: str,
+    output_folder: str,
+    with_asr: bool,
+) -> tuple[str, str | None]:
+    """Label one subject's stored epochs with blinks and save them.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        data_folder (str): Config output directory with the epochs.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        output_folder (str): Directory to save the epoch file into.
+        with_asr (bool): Whether the epochs were processed with ASR.
+
+    Returns:
+        tuple[str, str | None]: The subject ID and an error message,
+            which is None on success.
+    """
+    try:
+        epochs = mne.read_epochs(
+            f"{data_folder}/sub-{subject_id}_epo.fif", preload=True, verbose=False
+        )
+        blink_intervals, _ = detect_subject_blinks(
+            bids_root, subject_id, get_cache_folder(bids_root, "blinks")
+        )
+        save_blink_epochs(
+            output_folder, subject_id, label_blinks(epochs, blink_intervals), with_asr
+        )
+        return subject_id, None
+    except Exception as e:
+        return subject_id, str(e)
 
 
 def precompute_all_epochs(
-    bids_root: str, config: PipelineConfig, output_folder: str, with_asr: bool
+    bids_root: str,
+    config_path: str,
+    output_folder: str,
+    subject_ids: list[str] | None = None,
 ) -> None:
     """Run the pipeline and blink detection for all subjects, saving results.
 
-    For each subject, runs the preprocessing pipeline (with and without
-    ASR), detects blinks on the EOG channels, splits epochs into
-    blink-present and blink-absent subsets, and saves both to disk.
+    Subjects are processed in parallel worker processes; the number of
+    workers is controlled by the MAX_WORKERS environment variable
+    (default: 2). Each subject is processed once and both variants
+    (with and without ASR) of its blink-labelled epochs are saved.
 
     Args:
         bids_root (str): Root directory of the BIDS dataset.
-        config (PipelineConfig): Pipeline configuration used for
-            all preprocessing steps.
+        config_path (str): Path to the TOML config used for all
+            preprocessing steps. Loaded inside each worker.
         output_folder (str): Directory to save blink-labelled epoch
-            files into.
-        with_asr (bool): If True, use epochs from the ASR-enabled
-            pipeline branch. If False, use epochs from the branch
-            without ASR.
+            files into. Created if it does not exist.
+        subject_ids (list[str] | None): Zero-padded subject
+            identifiers. Defaults to all subjects of the dataset.
     """
+    if subject_ids is None:
+        subject_ids = get_subject_list(bids_root)
+    if not isdir(output_folder):
+        mkdir(output_folder)
+
+    with ProcessPoolExecutor(max_workers=int(getenv("MAX_WORKERS", 2))) as executor:
+        futures = [
+            executor.submit(
+                precompute_subject, config_path, bids_root, subject_id, output_folder
+            )
+            for subject_id in subject_ids
+        ]
+        for future in as_completed(futures):
+            subject_id, error = future.result()
+            if error:
+                print(f"FAILED blinks subject={subject_id}: {error}")
+            else:
+                print(f"DONE   blinks subject={subject_id}")
+
+
+def precompute_subject(
+    config_path: str, bids_root: str, subject_id: str, output_folder: str
+) -> tuple[str, str | None]:
+    """Process one subject and save its blink-labelled epochs.
+
+    Runs both pipeline branches and labels and saves the epochs of
+    both branches with the subject's blinks (see
+    detect_subject_blinks()).
 
-    subject_ids = get_subject_list(bids_root)
+    Args:
+        config_path (str): Path to the TOML configuration file.
+        bids_root (str): Root directory of the BIDS dataset.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        output_folder (str): Directory to save the epoch files into.
 
-    for i, subject_id in enumerate(subject_ids):
+    Returns:
+        tuple[str, str | None]: The subject ID and an error message,
+            which is None on success.
+    """
+    try:
+        epochs_after, epochs_before, _ = process_subject_with_blinkdetection(
+            bids_root, subject_id, load_config(config_path)
+        )
 
-        epochs_after, epochs_before, raw_after = process_subject_with_blinkdetection(
-            bids_root, subject_id, config
+        blink_intervals, _ = detect_subject_blinks(
+            bids_root, subject_id, get_cache_folder(bids_root, "blinks")
         )
 
-        epochs = epochs_after if with_asr else epochs_before
+        for epochs, with_asr in ((epochs_after, True), (epochs_before, False)):
+            label_blinks(epochs, blink_intervals)
+            save_blink_epochs(output_folder, subject_id, epochs, with_asr)
+        return subject_id, None
+    except Exception as e:
+        return subject_id, str(e)
 
-        # eeg_chs = ['PO7','PO8']
-        eog_chs = ["EOG5", "EOG6"]
 
-        blink_intervals, _ = detect_blinks_on_raw(
-            raw_after,
-            eog_chs=eog_chs,
-            l_freq=1.0,
-            h_freq=15.0,
-            envelope_smooth_ms=20.0,
-            mad_mult=6.0,
-        )
+def label_blinks(epochs: Epochs, blink_intervals) -> Epochs:
+    """Store the blink overlap of each epoch in the epochs metadata.
 
-        has_blink = epochs_have_blinks(epochs, blink_intervals)
+    Adds the columns "blink" (bool), "n_blinks" and "blink_duration"
+    (seconds of the epoch covered by blinks), keeping any existing
+    metadata columns.
 
-        epochs_with_blinks, epochs_without_blinks = filter_blinks(epochs, has_blink)
+    Args:
+        epochs (Epochs): Epochs to label; modified in place.
+        blink_intervals (list[tuple[float, float]]): Blink intervals
+            in absolute recording time, see epochs_have_blinks().
 
-        save_blink_epochs(
-            output_folder,
-            subject_id,
-            epochs_with_blinks,
-            epochs_without_blinks,
-            with_asr,
-        )
+    Returns:
+        Epochs: The labelled epochs.
+    """
+    counts, durations = epochs_blink_overlap(epochs, blink_intervals)
+    metadata = (
+        epochs.metadata.copy()
+        if epochs.metadata is not None
+        else pd.DataFrame(index=range(len(epochs)))
+    )
+    metadata["blink"] = counts > 0
+    metadata["n_blinks"] = counts
+    metadata["blink_duration"] = durations
+    epochs.metadata = metadata
+    return epochs
 
 
-def filter_blinks(
-    epochs: Epochs, has_blink: np.typing.NDArray[np.bool]
-) -> tuple[Epochs, Epochs]:
-    """Split epochs into blink-present and blink-absent subsets.
+def split_by_blinks(epochs: Epochs) -> tuple[Epochs, Epochs]:
+    """Split blink-labelled epochs into blink-present and blink-absent subsets.
 
     Args:
-        epochs (Epochs): Full set of epochs to split.
-        has_blink (NDArray[np.bool_]): Boolean array of shape
-            (n_epochs,) indicating which epochs contain blinks,
-            as returned by epochs_have_blinks().
+        epochs (Epochs): Epochs labelled by label_blinks().
 
     Returns:
         tuple[Epochs, Epochs]: A tuple of:
             - Epochs that overlap with at least one blink.
             - Epochs with no detected blinks.
-
-    Raises:
-        ValueError: If has_blink is not a 1D boolean array matching
-            the number of epochs.
     """
-    if has_blink.ndim != 1 or has_blink.shape[0] != len(epochs):
-        raise ValueError("filter must be a 1D boolean array with length == len(epochs)")
-
-    print(f"hasblinks: {len(has_blink)}, epochs: {len(epochs)}")
-    epochs_with_blink = epochs.copy().drop(~has_blink, reason="blink")
-    epochs_without_blink = epochs.drop(has_blink, reason="no blink")
-
-    return (epochs_with_blink, epochs_without_blink)
+    has_blink = epochs.metadata["blink"].to_numpy()
+    return epochs[has_blink], epochs[~has_blink]
 
 
 def process_subject_with_blinkdetection(
@@ -284,8 +560,7 @@ def process_subject_with_blinkdetection(
         tuple[Epochs, Epochs, RawEDF]: A tuple of:
             - Epochs from the pipeline branch with ASR.
             - Epochs from the pipeline branch without ASR.
-            - Raw data after ASR (used for blink detection on
-              the processed EOG channels).
+            - Raw data after ASR.
     """
     bids_path = BIDSPath(
         subject=subject_id,
@@ -324,16 +599,46 @@ def process_subject_with_blinkdetection(
 
     if config.ica.enabled:
         print(f"\nStep 07: ICA cleaning")
-        raw_after, _, _ = run_ica(raw_after, config.ica)
-        raw_before, _, _ = run_ica(raw_before, config.ica)
+        upstream_sections = [
+            config.bad_channels,
+            config.filtering,
+            config.downsampling,
+            config.rereferencing,
+        ]
+        ica_cache = get_cache_folder(bids_root, "ica")
+        raw_after, _, _ = run_ica(
+            raw_after,
+            config.ica,
+            ica_cache,
+            hash_config_sections(*upstream_sections, config.asr),
+        )
+        raw_before, _, _ = run_ica(
+            raw_before,
+            config.ica,
+            ica_cache,
+            hash_config_sections(*upstream_sections, StepASR(enabled=False)),
+        )
 
     if config.interpolation.enabled:
         print(f"\nStep 08: Interpolating bad channels")
-        raw_after = interpolate_bad_channels(raw_after, config.interpolation)
-        raw_before = interpolate_bad_channels(raw_before, config.interpolation)
+        interpolation_cache = get_cache_folder(bids_root, "interpolation")
+        raw_after = interpolate_bad_channels(
+            raw_after, config.interpolation, interpolation_cache
+        )
+        raw_before = interpolate_bad_channels(
+            raw_before, config.interpolation, interpolation_cache
+        )
 
     print(f"\nStep 09: Epoching")
-    epochs_after, _, _ = epoch_data(raw_after, bids_path, config.epoching)
-    epochs_before, _, _ = epoch_data(raw_before, bids_path, config.epoching)
+    # Both branches share the same events, so parse events.tsv only once
+    event_index = load_event_index(
+        bids_path, config.epoching, get_cache_folder(bids_root, "events")
+    )
+    epochs_after, _, _ = epoch_data(
+        raw_after, bids_path, config.epoching, event_index
+    )
+    epochs_before, _, _ = epoch_data(
+        raw_before, bids_path, config.epoching, event_index
+    )
 
     return epochs_after, epochs_before, raw_after
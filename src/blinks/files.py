@@ -1,82 +1,60 @@
 """File I/O utilities for blink-labelled epoch data.
 
-Handles saving and loading of epoch files that have been split into
-blink-present and blink-absent subsets. Files are named with suffixes
-indicating whether ASR was enabled and whether the epochs contain
-blinks.
+Handles saving and loading of epoch files labelled with detected
+blinks. Each subject's epochs are stored once, with the blink overlap
+of every epoch in the epochs metadata (columns "blink", "n_blinks"
+and "blink_duration"), so blink and blink-free subsets are selected
+by indexing. Files are named with a suffix indicating whether ASR
+was enabled.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
 from os.path import isdir, isfile
-from mne import Epochs, read_epochs
+from mne import Epochs, EpochsArray, pick_info, read_epochs
 from mne.epochs import EpochsFIF
 
 from utils.utils import get_subject_list
 
 
-def get_filename(
-    output_folder: str, subject_id: str, with_asr: bool, with_blinks: bool
-) -> str:
+def get_filename(output_folder: str, subject_id: str, with_asr: bool) -> str:
     """Generate a standardized filename for blink-labeled epoch files.
 
     Produces filenames like:
-    ``sub-001_ASR_with_blinks_epo.fif`` or
-    ``sub-002_without_blinks_epo.fif``
+    ``sub-001_ASR_blinks_epo.fif`` or ``sub-002_blinks_epo.fif``
 
     Args:
         output_folder (str): Directory containing the epoch files.
         subject_id (str): Zero-padded subject identifier (e.g. "001").
         with_asr (bool): Whether the epochs were processed with ASR.
             Adds an "_ASR" suffix when True.
-        with_blinks (bool): Whether the file contains epochs that
-            overlap with detected blinks (True) or blink-free epochs
-            (False).
 
     Returns:
         str: Full file path for the epoch file.
     """
-    return f"{output_folder}/sub-{subject_id}{"_ASR" if with_asr else ""}_{"with" if with_blinks else "without"}_blinks_epo.fif"
+    return f"{output_folder}/sub-{subject_id}{"_ASR" if with_asr else ""}_blinks_epo.fif"
 
 
 def save_blink_epochs(
-    output_folder: str,
-    subject_id: str,
-    epochs_with_blink: Epochs,
-    epochs_without_blink: Epochs,
-    with_asr: bool,
+    output_folder: str, subject_id: str, epochs: Epochs, with_asr: bool
 ) -> None:
-    """Save blink-present and blink-absent epoch subsets to disk.
-
-    Writes two FIF files per subject: one containing epochs that
-    overlap with detected blinks, and one containing blink-free
-    epochs.
+    """Save blink-labelled epochs to disk.
 
     Args:
-        output_folder (str): Directory to save the epoch files into.
+        output_folder (str): Directory to save the epoch file into.
         subject_id (str): Zero-padded subject identifier (e.g. "001").
-        epochs_with_blink (Epochs): Epochs that overlap with at least
-            one detected blink.
-        epochs_without_blink (Epochs): Epochs with no detected blinks.
+        epochs (Epochs): Epochs with blink metadata, as returned by
+            label_blinks().
         with_asr (bool): Whether the epochs were processed with ASR.
             Affects the output filename.
     """
-    file_with_blinks = get_filename(
-        output_folder, subject_id, with_asr, with_blinks=True
-    )
-    file_without_blinks = get_filename(
-        output_folder, subject_id, with_asr, with_blinks=False
-    )
-
-    epochs_with_blink.save(file_with_blinks, overwrite=True)
-    epochs_without_blink.save(file_without_blinks, overwrite=True)
+    epochs.save(get_filename(output_folder, subject_id, with_asr), overwrite=True)
 
 
 def read_blink_epochs(
-    data_folder: str, subject_id: str, with_asr: bool
-) -> tuple[EpochsFIF, EpochsFIF]:
-    """Load blink-present and blink-absent epoch files for one subject.
-
-    Both files must exist; a FileNotFoundError is raised if either
-    is missing.
+    data_folder: str, subject_id: str, with_asr: bool, preload: bool = True
+) -> EpochsFIF:
+    """Load the blink-labelled epochs of one subject.
 
     Args:
         data_folder (str): Directory containing the blink-labeled
@@ -84,49 +62,39 @@ def read_blink_epochs(
         subject_id (str): Zero-padded subject identifier (e.g. "001").
         with_asr (bool): Whether to load epochs from the ASR-enabled
             pipeline branch.
+        preload (bool): Whether to load the data into memory. Without
+            preloading, subsets select epochs without reading them.
 
     Returns:
-        tuple[EpochsFIF, EpochsFIF]: A tuple of:
-            - Epochs that overlap with detected blinks.
-            - Epochs with no detected blinks.
+        EpochsFIF: Epochs with the blink metadata.
 
     Raises:
-        FileNotFoundError: If the data folder does not exist or
-            either epoch file is missing.
+        FileNotFoundError: If the data folder or the epoch file does
+            not exist.
     """
     if not isdir(data_folder):
         raise FileNotFoundError(f"{data_folder} is not a directory")
 
-    file_with_blinks = get_filename(data_folder, subject_id, with_asr, with_blinks=True)
-    file_without_blinks = get_filename(
-        data_folder, subject_id, with_asr, with_blinks=False
-    )
-
-    if isfile(file_with_blinks):
-        epochs_with_blinks = read_epochs(file_with_blinks, preload=True)
-    else:
-        raise FileNotFoundError(f"{data_folder} doesn't have file: {file_with_blinks}")
-
-    if isfile(file_without_blinks):
-        epochs_without_blinks = read_epochs(file_without_blinks, preload=True)
-    else:
-        raise FileNotFoundError(
-            f"{data_folder} doesn't have file: {file_without_blinks}"
-        )
+    file = get_filename(data_folder, subject_id, with_asr)
+    if not isfile(file):
+        raise FileNotFoundError(f"{data_folder} doesn't have file: {file}")
 
-    return (
-        epochs_with_blinks,
-        epochs_without_blinks,
-    )  # pyright: ignore[reportReturnType]
+    return read_epochs(file, preload=preload)  # pyright: ignore[reportReturnType]
 
 
 def load_all_epochs(
-    bids_root: str, output_folder: str, with_asr: bool
+    bids_root: str,
+    output_folder: str,
+    with_asr: bool,
+    channels: list[str] | None = None,
 ) -> tuple[dict[str, Epochs], dict[str, Epochs]]:
     """Load blink-labelled epochs for all subjects.
 
-    Iterates over all subjects in the BIDS dataset and loads both
-    blink-present and blink-absent epoch files for each.
+    Subjects are read concurrently in a thread pool (MAX_WORKERS
+    threads, default: 2). Files are opened without preloading and only
+    the requested channels are read, so memory stays bounded by the
+    channels actually needed, and each subject's epochs are split
+    into blink-present and blink-absent subsets.
 
     Args:
         bids_root (str): Root directory of the BIDS dataset, used
@@ -135,27 +103,68 @@ def load_all_epochs(
             epoch files.
         with_asr (bool): Whether to load epochs from the ASR-enabled
             pipeline branch.
+        channels (list[str] | None): Channels to load. Channels a
+            subject lacks are skipped. Defaults to all channels.
 
     Returns:
-        tuple[dict[int, Epochs], dict[int, Epochs]]: A tuple of:
-            - Dictionary mapping subject index to blink-present epochs.
-            - Dictionary mapping subject index to blink-absent epochs.
+        tuple[dict[str, Epochs], dict[str, Epochs]]: A tuple of:
+            - Dictionary mapping subject ID to blink-present epochs.
+            - Dictionary mapping subject ID to blink-absent epochs.
 
     Raises:
-        FileNotFoundError: If any subject's epoch files are missing.
+        FileNotFoundError: If any subject's epoch file is missing.
     """
-    with_blinks = {}
-    without_blinks = {}
-
     subject_ids = get_subject_list(bids_root)
 
-    for i, subject_id in enumerate(subject_ids):
-
-        epochs_with_blinks, epochs_without_blinks = read_blink_epochs(
-            output_folder, subject_id, with_asr
+    with ThreadPoolExecutor(max_workers=int(getenv("MAX_WORKERS", 2))) as executor:
+        loaded = executor.map(
+            lambda subject_id: read_blink_channels(
+                output_folder, subject_id, with_asr, channels
+            ),
+            subject_ids,
         )
-
-        with_blinks[str(i)] = epochs_with_blinks
-        without_blinks[str(i)] = epochs_without_blinks
+        with_blinks = {}
+        without_blinks = {}
+        for subject_id, epochs in zip(subject_ids, loaded):
+            has_blink = epochs.metadata["blink"].to_numpy()
+            with_blinks[subject_id] = epochs[has_blink]
+            without_blinks[subject_id] = epochs[~has_blink]
 
     return with_blinks, without_blinks
+
+
+def read_blink_channels(
+    data_folder: str,
+    subject_id: str,
+    with_asr: bool,
+    channels: list[str] | None = None,
+) -> EpochsArray:
+    """Read selected channels of one subject's blink-labelled epochs.
+
+    Args:
+        data_folder (str): Directory containing the blink-labeled
+            epoch files.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        with_asr (bool): Whether to load epochs from the ASR-enabled
+            pipeline branch.
+        channels (list[str] | None): Channels to read. Channels not
+            in the file are skipped. Defaults to all channels.
+
+    Returns:
+        EpochsArray: The selected channels with the events, event IDs
+            and blink metadata of the stored epochs.
+    """
+    epochs = read_blink_epochs(data_folder, subject_id, with_asr, preload=False)
+    if channels is None:
+        channels = epochs.ch_names
+    picks = [epochs.ch_names.index(ch) for ch in channels if ch in epochs.ch_names]
+
+    return EpochsArray(
+        epochs.get_data(picks=picks),
+        pick_info(epochs.info, picks),
+        events=epochs.events,
+        tmin=epochs.tmin,
+        event_id=epochs.event_id,
+        metadata=epochs.metadata,
+        verbose=False,
+    )
@@ -20,13 +20,15 @@ from matplotlib.axes import Axes
 
 from pipeline.step01_loading import load_data
 
+from utils.cache import get_cache_folder
 from utils.config import PipelineConfig
+from utils.intervals import merge_intervals
 from utils.utils import average_channel, pairwise_average
 
 from blinks.blinks import (
     epochs_have_blinks,
     process_subject_with_blinkdetection,
-    detect_blinks_on_raw,
+    detect_subject_blinks,
 )
 from blinks.files import load_all_epochs
 
@@ -82,9 +84,9 @@ def plot_average_data(
         bids_root (str): Root directory of the BIDS dataset. Used
             to derive the output folder path.
         epochs_with_blinks (dict[str, Epochs]): Mapping of subject
-            index to epochs that overlap with detected blinks.
+            ID to epochs that overlap with detected blinks.
         epochs_without_blinks (dict[str, Epochs]): Mapping of subject
-            index to blink-free epochs.
+            ID to blink-free epochs.
         with_asr (bool): Whether the epochs were processed with ASR.
             Affects the output filename and plot title.
     """
@@ -218,13 +220,23 @@ def plot_epochs_before_after(
     eog_picks: list[str],
     scale=1e6,
     figsize=(15, 15),
+    max_points=2000,
 ) -> tuple[Figure, Axes]:
     """Interactive epoch viewer comparing before/after ASR with blink overlay.
 
     Displays EEG and EOG channels for one epoch at a time, with the
     ASR-processed data in blue and the pre-ASR data in orange (dashed,
     EEG only). Detected blink intervals are shaded in red. Navigate
-    epochs with arrow keys, Page Up/Down, Home, and End.
+    epochs with arrow keys, Page Up/Down, Home, and End; "b"/"B" jump
+    to the next/previous epoch with a blink and "n"/"N" to the
+    next/previous epoch without one.
+
+    The traces of all epochs are extracted once up front, and moving
+    between epochs only updates the existing lines and blink spans
+    and redraws them with blitting. The y-axis covers the 5th
+    percentile of the epochs' minima to the 95th percentile of their
+    maxima, so large artifacts in a few epochs are clipped instead of
+    compressing the scale of all others.
 
     Args:
         subject_id (str): Zero-padded subject identifier, shown in
@@ -246,29 +258,45 @@ def plot_epochs_before_after(
             Defaults to 1e6 (Volts to µV).
         figsize (tuple[int, int]): Figure size in inches as
             (width, height). Defaults to (15, 15).
+        max_points (int): Maximum number of samples drawn per trace;
+            longer epochs are decimated for display. Defaults to 2000.
 
     Returns:
         tuple[Figure, Axes]: The matplotlib Figure and Axes objects
             for further customization if needed.
     """
     plot_chs = picks + eog_picks
-    picks_idx = [epochs_after.ch_names.index(ch) for ch in plot_chs]
-
-    times = epochs_after.times
+    step = max(1, -(-len(epochs_after.times) // max_points))
+    times = epochs_after.times[::step]
     n_epochs = len(epochs_after)
 
-    data_after = epochs_after.get_data()[:, picks_idx, :] * scale
-    data_before = epochs_before.get_data()[:, picks_idx, :] * scale
-
     fixed_spacing = 100
-    offsets = [0, fixed_spacing, 2 * fixed_spacing, 3 * fixed_spacing]
+    offsets = fixed_spacing * np.arange(len(plot_chs))
+
+    # (epochs, channels, times) traces of both branches, offset per channel
+    data_after = (
+        epochs_after.get_data(picks=plot_chs)[:, :, ::step] * scale
+        + offsets[:, None]
+    )
+    data_before = (
+        epochs_before.get_data(picks=picks)[:, :, ::step] * scale
+        + offsets[: len(picks), None]
+    )
 
     event_samples = epochs_after.events[:, 0]
     sfreq = epochs_after.info["sfreq"]
     epoch_start_times_raw = event_samples / sfreq + epochs_after.tmin
+    epoch_duration = epochs_after.times[-1] - epochs_after.times[0]
 
     has_blink = epochs_have_blinks(epochs_before, blink_intervals)
 
+    # Blinks overlapping each epoch: blinks[first[i]:last[i]]
+    blinks = merge_intervals(np.array(blink_intervals))
+    first = np.searchsorted(blinks[:, 1], epoch_start_times_raw, side="right")
+    last = np.searchsorted(
+        blinks[:, 0], epoch_start_times_raw + epoch_duration, side="left"
+    )
+
     # Interactive plot for each epoch to compare with/without ASR
     current = 0
     fig, ax = plt.subplots(figsize=figsize)
@@ -278,66 +306,113 @@ def plot_epochs_before_after(
         Line2D([0], [0], color="orange", linestyle="--", linewidth=1, label="Before"),
     ]
 
+    # Static parts of the plot, drawn once
+    ax.set_yticks(offsets)
+    ax.set_yticklabels(plot_chs)
+    ax.set_xlim(times[0], times[-1])
+    # Robust limits from the extremes of each epoch, so a few artifact
+    # epochs do not squash all others; their traces are clipped
+    lows = np.minimum(data_after.min(axis=(1, 2)), data_before.min(axis=(1, 2)))
+    highs = np.maximum(data_after.max(axis=(1, 2)), data_before.max(axis=(1, 2)))
+    ax.set_ylim(
+        min(np.percentile(lows, 5), offsets[0]) - fixed_spacing / 2,
+        max(np.percentile(highs, 95), offsets[-1]) + fixed_spacing / 2,
+    )
+    ax.set_xlabel("Time (s)")
+    ax.grid(True, linewidth=0.3, alpha=0.6)
+    ax.legend(handles=legend_handles, loc="upper right")
+
+    # Animated parts, updated in place when moving between epochs
+    lines_after = [
+        ax.plot(times, data_after[0, i], color="tab:blue", linewidth=0.9)[0]
+        for i in range(len(plot_chs))
+    ]
+    # Show before-ASR trace only for EEG channels
+    lines_before = [
+        ax.plot(
+            times, data_before[0, i], color="orange", linestyle="--", linewidth=0.9
+        )[0]
+        for i in range(len(picks))
+    ]
+    spans = [
+        ax.axvspan(0, 0, color="red", alpha=0.15, visible=False)
+        for _ in range(int((last - first).max(initial=0)))
+    ]
+    title = ax.set_title("")
+    animated = [*lines_after, *lines_before, *spans, title]
+    for artist in animated:
+        artist.set_animated(True)
+
+    background = None
+
+    def draw_animated() -> None:
+        """Draw the animated artists on top of the static background."""
+        for artist in animated:
+            fig.draw_artist(artist)
+
+    def on_draw(event) -> None:
+        """Capture the static background after a full redraw."""
+        nonlocal background
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+        draw_animated()
+
     def redraw(idx) -> None:
-        """Redraw the plot for the given epoch index."""
-        ax.cla()
-        for i, ch in enumerate(plot_chs):
-            ax.plot(
-                times,
-                data_after[idx, i, :] + offsets[i],
-                color="tab:blue",
-                linewidth=0.9,
-            )
-            # Show before-ASR trace only for EEG channels
-            if ch.startswith("PO"):
-                ax.plot(
-                    times,
-                    data_before[idx, i, :] + offsets[i],
-                    color="orange",
-                    linestyle="--",
-                    linewidth=0.9,
-                )
-
-        ax.set_yticks(offsets)
-        ax.set_yticklabels(plot_chs)
-        ax.set_xlim(times[0], times[-1])
-        ax.set_xlabel("Time (s)")
-        ax.set_title(
-            f"Epoch {idx+1} / {n_epochs}, with {"blink" if has_blink[idx] else "no blink"} for subject {subject_id}"
-        )
-        ax.grid(True, linewidth=0.3, alpha=0.6)
-        ax.legend(handles=legend_handles, loc="upper right")
+        """Show the given epoch index."""
+        for i, line in enumerate(lines_after):
+            line.set_ydata(data_after[idx, i])
+        for i, line in enumerate(lines_before):
+            line.set_ydata(data_before[idx, i])
 
         # Shade blink intervals that overlap with this epoch
         t0 = epoch_start_times_raw[idx]
-        t_end = t0 + (times[-1] - times[0])
-        for s, e in blink_intervals:
-            if e <= t0 or s >= t_end:
-                continue
-            ov_s = max(s, t0)
-            ov_e = min(e, t_end)
-            rel_s = ov_s - t0 + times[0]
-            rel_e = ov_e - t0 + times[0]
-            ax.axvspan(rel_s, rel_e, color="red", alpha=0.15)
-
-        fig.canvas.draw_idle()
+        overlapping = np.clip(blinks[first[idx] : last[idx]] - t0, 0, epoch_duration)
+        for span, (rel_s, rel_e) in zip(spans, overlapping + times[0]):
+            span.set_x(rel_s)
+            span.set_width(rel_e - rel_s)
+        for j, span in enumerate(spans):
+            span.set_visible(j < len(overlapping))
+
+        title.set_text(
+            f"Epoch {idx+1} / {n_epochs}, with {"blink" if has_blink[idx] else "no blink"} for subject {subject_id}"
+        )
+
+        if background is None:
+            fig.canvas.draw_idle()
+            return
+        fig.canvas.restore_region(background)
+        draw_animated()
+        fig.canvas.blit(fig.bbox)
+
+    def find_epoch(blink: bool, direction: int) -> int | None:
+        """Index of the next epoch in a direction with(out) a blink."""
+        candidates = np.flatnonzero(has_blink == blink)
+        if direction > 0:
+            candidates = candidates[candidates > current]
+            return int(candidates[0]) if len(candidates) else None
+        candidates = candidates[candidates < current]
+        return int(candidates[-1]) if len(candidates) else None
 
     def on_key(event) -> None:
         """Handle keyboard navigation between epochs."""
         nonlocal current
+        target = None
         if event.key in ("right", "pagedown") and current < n_epochs - 1:
-            current += 1
-            redraw(current)
+            target = current + 1
         elif event.key in ("left", "pageup") and current > 0:
-            current -= 1
-            redraw(current)
+            target = current - 1
         elif event.key == "home":
-            current = 0
-            redraw(current)
+            target = 0
         elif event.key == "end":
-            current = n_epochs - 1
+            target = n_epochs - 1
+        elif event.key in ("b", "B", "n", "N"):
+            target = find_epoch(
+                event.key.lower() == "b", 1 if event.key.islower() else -1
+            )
+        if target is not None:
+            current = target
             redraw(current)
 
+    fig.canvas.mpl_connect("draw_event", on_draw)
     fig.canvas.mpl_connect("key_press_event", on_key)
     redraw(0)
     plt.tight_layout()
@@ -362,20 +437,15 @@ def plot_eeg_plus_eog_one_subject(
         config (PipelineConfig): Pipeline configuration used for
             preprocessing.
     """
-    epochs_after, epochs_before, raw_after = process_subject_with_blinkdetection(
+    epochs_after, epochs_before, _ = process_subject_with_blinkdetection(
         bids_root, subject_id, config
     )
 
     eeg_chs = ["PO7", "PO8"]
     eog_chs = ["EOG5", "EOG6"]
 
-    blink_intervals, durations = detect_blinks_on_raw(
-        raw_after,
-        eog_chs=eog_chs,
-        l_freq=1.0,
-        h_freq=15.0,
-        envelope_smooth_ms=20.0,
-        mad_mult=6.0,
+    blink_intervals, durations = detect_subject_blinks(
+        bids_root, subject_id, get_cache_folder(bids_root, "blinks")
     )
 
     print("Detected blinks:", len(blink_intervals))
@@ -397,9 +467,9 @@ def all_subjects_plotting(
 ) -> None:
     """Load precomputed blink-labeled epochs and generate grand average plots.
 
-    Loads blink-present and blink-absent epochs for all subjects from
-    disk, then generates grand average ERP plots split by blink
-    condition.
+    Loads the PO7/PO8 channels of the blink-present and blink-absent
+    epochs of all subjects from disk, then generates grand average
+    ERP plots split by blink condition.
 
     Args:
         bids_root (str): Root directory of the BIDS dataset.
@@ -411,6 +481,6 @@ def all_subjects_plotting(
             pipeline branch.
     """
     epochs_with_blinks, epochs_without_blinks = load_all_epochs(
-        bids_root, output_folder, with_asr
+        bids_root, output_folder, with_asr, channels=["PO7", "PO8"]
     )
     plot_average_data(bids_root, epochs_with_blinks, epochs_without_blinks, with_asr)
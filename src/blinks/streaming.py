@@ -0,0 +1,365 @@
+"""Streaming blink detection over chunked EOG data.
+
+Detects blinks incrementally while EOG data arrives in chunks, e.g.
+read block by block from a recording on disk (non-preloaded or
+memory-mapped Raw) or during acquisition. The algorithm follows
+detect_blinks_on_raw() in blinks/blinks.py, adapted to a single pass:
+
+1. Band-pass filter with a causal Butterworth filter whose state is
+   carried across chunks (sosfilt with zi). Unlike the zero-phase
+   filter of the offline detector, this delays the signal slightly.
+2. Smooth the envelope (max absolute value across channels) with a
+   moving average, also carried across chunks and re-centered.
+3. Keep a running robust threshold (median + mad_mult * MAD) over the
+   envelope of the last history_s seconds, recomputed at fixed sample
+   positions so the result does not depend on the chunk size.
+4. Report each run of the envelope above the baseline level
+   (median + 0.5 * MAD) that exceeds the threshold as a blink, from
+   the last sample below the baseline to the first one after it.
+5. Merge blinks separated by at most merge_gap_s.
+
+Typical usage:
+    for start, end in detect_blinks_streaming(iter_eog_chunks(raw, eog_chs), sfreq):
+        print(f"Blink {start:.2f}-{end:.2f} s")
+"""
+
+from typing import Iterable, Iterator
+
+from mne.io import BaseRaw
+from mne_bids import BIDSPath, read_raw_bids
+import numpy as np
+from scipy import signal
+
+
+class StreamingBlinkDetector:
+    """Stateful single-pass blink detector.
+
+    Feed consecutive chunks of EOG data to process() and call flush()
+    at the end of the recording. Both return the blink intervals that
+    are complete, as (start_seconds, end_seconds) pairs relative to
+    the first sample fed, in chronological order.
+
+    Attributes:
+        sfreq (float): Sampling frequency in Hz.
+        n_samples (int): Number of samples processed so far.
+    """
+
+    def __init__(
+        self,
+        sfreq: float,
+        l_freq: float = 1.0,
+        h_freq: float = 15.0,
+        envelope_smooth_ms: float = 20.0,
+        mad_mult: float = 6.0,
+        merge_gap_s: float = 0.02,
+        history_s: float = 60.0,
+        threshold_update_s: float = 1.0,
+        warmup_s: float = 10.0,
+        filter_order: int = 4,
+    ) -> None:
+        """Set up the filter and threshold state.
+
+        Args:
+            sfreq (float): Sampling frequency in Hz.
+            l_freq (float): Lower band-pass frequency in Hz.
+            h_freq (float): Upper band-pass frequency in Hz.
+            envelope_smooth_ms (float): Moving average window width in
+                milliseconds for the amplitude envelope.
+            mad_mult (float): Multiplier for the MAD-based peak
+                threshold.
+            merge_gap_s (float): Maximum gap in seconds between
+                adjacent blinks before they are merged.
+            history_s (float): Length in seconds of the envelope
+                history the running median and MAD are computed over.
+            threshold_update_s (float): Interval in seconds at which
+                the median and MAD are recomputed. Updates happen at
+                fixed sample positions, also within a chunk, so the
+                detected blinks do not depend on the chunk size.
+            warmup_s (float): Seconds of data collected before the
+                first threshold is computed, so it is meaningful from
+                the start. These samples are detected retroactively
+                with that threshold.
+            filter_order (int): Order of the Butterworth band-pass.
+        """
+        self.sfreq = sfreq
+        self.n_samples = 0
+        self._mad_mult = mad_mult
+        self._merge_gap_s = merge_gap_s
+
+        self._sos = signal.butter(
+            filter_order, [l_freq, h_freq], btype="bandpass", fs=sfreq, output="sos"
+        )
+        self._zi: np.ndarray | None = None
+
+        self._win = max(1, int(round(envelope_smooth_ms * 1e-3 * sfreq)))
+        self._env_tail = np.zeros(self._win - 1)
+
+        # Ring buffer of the envelope history, decimated to ~32 Hz
+        self._history_step = max(1, int(sfreq // 32))
+        self._history = np.empty(max(1, int(history_s * sfreq / self._history_step)))
+        self._history_len = 0
+        self._history_pos = 0
+        self._history_phase = 0
+
+        # The threshold is recomputed at sample warmup, then every
+        # threshold_step samples; until the first update the envelope
+        # is held back in the backlog
+        self._threshold_step = max(1, int(threshold_update_s * sfreq))
+        self._threshold_due = int(warmup_s * sfreq)
+        self._backlog: list[np.ndarray] | None = []
+        self._n_detected = 0
+
+        # Detection state: whether the envelope was above the baseline
+        # at the end of the last chunk, where that run started and
+        # its maximum so far, and the last blink not yet reported
+        self._thresh = np.inf
+        self._baseline = np.inf
+        self._above = False
+        self._run_start = 0
+        self._run_peak = -np.inf
+        self._pending: tuple[int, int] | None = None
+
+    def process(self, chunk: np.ndarray) -> list[tuple[float, float]]:
+        """Consume a chunk of EOG data.
+
+        Args:
+            chunk (np.ndarray): EOG data of shape (n_channels,
+                n_times), contiguous with the previous chunk.
+
+        Returns:
+            list[tuple[float, float]]: Blink intervals completed by
+                this chunk.
+        """
+        chunk = np.asarray(chunk, dtype=float)
+        if not chunk.shape[1]:
+            return []
+        env = self._envelope(chunk)
+
+        # Split the chunk where the threshold is due for an update
+        blinks = []
+        start = self.n_samples - len(env)
+        i = 0
+        while i < len(env):
+            if start + i == self._threshold_due:
+                self._update_threshold()
+                if self._backlog:
+                    blinks += self._detect(np.concatenate(self._backlog), final=False)
+                self._backlog = None
+            stop = min(len(env), self._threshold_due - start)
+            segment = env[i:stop]
+            self._update_history(segment)
+            if self._backlog is not None:
+                self._backlog.append(segment)
+            else:
+                blinks += self._detect(segment, final=False)
+            i = stop
+        return blinks
+
+    def flush(self) -> list[tuple[float, float]]:
+        """Finish the recording and return the remaining blinks.
+
+        Returns:
+            list[tuple[float, float]]: Blink intervals not yet
+                returned, including one still open at the end.
+        """
+        env = np.empty(0)
+        if self._backlog is not None:
+            # Recording shorter than the warmup
+            self._update_threshold()
+            env = np.concatenate(self._backlog) if self._backlog else env
+            self._backlog = None
+        return self._detect(env, final=True)
+
+    def _envelope(self, chunk: np.ndarray) -> np.ndarray:
+        """Filter a chunk and return its smoothed envelope."""
+        if self._zi is None:
+            # Start from the steady state of the first sample to avoid
+            # a transient at the start of the recording
+            self._zi = signal.sosfilt_zi(self._sos)[:, None, :] * chunk[:, :1]
+        filtered, self._zi = signal.sosfilt(self._sos, chunk, axis=-1, zi=self._zi)
+        self.n_samples += chunk.shape[1]
+
+        env = np.concatenate((self._env_tail, np.max(np.abs(filtered), axis=0)))
+        smooth = np.convolve(env, np.ones(self._win) / self._win, mode="valid")
+        self._env_tail = env[len(env) - (self._win - 1) :]
+        return smooth
+
+    def _update_history(self, env: np.ndarray) -> None:
+        """Add the envelope of a chunk to the threshold history."""
+        values = env[self._history_phase :: self._history_step]
+        self._history_phase = (self._history_phase - len(env)) % self._history_step
+        values = values[-len(self._history) :]
+
+        end = self._history_pos + len(values)
+        first = min(len(values), len(self._history) - self._history_pos)
+        self._history[self._history_pos : self._history_pos + first] = values[:first]
+        self._history[: len(values) - first] = values[first:]
+        self._history_pos = end % len(self._history)
+        self._history_len = min(len(self._history), self._history_len + len(values))
+
+    def _update_threshold(self) -> None:
+        """Recompute the threshold and baseline from the history."""
+        self._threshold_due += self._threshold_step
+        if not self._history_len:
+            return
+        history = self._history[: self._history_len]
+        med = np.median(history)
+        mad = np.median(np.abs(history - med))
+        self._thresh = med + self._mad_mult * mad
+        self._baseline = med + 0.5 * mad
+
+    def _detect(self, env: np.ndarray, final: bool) -> list[tuple[float, float]]:
+        """Find the blinks in the next envelope samples.
+
+        Args:
+            env (np.ndarray): Smoothed envelope following the samples
+                already detected on.
+            final (bool): Whether this is the end of the recording.
+
+        Returns:
+            list[tuple[float, float]]: Completed blink intervals.
+        """
+        blinks: list[tuple[int, int]] = []
+        offset = self._n_detected
+        self._n_detected += len(env)
+
+        if len(env):
+            above = env > self._baseline
+
+            # Runs above the baseline: starts and ends (exclusive) in
+            # this chunk, including one continued from the last chunk
+            changes = np.flatnonzero(np.diff(np.concatenate(([self._above], above))))
+            starts = changes[above[changes]]
+            ends = changes[~above[changes]]
+            if self._above:
+                starts = np.concatenate(([0], starts))
+            if above[-1]:
+                ends = np.concatenate((ends, [len(env)]))
+
+            if len(starts):
+                peaks = np.maximum.reduceat(np.where(above, env, -np.inf), starts)
+                run_starts = offset + starts - 1
+                if self._above:
+                    peaks[0] = max(peaks[0], self._run_peak)
+                    run_starts[0] = self._run_start
+                done = ends < len(env)
+                hits = done & (peaks > self._thresh)
+                blinks = list(zip(run_starts[hits], offset + ends[hits]))
+
+                if not done[-1]:
+                    self._run_start, self._run_peak = run_starts[-1], peaks[-1]
+            self._above = bool(above[-1])
+
+        # A run still above the baseline ends with the recording
+        if final and self._above and self._run_peak > self._thresh:
+            blinks.append((self._run_start, self.n_samples - 1))
+
+        return self._merge(blinks, final)
+
+    def _merge(
+        self, blinks: list[tuple[int, int]], final: bool
+    ) -> list[tuple[float, float]]:
+        """Merge nearby blinks and convert them to seconds.
+
+        The last blink is held back until the next one starts too late
+        to be merged with it, or the recording ends.
+        """
+        merged = []
+        gap = self._merge_gap_s * self.sfreq
+        for start, end in blinks:
+            if self._pending is not None and start <= self._pending[1] + gap:
+                self._pending = (self._pending[0], max(self._pending[1], end))
+            else:
+                if self._pending is not None:
+                    merged.append(self._pending)
+                self._pending = (start, end)
+        if final and self._pending is not None:
+            merged.append(self._pending)
+            self._pending = None
+
+        # Moving average outputs are centered on the window
+        shift = (self._win - 1) // 2
+        return [
+            (max(0, s - shift) / self.sfreq, max(0, e - shift) / self.sfreq)
+            for s, e in merged
+        ]
+
+
+def detect_blinks_streaming(
+    chunks: Iterable[np.ndarray], sfreq: float, **kwargs
+) -> Iterator[tuple[float, float]]:
+    """Detect blinks over a stream of EOG chunks.
+
+    Args:
+        chunks (Iterable[np.ndarray]): Consecutive EOG chunks of
+            shape (n_channels, n_times).
+        sfreq (float): Sampling frequency in Hz.
+        **kwargs: Passed to StreamingBlinkDetector.
+
+    Yields:
+        tuple[float, float]: (start_seconds, end_seconds) of each
+            blink, as soon as it is complete.
+    """
+    detector = None
+    for chunk in chunks:
+        if detector is None:
+            detector = StreamingBlinkDetector(sfreq, **kwargs)
+        yield from detector.process(chunk)
+    if detector is not None:
+        yield from detector.flush()
+
+
+def iter_eog_chunks(
+    raw: BaseRaw, eog_chs: list[str], chunk_s: float = 1.0
+) -> Iterator[np.ndarray]:
+    """Read EOG channels from a recording chunk by chunk.
+
+    With a non-preloaded Raw (or one preloaded into a memory-mapped
+    file), only one chunk is held in memory at a time.
+
+    Args:
+        raw (BaseRaw): Continuous data, preloaded or not.
+        eog_chs (list[str]): Names of the EOG channels.
+        chunk_s (float): Chunk length in seconds.
+
+    Yields:
+        np.ndarray: EOG data of shape (len(eog_chs), n_times).
+    """
+    step = max(1, int(chunk_s * raw.info["sfreq"]))
+    for start in range(0, raw.n_times, step):
+        yield raw.get_data(picks=eog_chs, start=start, stop=start + step)
+
+
+def stream_subject_blinks(
+    bids_root: str, subject_id: str, chunk_s: float = 1.0
+) -> list[tuple[float, float]]:
+    """Stream blink detection over a subject's recording on disk.
+
+    The recording is not preloaded; the EOG channels (EXG5/EXG6 in
+    the raw files, see step01_loading.py) are read chunk by chunk and
+    each blink is printed as soon as it is detected.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        chunk_s (float): Chunk length in seconds.
+
+    Returns:
+        list[tuple[float, float]]: All detected (start_seconds,
+            end_seconds) blink intervals.
+    """
+    bids_path = BIDSPath(
+        subject=subject_id,
+        root=bids_root,
+        datatype="eeg",
+        suffix="eeg",
+        task="jacobsen",
+    )
+    raw = read_raw_bids(bids_path, verbose=False)
+
+    blinks = []
+    chunks = iter_eog_chunks(raw, ["EXG5", "EXG6"], chunk_s)
+    for start, end in detect_blinks_streaming(chunks, raw.info["sfreq"]):
+        print(f"Blink {len(blinks) + 1}: {start:.2f}-{end:.2f} s")
+        blinks.append((start, end))
+    return blinks
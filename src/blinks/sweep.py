@@ -0,0 +1,179 @@
+"""Parameter sweep of the blink detector across subjects.
+
+Evaluates a grid of detect_blinks_on_raw() settings (MAD multiplier,
+envelope smoothing, minimum peak distance and merge gap) on every
+subject. Each subject's EOG is read and band-pass filtered once, the
+envelope is smoothed once per smoothing width and its median/MAD
+computed once, and peak search, interval expansion and merging are
+repeated per setting, so the results match running the detector on
+each setting separately.
+
+Typical usage:
+    sweep = blink_parameter_sweep(bids_root, config_path, [4, 6], [20], [0.05], [0.02])
+    sweep.groupby("mad_mult")["n_blinks"].mean()
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from os import getenv
+
+from mne_bids import BIDSPath
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+from pipeline.step09_epoching import load_event_index
+
+from utils.cache import get_cache_folder
+from utils.config import load_config
+from utils.intervals import interval_overlap, merge_intervals
+from utils.utils import get_subject_list
+
+from blinks.blinks import (
+    BLINK_DETECTION,
+    eog_envelope,
+    expand_peaks,
+    load_eog,
+    smooth_envelope,
+)
+
+
+def blink_parameter_sweep(
+    bids_root: str,
+    config_path: str,
+    mad_mults: list[float],
+    envelope_smooth_ms: list[float],
+    min_distances_s: list[float],
+    merge_gaps_s: list[float],
+    subject_ids: list[str] | None = None,
+) -> pd.DataFrame:
+    """Run the blink detector over a parameter grid for all subjects.
+
+    Subjects are processed in parallel worker processes (MAX_WORKERS,
+    default: 2). Detection runs on the unprocessed EOG channels, like
+    detect_subject_blinks(), with its band-pass settings.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        config_path (str): Path to the TOML config whose epoching
+            settings define the epochs that blinks are counted in.
+        mad_mults (list[float]): MAD multipliers of the peak
+            threshold.
+        envelope_smooth_ms (list[float]): Envelope smoothing widths
+            in milliseconds.
+        min_distances_s (list[float]): Minimum peak distances in
+            seconds.
+        merge_gaps_s (list[float]): Merge gaps in seconds.
+        subject_ids (list[str] | None): Zero-padded subject
+            identifiers. Defaults to all subjects of the dataset.
+
+    Returns:
+        pd.DataFrame: One row per subject and setting with columns
+            subject, envelope_smooth_ms, mad_mult, min_distance_s,
+            merge_gap_s, n_blinks, blinks_per_minute,
+            mean_duration_s, median_duration_s and
+            affected_epochs (fraction of all epochs, before trial
+            rejection, that overlap a blink).
+    """
+    if subject_ids is None:
+        subject_ids = get_subject_list(bids_root)
+    grid = (mad_mults, envelope_smooth_ms, min_distances_s, merge_gaps_s)
+
+    with ProcessPoolExecutor(max_workers=int(getenv("MAX_WORKERS", 2))) as executor:
+        tables = list(
+            executor.map(
+                sweep_subject,
+                [bids_root] * len(subject_ids),
+                [config_path] * len(subject_ids),
+                subject_ids,
+                [grid] * len(subject_ids),
+            )
+        )
+    return pd.concat(tables, ignore_index=True)
+
+
+def sweep_subject(
+    bids_root: str,
+    config_path: str,
+    subject_id: str,
+    grid: tuple[list[float], list[float], list[float], list[float]],
+) -> pd.DataFrame:
+    """Evaluate the parameter grid on one subject.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        config_path (str): Path to the TOML configuration file.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        grid (tuple): MAD multipliers, smoothing widths, minimum peak
+            distances and merge gaps, see blink_parameter_sweep().
+
+    Returns:
+        pd.DataFrame: The subject's rows of the sweep table.
+    """
+    mad_mults, smooth_widths, min_distances, merge_gaps = grid
+    config = load_config(config_path)
+    bids_path = BIDSPath(
+        subject=subject_id,
+        root=bids_root,
+        datatype="eeg",
+        suffix="eeg",
+        task="jacobsen",
+    )
+
+    raw = load_eog(bids_path)
+    sfreq = raw.info["sfreq"]
+    minutes = raw.n_times / sfreq / 60
+    env = eog_envelope(
+        raw, ["EOG5", "EOG6"], BLINK_DETECTION["l_freq"], BLINK_DETECTION["h_freq"]
+    )
+
+    # Epoch windows in recording time, from the unrounded event onsets
+    event_index = load_event_index(
+        bids_path, config.epoching, get_cache_folder(bids_root, "events")
+    )
+    onsets = event_index.onsets
+    windows = np.column_stack(
+        (
+            onsets + config.epoching.epochrange_tmin,
+            onsets + config.epoching.epochrange_tmax,
+        )
+    )
+
+    rows = []
+    for smooth_ms in smooth_widths:
+        env_smooth = smooth_envelope(env, sfreq, smooth_ms)
+        med = np.median(env_smooth)
+        mad = np.median(np.abs(env_smooth - med))
+        baseline_level = med + 0.5 * mad
+
+        for mad_mult, min_distance in product(mad_mults, min_distances):
+            peaks, _ = signal.find_peaks(
+                env_smooth,
+                height=med + mad_mult * mad,
+                distance=int(round(min_distance * sfreq)),
+            )
+            intervals = expand_peaks(env_smooth, peaks, baseline_level) / sfreq
+
+            for merge_gap in merge_gaps:
+                merged = merge_intervals(intervals, merge_gap)
+                durations = merged[:, 1] - merged[:, 0]
+                counts, _ = interval_overlap(windows, merged)
+                rows.append(
+                    {
+                        "subject": subject_id,
+                        "envelope_smooth_ms": smooth_ms,
+                        "mad_mult": mad_mult,
+                        "min_distance_s": min_distance,
+                        "merge_gap_s": merge_gap,
+                        "n_blinks": len(merged),
+                        "blinks_per_minute": len(merged) / minutes,
+                        "mean_duration_s": durations.mean() if len(merged) else np.nan,
+                        "median_duration_s": (
+                            np.median(durations) if len(merged) else np.nan
+                        ),
+                        "affected_epochs": (
+                            (counts > 0).mean() if len(windows) else np.nan
+                        ),
+                    }
+                )
+    return pd.DataFrame(rows)
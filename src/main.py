@@ -8,6 +8,8 @@ and view statistics. Supports parallel execution across subjects.
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from time import time
 
+import numpy as np
+
 from os import mkdir, getenv
 from os.path import isdir
 
@@ -15,12 +17,19 @@ from pipeline.analyze_subject import (
     run_pipeline,
     plot_specific_subject,
     plot_average_data,
+    plot_subjects_batch,
 )
+from pipeline.compare_configs import build_comparison_report
+from utils.files import update_run_stats
+from utils.plots import rejection_sweep_plot
+from utils.render import PlotJob, render_jobs
 from utils.utils import (
     get_subject_list,
     get_config_ids,
     get_config_path,
+    compare_run_statistics,
     pipeline_statistics,
+    rejection_threshold_sweep,
 )
 from utils.config import load_config
 
@@ -54,6 +63,10 @@ def main():
     print("6 - Generate plot for specific config (combined subjects)")
     print("7 - Generate plot for all configs (combined subjects)")
     print("8 - Print pipeline statistics for specific config")
+    print("9 - Sweep trial rejection thresholds for specific config")
+    print("10 - Compare pipeline statistics across all configs")
+    print("11 - Build comparison report across all configs (table and plots)")
+    print("12 - Generate plots for all configs (all subjects, only outdated)")
     i = input(": ")
     if i.lower() == "1":
         c = int(input("Config ID: "))
@@ -72,12 +85,14 @@ def main():
         config = load_config(get_config_path(config_root, c))
         s = f"{int(input("Subject ID: ")):03d}"
         start_time = time()
-        run_pipeline(config, bids_root, c, s)
+        run_stats = run_pipeline(config, bids_root, c, s)
+        update_run_stats(f"{bids_root}/processed/{c}", [run_stats])
         total_time = time() - start_time
         print(f"\nElapsed time: {total_time} seconds\n")
     elif i.lower() == "4":
         s = f"{int(input("Subject ID: ")):03d}"
         tasks = [(get_config_path(config_root, c), bids_root, c, s) for c in configs]
+        run_parallel(tasks)
     elif i.lower() == "5":
         c = int(input("Config ID: "))
         config = load_config(get_config_path(config_root, c))
@@ -88,18 +103,77 @@ def main():
         config = load_config(get_config_path(config_root, c))
         plot_average_data(config, bids_root + "/processed", c)
     elif i.lower() == "7":
-        for c in configs:
-            if not isdir(bids_root + "/processed/" + str(c)):
-                continue
-            config = load_config(get_config_path(config_root, c))
-            plot_average_data(config, bids_root + "/processed", c)
+        # One job per config; each renders its own figures in-process
+        jobs: list[PlotJob] = [
+            (
+                plot_average_data,
+                (
+                    load_config(get_config_path(config_root, c)),
+                    bids_root + "/processed",
+                    c,
+                    1,
+                ),
+            )
+            for c in configs
+            if isdir(bids_root + "/processed/" + str(c))
+        ]
+        render_jobs(jobs)
     elif i.lower() == "8":
         c = int(input("Config ID: "))
         pipeline_statistics(bids_root, c)
+    elif i.lower() == "9":
+        c = int(input("Config ID: "))
+        config = load_config(get_config_path(config_root, c))
+        sweep_thresholds(bids_root, c, config.trial_rejection.flat_threshold)
+    elif i.lower() == "10":
+        print(compare_run_statistics(bids_root, configs).round(2).to_string())
+    elif i.lower() == "11":
+        summary, _ = build_comparison_report(bids_root, configs)
+        print(summary.round(2).to_string())
+    elif i.lower() == "12":
+        config_paths = {c: get_config_path(config_root, c) for c in configs}
+        plot_subjects_batch(config_paths, bids_root + "/processed", subjects)
     else:
         print("Invalid input")
 
 
+def sweep_thresholds(bids_root: str, config_id: int, flat_threshold: float):
+    """Evaluate a grid of trial rejection thresholds for one config.
+
+    Writes the full table to rejection_sweep.csv and a plot to
+    rejection_sweep.png in the config's output directory, and prints
+    the overall rejection rate per EEG/EOG threshold pair.
+
+    Args:
+        bids_root: Root directory of the BIDS dataset.
+        config_id: Numeric identifier of the processed config.
+        flat_threshold: Flat threshold in Volts shown in the printed
+            table and the plot.
+    """
+    output_folder = f"{bids_root}/processed/{config_id}"
+    sweep = rejection_threshold_sweep(
+        bids_root,
+        config_id,
+        eeg_thresholds=np.arange(50, 301, 25) * 1e-6,
+        eog_thresholds=np.arange(100, 501, 50) * 1e-6,
+        flat_thresholds=np.array(sorted({0.5e-6, 1e-6, 2e-6, flat_threshold})),
+    )
+    sweep.to_csv(f"{output_folder}/rejection_sweep.csv", index=False)
+    rejection_sweep_plot(f"{output_folder}/rejection_sweep.png", sweep, flat_threshold)
+
+    totals = (
+        sweep[np.isclose(sweep["flat_threshold"], flat_threshold)]
+        .groupby(["eeg_threshold", "eog_threshold"])[["n_rejected", "n_epochs"]]
+        .sum()
+    )
+    rates = (totals["n_rejected"] / totals["n_epochs"] * 100).unstack()
+    rates.index = [f"EEG {v * 1e6:.0f} µV" for v in rates.index]
+    rates.columns = [f"EOG {v * 1e6:.0f} µV" for v in rates.columns]
+    print(f"\nRejected trials (%), flat < {flat_threshold * 1e6:.1f} µV:")
+    print(rates.round(1).to_string())
+    print(f"\nFull table written to {output_folder}/rejection_sweep.csv")
+
+
 def process_subject(config_path: str, bids_root: str, config_id: int, subject_id: str):
     """Run the pipeline for a single subject in a worker process.
 
@@ -114,15 +188,16 @@ def process_subject(config_path: str, bids_root: str, config_id: int, subject_id
         subject_id: Zero-padded subject identifier (e.g. "001").
 
     Returns:
-        A tuple of (subject_id, config_id, error_message). The error
-        message is None on success, or a string description on failure.
+        A tuple of (subject_id, config_id, error_message, run_stats).
+        The error message is None on success, or a string description
+        on failure, in which case run_stats is None.
     """
     config = load_config(config_path)
     try:
-        run_pipeline(config, bids_root, config_id, subject_id)
-        return subject_id, config_id, None
+        run_stats = run_pipeline(config, bids_root, config_id, subject_id)
+        return subject_id, config_id, None, run_stats
     except Exception as e:
-        return subject_id, config_id, str(e)
+        return subject_id, config_id, str(e), None
 
 
 def run_parallel(tasks: list[tuple[str, str, int, str]]):
@@ -130,7 +205,9 @@ def run_parallel(tasks: list[tuple[str, str, int, str]]):
 
     The number of workers is controlled by the MAX_WORKERS environment
     variable (default: 2). Each task runs in a separate process to
-    avoid GIL contention on CPU-bound EEG processing.
+    avoid GIL contention on CPU-bound EEG processing. Run statistics
+    are added to each config's table by this (parent) process as
+    subjects finish, so workers never write the table concurrently.
 
     Args:
         tasks: List of (config_path, bids_root, config_id, subject_id)
@@ -143,10 +220,12 @@ def run_parallel(tasks: list[tuple[str, str, int, str]]):
         futures = {executor.submit(process_subject, *task): task for task in tasks}
 
         for future in as_completed(futures):
-            subject_id, config_id, error = future.result()
+            subject_id, config_id, error, run_stats = future.result()
             if error:
                 print(f"FAILED config={config_id} subject={subject_id}: {error}")
             else:
+                bids_root = futures[future][1]
+                update_run_stats(f"{bids_root}/processed/{config_id}", [run_stats])
                 print(f"DONE   config={config_id} subject={subject_id}")
 
     total_time = time() - start_time
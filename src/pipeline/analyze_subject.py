@@ -5,10 +5,14 @@ steps in sequence, as well as functions for generating per-subject
 and grand-average plots from processed data.
 """
 
+from contextlib import contextmanager
+from glob import glob
 from os import mkdir
-from os.path import isdir
+from os.path import dirname, getmtime, isdir, isfile
+from time import perf_counter
+
 from mne.preprocessing import ICA
-from mne_bids import BIDSPath
+from mne_bids import BIDSPath, read_raw_bids
 
 from pipeline.step01_loading import load_data
 from pipeline.step02_badchannels import detect_bad_channels
@@ -21,8 +25,16 @@ from pipeline.step08_interpolation import interpolate_bad_channels
 from pipeline.step09_epoching import epoch_data
 from pipeline.step10_trialrejection import reject_trials
 
-from utils.config import PipelineConfig
-from utils.files import save_data, read_data, read_all_files_per_type
+from utils.cache import get_cache_folder, hash_config_sections
+from utils.config import PipelineConfig, load_config
+from utils.files import (
+    REJECTION_STAT_KEYS,
+    artifact_path,
+    save_data,
+    save_psd,
+    read_artifact,
+    read_all_files_per_type,
+)
 from utils.plots import (
     power_spectral_density_plot,
     ica_topography_plot,
@@ -31,13 +43,15 @@ from utils.plots import (
     all_channel_erp_plot,
     plot_channel,
     plot_topomap,
+    unprocessed_vs_processed_plot,
 )
-from utils.utils import pairwise_average, average_channel
+from utils.render import PlotJob, render_jobs
+from utils.utils import pairwise_average, average_channel, welch_psd
 
 
 def run_pipeline(
     config: PipelineConfig, bids_root: str, config_id: int, subject_id: str
-) -> None:
+) -> dict:
     """Execute the full EEG preprocessing pipeline for a single subject.
 
     Runs each enabled step in order: loading, bad channel detection,
@@ -52,6 +66,12 @@ def run_pipeline(
         config_id (int): Numeric config identifier, used to create
             the output subdirectory (e.g. ``processed/1/``).
         subject_id (str): Zero-padded subject identifier (e.g. "001").
+
+    Returns:
+        dict: Run statistics of this subject (one row of the config's
+            run statistics table, see update_run_stats()): bad
+            channels, ICA components excluded, epoch and rejection
+            counts, and the runtime of each step in seconds.
     """
     output_folder = f"{bids_root}/processed/{config_id}"
     if not isdir(output_folder):
@@ -69,61 +89,125 @@ def run_pipeline(
     print(f"# Config: {config_id} | Subject: {subject_id}")
     print("#")
 
+    step_times: dict[str, float] = {}
+    start_time = perf_counter()
+
     print("\nStep 01: Loading data")
-    raw = load_data(bids_path)
+    with _timed(step_times, "loading"):
+        raw = load_data(bids_path)
 
     if config.bad_channels.enabled:
         print("\nStep 02: Detecting bad channels")
-        raw = detect_bad_channels(raw, config.bad_channels)
+        with _timed(step_times, "bad_channels"):
+            raw = detect_bad_channels(raw, config.bad_channels)
+    bad_channels = list(raw.info["bads"])
 
     if config.filtering.enabled:
         print(f"\nStep 03: Filtering")
-        raw = filter_data(raw, config.filtering)
+        with _timed(step_times, "filtering"):
+            raw = filter_data(raw, config.filtering)
 
     if config.downsampling.enabled:
         print(f"\nStep 04: Downsampling")
-        raw = downsample_data(raw, config.downsampling)
+        with _timed(step_times, "downsampling"):
+            raw = downsample_data(raw, config.downsampling)
 
     if config.rereferencing.enabled:
         print(f"\nStep 05: Rereferencing")
-        raw = rereference_data(raw, config.rereferencing)
+        with _timed(step_times, "rereferencing"):
+            raw = rereference_data(raw, config.rereferencing)
 
     if config.asr.enabled:
         print(f"\nStep 06: Artifact correction")
-        raw, asr = run_asr(raw, config.asr)
+        with _timed(step_times, "asr"):
+            raw, asr = run_asr(raw, config.asr)
 
-    number_excluded_components = None
+    ica_log: dict = {"ica_components_excluded": None}
     ica: ICA | None = None
     if config.ica.enabled:
         print(f"\nStep 07: ICA cleaning")
-        raw, ica, number_excluded_components = run_ica(raw, config.ica)
+        upstream_hash = hash_config_sections(
+            config.bad_channels,
+            config.filtering,
+            config.downsampling,
+            config.rereferencing,
+            config.asr,
+        )
+        with _timed(step_times, "ica"):
+            raw, ica, ica_log = run_ica(
+                raw, config.ica, get_cache_folder(bids_root, "ica"), upstream_hash
+            )
 
     if config.interpolation.enabled:
         print(f"\nStep 08: Interpolating bad channels")
-        raw = interpolate_bad_channels(raw, config.interpolation)
+        with _timed(step_times, "interpolation"):
+            raw = interpolate_bad_channels(
+                raw, config.interpolation, get_cache_folder(bids_root, "interpolation")
+            )
 
     print(f"\nStep 09: Epoching")
-    epochs, events, event_dict = epoch_data(raw, bids_path, config.epoching)
+    with _timed(step_times, "epoching"):
+        epochs, events, event_dict = epoch_data(raw, bids_path, config.epoching)
 
+    run_stats: dict = {"n_epochs_before": len(epochs)}
     pipeline_stats: dict | None = None
     if config.trial_rejection.enabled:
         print(f"\nStep 10: Trial rejection")
-        epochs, reject_log = reject_trials(epochs, config.trial_rejection)
+        with _timed(step_times, "trial_rejection"):
+            epochs, reject_log = reject_trials(epochs, config.trial_rejection)
 
         pipeline_stats = reject_log
-        pipeline_stats["ica_components_excluded"] = number_excluded_components
+        pipeline_stats.update(ica_log)
+        run_stats.update({k: v for k, v in reject_log.items() if k in REJECTION_STAT_KEYS})
+
+    with _timed(step_times, "saving"):
+        save_data(output_folder, subject_id, epochs, raw, ica, pipeline_stats)
+    with _timed(step_times, "psd"):
+        save_psd(output_folder, subject_id, *welch_psd(raw))
+
+    run_stats.update(
+        {
+            "subject": subject_id,
+            "config": config_id,
+            "n_bad_channels": len(bad_channels),
+            "bad_channels": ",".join(bad_channels),
+            "ica_components_excluded": ica_log["ica_components_excluded"],
+            "n_epochs_after": len(epochs),
+            **{f"time_{step}": t for step, t in step_times.items()},
+            "time_total": perf_counter() - start_time,
+        }
+    )
+    return run_stats
+
+
+@contextmanager
+def _timed(step_times: dict[str, float], step: str):
+    """Measure the wall-clock duration of a pipeline step.
 
-    save_data(output_folder, subject_id, epochs, raw, ica, pipeline_stats)
+    Args:
+        step_times (dict[str, float]): Durations in seconds, keyed by
+            step name. The duration of this step is added on exit.
+        step (str): Name of the step.
+    """
+    start = perf_counter()
+    yield
+    step_times[step] = perf_counter() - start
 
 
 def plot_specific_subject(
-    config: PipelineConfig, data_folder: str, config_id: int, subject_id: str
+    config: PipelineConfig,
+    data_folder: str,
+    config_id: int,
+    subject_id: str,
+    max_workers: int | None = None,
 ) -> None:
     """Generate diagnostic plots for a single processed subject.
 
     Loads saved pipeline outputs and produces ERP plots (single
-    channel, all channels, butterfly), ICA topographies, and a
-    power spectral density plot.
+    channel, all channels, butterfly), ICA topographies, a power
+    spectral density plot and the unprocessed vs processed trace
+    comparison. All figures are redrawn, in parallel via
+    render_jobs().
 
     Args:
         config (PipelineConfig): Configuration object, used to
@@ -133,37 +217,252 @@ def plot_specific_subject(
         config_id (int): Numeric config identifier used to locate
             the output subdirectory.
         subject_id (str): Zero-padded subject identifier (e.g. "001").
+        max_workers (int | None): Number of rendering processes,
+            see render_jobs().
     """
-    epochs, raw, ica, pipeline_stats = read_data(data_folder, config_id, subject_id)
+    figures = plan_subject_figures(data_folder, config_id, subject_id, force=True)
+    render_subject_figures(
+        config, data_folder, config_id, subject_id, figures, max_workers
+    )
 
-    output_folder = data_folder.rstrip("/") + "/" + str(config_id)
 
-    if epochs is not None:
-        one_channel_erp_plot(
-            f"{output_folder}/sub-{subject_id}_one_channel_erp.png",
-            raw,
-            epochs,
-            config.epoching.baseline,
+def plot_subjects_batch(
+    config_paths: dict[int, str],
+    data_folder: str,
+    subject_ids: list[str],
+    force: bool = False,
+) -> None:
+    """Generate the per-subject plots of many subjects and configs.
+
+    Plans every figure first and only renders the ones that are
+    missing or older than their inputs (see plan_subject_figures()).
+    Each (config, subject) pair with outdated figures becomes one
+    job in the process pool, which loads only the outputs those
+    figures need, once.
+
+    Args:
+        config_paths (dict[int, str]): Mapping of config ID to TOML
+            config path. Configs without outputs are skipped.
+        data_folder (str): Root directory containing per-config
+            output subdirectories (e.g. "data/processed").
+        subject_ids (list[str]): Zero-padded subject identifiers.
+        force (bool): Redraw all figures regardless of their age.
+    """
+    jobs: list[PlotJob] = []
+    n_figures = 0
+    n_up_to_date = 0
+    for config_id, config_path in config_paths.items():
+        if not isdir(f"{data_folder}/{config_id}"):
+            continue
+        for subject_id in subject_ids:
+            available = plan_subject_figures(
+                data_folder, config_id, subject_id, force=True
+            )
+            figures = plan_subject_figures(
+                data_folder, config_id, subject_id, config_path, force
+            )
+            n_up_to_date += len(available) - len(figures)
+            if figures:
+                n_figures += len(figures)
+                jobs.append(
+                    (
+                        _render_subject_figures_job,
+                        (config_path, data_folder, config_id, subject_id, figures),
+                    )
+                )
+
+    print(
+        f"Rendering {n_figures} figure(s) for {len(jobs)} subject run(s), "
+        f"{n_up_to_date} up to date."
+    )
+    render_jobs(jobs)
+
+
+# Per-subject figures: output file patterns (relative to
+# <config folder>/sub-<id>) and the pipeline outputs they are drawn from
+SUBJECT_FIGURES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "one_channel_erp": (("_one_channel_erp.png",), ("epo",)),
+    "all_channel_erp": (("_all_channel_erp.png",), ("epo",)),
+    "butterfly": (("_butterfly_random.png", "_butterfly_combined.png"), ("epo",)),
+    "ica": (("_ica*.png",), ("ica", "raw")),
+    "psd": (("_psd.png",), ("psd",)),
+    "qc_comparison": (("_qc_comparison.pdf",), ("raw",)),
+}
+
+# Outputs that can be rebuilt from another one when missing (outputs
+# processed before they were stored)
+ARTIFACT_FALLBACKS = {"psd": "raw"}
+
+
+def plan_subject_figures(
+    data_folder: str,
+    config_id: int,
+    subject_id: str,
+    config_path: str | None = None,
+    force: bool = False,
+) -> list[str]:
+    """Decide which per-subject figures need to be drawn.
+
+    A figure is drawn if all of its inputs exist and it is missing
+    or older than any input. ERP figures also depend on the config
+    file (for the baseline window), if given. A missing input listed
+    in ARTIFACT_FALLBACKS is replaced by its fallback.
+
+    Args:
+        data_folder (str): Root directory containing per-config
+            output subdirectories.
+        config_id (int): Numeric config identifier.
+        subject_id (str): Zero-padded subject identifier.
+        config_path (str | None): Path of the config file.
+        force (bool): Draw every figure whose inputs exist.
+
+    Returns:
+        list[str]: Names of figures (keys of SUBJECT_FIGURES) to draw.
+    """
+    output_folder = f"{data_folder}/{config_id}"
+    figures = []
+    for name, (patterns, kinds) in SUBJECT_FIGURES.items():
+        inputs = [artifact_path(output_folder, subject_id, kind) for kind in kinds]
+        inputs = [
+            (
+                artifact_path(output_folder, subject_id, ARTIFACT_FALLBACKS[kind])
+                if kind in ARTIFACT_FALLBACKS and not isfile(path)
+                else path
+            )
+            for kind, path in zip(kinds, inputs)
+        ]
+        if not all(isfile(path) for path in inputs):
+            continue
+        if config_path is not None and "epo" in kinds:
+            inputs.append(config_path)
+
+        outputs = [
+            glob(f"{output_folder}/sub-{subject_id}{pattern}") for pattern in patterns
+        ]
+        if (
+            force
+            or not all(outputs)
+            or min(getmtime(f) for files in outputs for f in files)
+            < max(getmtime(path) for path in inputs)
+        ):
+            figures.append(name)
+    return figures
+
+
+def render_subject_figures(
+    config: PipelineConfig,
+    data_folder: str,
+    config_id: int,
+    subject_id: str,
+    figures: list[str],
+    max_workers: int | None = None,
+) -> None:
+    """Draw the given per-subject figures, loading only what they need.
+
+    A PSD missing on disk is computed from the stored raw data and
+    saved, so later runs read it directly. The unprocessed recording
+    for the QC comparison is read from the BIDS dataset containing
+    data_folder, without preloading it.
+
+    Args:
+        config (PipelineConfig): Configuration object, used to read
+            the baseline window for ERP plots.
+        data_folder (str): Root directory containing per-config
+            output subdirectories.
+        config_id (int): Numeric config identifier.
+        subject_id (str): Zero-padded subject identifier.
+        figures (list[str]): Names of figures (keys of SUBJECT_FIGURES).
+        max_workers (int | None): Number of rendering processes,
+            see render_jobs().
+    """
+    output_folder = f"{data_folder}/{config_id}"
+    prefix = f"{output_folder}/sub-{subject_id}"
+
+    needed = {kind for name in figures for kind in SUBJECT_FIGURES[name][1]}
+    loaded = {
+        kind: read_artifact(output_folder, subject_id, kind) for kind in sorted(needed)
+    }
+    if "psd" in needed and loaded["psd"] is None:
+        raw = read_artifact(output_folder, subject_id, "raw")
+        save_psd(output_folder, subject_id, *welch_psd(raw))
+        loaded["psd"] = read_artifact(output_folder, subject_id, "psd")
+    epochs, raw, ica = loaded.get("epo"), loaded.get("raw"), loaded.get("ica")
+
+    jobs: list[PlotJob] = []
+    if "one_channel_erp" in figures:
+        jobs.append(
+            (
+                one_channel_erp_plot,
+                (f"{prefix}_one_channel_erp.png", epochs, config.epoching.baseline),
+            )
+        )
+    if "all_channel_erp" in figures:
+        jobs.append(
+            (
+                all_channel_erp_plot,
+                (f"{prefix}_all_channel_erp.png", epochs, config.epoching.baseline),
+            )
         )
-        all_channel_erp_plot(
-            f"{output_folder}/sub-{subject_id}_all_channel_erp.png",
-            epochs,
-            config.epoching.baseline,
+    if "butterfly" in figures:
+        jobs.append((butterfly_plot, (f"{prefix}_butterfly", epochs)))
+    if "ica" in figures:
+        jobs.append((ica_topography_plot, (f"{prefix}_ica", ica, raw)))
+    if "psd" in figures:
+        psd = loaded["psd"]
+        jobs.append(
+            (
+                power_spectral_density_plot,
+                (f"{prefix}_psd.png", psd["freqs"], psd["psd"], 0, 64),
+            )
         )
-        butterfly_plot(f"{output_folder}/sub-{subject_id}_butterfly", epochs)
+    if "qc_comparison" in figures:
+        bids_path = BIDSPath(
+            subject=subject_id,
+            root=dirname(data_folder),
+            datatype="eeg",
+            suffix="eeg",
+            task="jacobsen",
+        )
+        raw_unprocessed = read_raw_bids(bids_path, verbose=False)
+        jobs.append(
+            (
+                unprocessed_vs_processed_plot,
+                (f"{prefix}_qc_comparison.pdf", raw_unprocessed, raw),
+            )
+        )
+    render_jobs(jobs, max_workers)
 
-    if ica is not None:
-        ica_topography_plot(f"{output_folder}/sub-{subject_id}_ica", ica, raw)
-    power_spectral_density_plot(f"{output_folder}/sub-{subject_id}_psd.png", raw, 0, 64)
 
+def _render_subject_figures_job(
+    config_path: str,
+    data_folder: str,
+    config_id: int,
+    subject_id: str,
+    figures: list[str],
+) -> None:
+    """Worker entry point of plot_subjects_batch().
 
-def plot_average_data(config: PipelineConfig, data_folder: str, config_id: int) -> None:
+    Loads the config inside the worker, like process_subject() in
+    main.py, and renders the figures in this process.
+    """
+    print(f"PLOT   config={config_id} subject={subject_id}: {', '.join(figures)}")
+    render_subject_figures(
+        load_config(config_path), data_folder, config_id, subject_id, figures, 1
+    )
+
+
+def plot_average_data(
+    config: PipelineConfig,
+    data_folder: str,
+    config_id: int,
+    max_workers: int | None = None,
+) -> None:
     """Generate grand average ERP plots and topomaps across all subjects.
 
     Loads all processed epoch files for the given config, computes
     grand averages at PO7 and PO8, and produces three ERP plots
     (PO7 alone, PO8 alone, PO7+PO8 averaged) plus a difference-wave
-    topomap.
+    topomap. The figures are rendered in parallel via render_jobs().
 
     Args:
         config (PipelineConfig): Configuration object. Currently
@@ -172,6 +471,8 @@ def plot_average_data(config: PipelineConfig, data_folder: str, config_id: int)
             output subdirectories (e.g. "data/processed").
         config_id (int): Numeric config identifier used to locate
             the output subdirectory.
+        max_workers (int | None): Number of rendering processes,
+            see render_jobs().
     """
     output_folder = data_folder.rstrip("/") + "/" + str(config_id)
 
@@ -180,37 +481,46 @@ def plot_average_data(config: PipelineConfig, data_folder: str, config_id: int)
     data_random_po7, data_regular_po7, times_po7, n_subjects, evoked_diff_po7 = (
         average_channel("PO7", epochs_dict)
     )
-    plot_channel(
-        f"{output_folder}/fig-average_po7.png",
-        "PO7",
-        data_random_po7,
-        data_regular_po7,
-        times_po7,
-        n_subjects,
-    )
     data_random_po8, data_regular_po8, times_po8, n_subjects, evoked_diff_po8 = (
         average_channel("PO8", epochs_dict)
     )
-    plot_channel(
-        f"{output_folder}/fig-average_po8.png",
-        "PO8",
-        data_random_po8,
-        data_regular_po8,
-        times_po8,
-        n_subjects,
-    )
     data_random_both = pairwise_average(data_random_po7, data_random_po8)
     data_regular_both = pairwise_average(data_regular_po7, data_regular_po8)
-    plot_channel(
-        f"{output_folder}/fig-average_po7po8.png",
-        "PO7+PO8",
-        data_random_both,
-        data_regular_both,
-        times_po7,
-        n_subjects,
-    )
 
-    data_random_po7, data_regular_po7, times_po7, n_subjects, evoked_diff_po7 = (
-        average_channel("PO7", epochs_dict)
-    )
-    plot_topomap(f"{output_folder}/fig-topomap_diff_po7.png", evoked_diff_po7)
+    jobs: list[PlotJob] = [
+        (
+            plot_channel,
+            (
+                f"{output_folder}/fig-average_po7.png",
+                "PO7",
+                data_random_po7,
+                data_regular_po7,
+                times_po7,
+                n_subjects,
+            ),
+        ),
+        (
+            plot_channel,
+            (
+                f"{output_folder}/fig-average_po8.png",
+                "PO8",
+                data_random_po8,
+                data_regular_po8,
+                times_po8,
+                n_subjects,
+            ),
+        ),
+        (
+            plot_channel,
+            (
+                f"{output_folder}/fig-average_po7po8.png",
+                "PO7+PO8",
+                data_random_both,
+                data_regular_both,
+                times_po7,
+                n_subjects,
+            ),
+        ),
+        (plot_topomap, (f"{output_folder}/fig-topomap_diff_po7.png", evoked_diff_po7)),
+    ]
+    render_jobs(jobs, max_workers)
@@ -0,0 +1,314 @@
+"""Cross-config comparison report.
+
+Builds one table and one set of figures comparing all processed
+configs: rejection rates, ICA exclusions, bad channels, per-step
+timings, ERP peak amplitudes/latencies at PO7 and PO8 and EEG band
+power. Each subject's epochs are read exactly once (only the channels
+of interest are loaded), in parallel across configs and subjects.
+Band power comes from the Welch PSDs stored by the pipeline.
+
+The report is written to ``<bids_root>/processed/comparison/``.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from os import getenv, mkdir
+from os.path import isdir
+
+from mne import read_epochs
+import numpy as np
+import pandas as pd
+
+from utils.files import read_artifact
+from utils.plots import (
+    config_comparison_plot,
+    config_erp_comparison_plot,
+    psd_comparison_plot,
+)
+from utils.utils import compare_run_statistics
+
+CHANNELS = ["PO7", "PO8"]
+
+# Peak search windows in seconds and peak polarity for each component
+PEAK_COMPONENTS = {
+    "P1": (0.080, 0.150, 1),
+    "N1": (0.150, 0.250, -1),
+}
+
+# Mean amplitude window of the regular - random difference wave (SPN)
+SPN_WINDOW = (0.300, 1.000)
+
+# Frequency bands in Hz for the band power comparison
+PSD_BANDS = {
+    "delta": (1.0, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 13.0),
+    "beta": (13.0, 30.0),
+    "gamma": (30.0, 45.0),
+}
+
+
+def build_comparison_report(
+    bids_root: str, config_ids: list[int]
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Compare all processed configs and write the report.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        config_ids (list[int]): Numeric config identifiers to compare.
+            Configs without processed outputs are skipped.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: A tuple of:
+            - Summary with one row per config: run statistics joined
+              with the SPN mean amplitudes and the mean band power.
+            - ERP peaks in long format with one row per config,
+              channel, condition and component (amplitude in µV,
+              latency in ms).
+    """
+    data_folder = f"{bids_root.rstrip('/')}/processed"
+    output_folder = f"{data_folder}/comparison"
+    if not isdir(output_folder):
+        mkdir(output_folder)
+
+    jobs = [
+        (data_folder, config_id, path.split("sub-")[-1].split("_epo")[0])
+        for config_id in config_ids
+        for path in sorted(glob(f"{data_folder}/{config_id}/sub-*_epo.fif"))
+    ]
+    with ProcessPoolExecutor(max_workers=int(getenv("MAX_WORKERS", 2))) as executor:
+        results = list(executor.map(_subject_evokeds, *zip(*jobs))) if jobs else []
+
+    grand_averages = _grand_averages(results)
+    peaks = _erp_peaks(grand_averages)
+
+    summary = compare_run_statistics(bids_root, config_ids)
+    spn = pd.DataFrame(
+        {
+            f"spn_{channel}_uV": {
+                config_id: _mean_in_window(
+                    ga["times"], ga[channel]["regular"] - ga[channel]["random"], SPN_WINDOW
+                )
+                for config_id, ga in grand_averages.items()
+                if channel in ga
+            }
+            for channel in CHANNELS + ["PO7+PO8"]
+        }
+    )
+    config_psds = _config_psds(data_folder, config_ids)
+    band_power = _band_power(config_psds)
+    if not band_power.empty:
+        spn = spn.join(
+            band_power.groupby("config")[list(PSD_BANDS)]
+            .mean()
+            .add_prefix("psd_")
+            .add_suffix("_uV2"),
+            how="outer",
+        )
+    summary = summary.join(spn, how="outer")
+    summary.index.name = "config"
+
+    summary.to_csv(f"{output_folder}/summary.csv")
+    peaks.to_csv(f"{output_folder}/erp_peaks.csv", index=False)
+    band_power.to_csv(f"{output_folder}/psd_bands.csv", index=False)
+    config_comparison_plot(f"{output_folder}/fig-comparison_stats.png", summary)
+    config_erp_comparison_plot(
+        f"{output_folder}/fig-comparison_erp.png", grand_averages, SPN_WINDOW
+    )
+    if config_psds:
+        psd_comparison_plot(
+            f"{output_folder}/fig-comparison_psd.png",
+            {c: (freqs, psds) for c, (freqs, _, psds) in config_psds.items()},
+        )
+    print(f"Comparison report written to {output_folder}/")
+
+    return summary, peaks
+
+
+def _subject_evokeds(data_folder: str, config_id: int, subject_id: str) -> dict:
+    """Read one subject's epochs and average them per condition.
+
+    The file is read lazily and only the PO7/PO8 channels are kept
+    in memory.
+
+    Args:
+        data_folder (str): Root directory containing per-config
+            output subdirectories.
+        config_id (int): Numeric config identifier.
+        subject_id (str): Zero-padded subject identifier.
+
+    Returns:
+        dict: "config", "subject", "times" and, per available
+            channel, a dict mapping condition to the evoked response
+            in µV, shape (n_times,).
+    """
+    epochs = read_epochs(
+        f"{data_folder}/{config_id}/sub-{subject_id}_epo.fif",
+        preload=False,
+        verbose=False,
+    )
+    channels = [ch for ch in CHANNELS if ch in epochs.ch_names]
+    result: dict = {"config": config_id, "subject": subject_id, "times": epochs.times}
+    if not channels:
+        return result
+
+    data = epochs.get_data(picks=channels) * 1e6
+    conditions = epochs.events[:, 2]
+    for i, channel in enumerate(channels):
+        result[channel] = {
+            condition: data[conditions == code, i].mean(axis=0)
+            for condition, code in epochs.event_id.items()
+            if (conditions == code).any()
+        }
+    return result
+
+
+def _grand_averages(results: list[dict]) -> dict[int, dict]:
+    """Average the subject evoked responses per config.
+
+    Subjects missing a channel or condition are left out of that
+    channel's average. "PO7+PO8" averages the two channels.
+
+    Args:
+        results (list[dict]): Outputs of _subject_evokeds().
+
+    Returns:
+        dict[int, dict]: Per config: "times", "n_subjects" and, per
+            channel, a dict mapping "random"/"regular" to the grand
+            average in µV.
+    """
+    grand_averages: dict[int, dict] = {}
+    for config_id in sorted({r["config"] for r in results}):
+        subjects = [r for r in results if r["config"] == config_id]
+        ga: dict = {"times": subjects[0]["times"], "n_subjects": len(subjects)}
+        for channel in CHANNELS:
+            usable = [
+                r[channel]
+                for r in subjects
+                if channel in r and {"random", "regular"} <= r[channel].keys()
+            ]
+            if usable:
+                ga[channel] = {
+                    condition: np.mean([u[condition] for u in usable], axis=0)
+                    for condition in ("random", "regular")
+                }
+        if all(channel in ga for channel in CHANNELS):
+            ga["PO7+PO8"] = {
+                condition: (ga["PO7"][condition] + ga["PO8"][condition]) / 2
+                for condition in ("random", "regular")
+            }
+        grand_averages[config_id] = ga
+    return grand_averages
+
+
+def _erp_peaks(grand_averages: dict[int, dict]) -> pd.DataFrame:
+    """Find component peaks in the grand averages of every config.
+
+    Args:
+        grand_averages (dict[int, dict]): Output of _grand_averages().
+
+    Returns:
+        pd.DataFrame: Columns config, channel, condition, component,
+            amplitude_uV and latency_ms. Both are NaN if the epochs
+            do not cover the component's search window.
+    """
+    rows = []
+    for config_id, ga in grand_averages.items():
+        times = ga["times"]
+        for channel in CHANNELS + ["PO7+PO8"]:
+            if channel not in ga:
+                continue
+            for condition, erp in ga[channel].items():
+                for component, (tmin, tmax, polarity) in PEAK_COMPONENTS.items():
+                    window = np.flatnonzero((times >= tmin) & (times <= tmax))
+                    # Epochs ending before the component have no peak
+                    amplitude, latency = np.nan, np.nan
+                    if len(window):
+                        peak = window[np.argmax(polarity * erp[window])]
+                        amplitude, latency = erp[peak], times[peak] * 1000
+                    rows.append(
+                        {
+                            "config": config_id,
+                            "channel": channel,
+                            "condition": condition,
+                            "component": component,
+                            "amplitude_uV": amplitude,
+                            "latency_ms": latency,
+                        }
+                    )
+    return pd.DataFrame(rows)
+
+
+def _config_psds(
+    data_folder: str, config_ids: list[int]
+) -> dict[int, tuple[np.ndarray, list[str], np.ndarray]]:
+    """Read the stored PSDs of all subjects, averaged over channels.
+
+    Subjects whose frequency grid differs from the first subject of
+    the config (e.g. processed at another sampling rate) are skipped.
+
+    Args:
+        data_folder (str): Root directory containing per-config
+            output subdirectories.
+        config_ids (list[int]): Numeric config identifiers.
+
+    Returns:
+        dict[int, tuple[np.ndarray, list[str], np.ndarray]]: Per
+            config with stored PSDs: frequencies in Hz, subject IDs
+            and channel-averaged PSDs in V²/Hz, shape (n_subjects,
+            n_freqs).
+    """
+    config_psds = {}
+    for config_id in config_ids:
+        freqs, subjects, psds = None, [], []
+        for path in sorted(glob(f"{data_folder}/{config_id}/sub-*_psd.npz")):
+            subject_id = path.split("sub-")[-1].split("_psd")[0]
+            stored = read_artifact(f"{data_folder}/{config_id}", subject_id, "psd")
+            if freqs is None:
+                freqs = stored["freqs"]
+            elif not np.array_equal(freqs, stored["freqs"]):
+                print(f"Skipping PSD of config {config_id} subject {subject_id}")
+                continue
+            subjects.append(subject_id)
+            psds.append(stored["psd"].mean(axis=0))
+        if subjects:
+            config_psds[config_id] = (freqs, subjects, np.array(psds))
+    return config_psds
+
+
+def _band_power(
+    config_psds: dict[int, tuple[np.ndarray, list[str], np.ndarray]],
+) -> pd.DataFrame:
+    """Integrate the channel-averaged PSDs over the PSD_BANDS.
+
+    Args:
+        config_psds (dict): Output of _config_psds().
+
+    Returns:
+        pd.DataFrame: Columns config, subject and one column per band
+            with the band power in µV².
+    """
+    tables = []
+    for config_id, (freqs, subjects, psds) in config_psds.items():
+        table = pd.DataFrame({"config": config_id, "subject": subjects})
+        for band, (fmin, fmax) in PSD_BANDS.items():
+            in_band = (freqs >= fmin) & (freqs <= fmax)
+            table[band] = np.trapezoid(psds[:, in_band], freqs[in_band], axis=1) * 1e12
+        tables.append(table)
+    if not tables:
+        return pd.DataFrame(columns=["config", "subject", *PSD_BANDS])
+    return pd.concat(tables, ignore_index=True)
+
+
+def _mean_in_window(times: np.ndarray, erp: np.ndarray, window) -> float:
+    """Mean amplitude of an ERP within a time window.
+
+    Args:
+        times (np.ndarray): Time points in seconds.
+        erp (np.ndarray): Amplitudes, same shape as times.
+        window (tuple[float, float]): Start and end in seconds.
+
+    Returns:
+        float: Mean amplitude within the window.
+    """
+    return float(erp[(times >= window[0]) & (times <= window[1])].mean())
@@ -3,24 +3,59 @@
 Decomposes the EEG signal into statistically independent components
 using the Infomax algorithm, then automatically identifies and
 removes components corresponding to ocular (EOG) and cardiac (ECG)
-artifacts. Components are detected using MNE's find_bads_eog and
-find_bads_ecg correlation-based methods.
+artifacts.
+
+Components are classified by correlating their source time courses
+with the EOG channels and with an R-peak template built from the ECG
+channel. Correlations are computed on band-passed, decimated
+continuous data for all components at once, and outliers are found
+by iterated z-scoring (as in MNE's find_bads_eog/find_bads_ecg).
+
+Fitted decompositions are cached on disk, keyed by the upstream
+config and a fingerprint of the input data, so that configs sharing
+the same pre-ICA state only fit ICA once.
 """
 
-from mne.preprocessing import ICA, create_eog_epochs, create_ecg_epochs
-from mne import pick_types
+from json import dumps
+from os import getpid, replace
+from os.path import isfile
+
+import numpy as np
+from mne import create_info, pick_types
+from mne.filter import filter_data
+from mne.io import RawArray
 from mne.io.edf.edf import RawEDF
+from mne.preprocessing import ICA, read_ica
+from scipy import signal
 
+from utils.cache import combine_hashes, hash_raw_data
 from utils.config import StepICA
 
+# Decomposition settings fixed by _fit_ica()
+ICA_METHOD = "infomax"
+ICA_RANDOM_STATE = 42
 
-def run_ica(raw: RawEDF, config: StepICA) -> tuple[RawEDF, ICA | None, int]:
+# Pass bands used for classification, as in MNE's find_bads_eog/ecg
+EOG_BAND = (1.0, 10.0)
+ECG_BAND = (8.0, 16.0)
+
+
+def run_ica(
+    raw: RawEDF,
+    config: StepICA,
+    cache_folder: str | None = None,
+    upstream_hash: str = "",
+) -> tuple[RawEDF, ICA | None, dict]:
     """Fit ICA and remove ocular/cardiac artifact components.
 
-    Fits ICA on all non-bad EEG channels, then uses EOG and ECG
-    channels to automatically identify artifact components. Detected
-    components are excluded and the ICA is applied to the continuous
-    data in place.
+    Fits ICA on all non-bad EEG channels, then correlates the
+    component sources with the EOG channels and an R-peak template
+    to identify artifact components. Detected components are
+    excluded and the ICA is applied to the continuous data in place.
+
+    If a cache folder is given and caching is enabled in the config,
+    a previously fitted decomposition for the same upstream config
+    and input data is loaded instead of refitting.
 
     Requires at least two EEG channels. If fewer are available
     (e.g. all marked bad), ICA is skipped.
@@ -29,59 +64,306 @@ def run_ica(raw: RawEDF, config: StepICA) -> tuple[RawEDF, ICA | None, int]:
         raw (RawEDF): Continuous EEG data. Modified in place when
             artifact components are removed.
         config (StepICA): ICA parameters, including the number of
-            components (or variance threshold).
+            components (or variance threshold) and the
+            classification thresholds.
+        cache_folder (str | None): Directory holding cached ICA
+            decompositions, or None to always fit from scratch.
+        upstream_hash (str): Hash of the config sections that
+            produced the input data (see hash_config_sections()).
+            Combined with the data fingerprint to form the cache key.
 
     Returns:
-        tuple[RawEDF, ICA | None, int]: A tuple of:
+        tuple[RawEDF, ICA | None, dict]: A tuple of:
             - The (possibly cleaned) raw data.
             - The fitted ICA object, or None if ICA was skipped.
-            - Number of excluded components (0 if ICA was skipped
-              or no artifacts were found).
+            - ICA log dictionary containing:
+                - ica_components_excluded: Number of excluded
+                  components (0 if ICA was skipped or no artifacts
+                  were found).
+                - ica_excluded: Indices of the excluded components.
+                - ica_eog_scores: Mapping of EOG channel name to the
+                  per-component correlations.
+                - ica_ecg_scores: Per-component correlations with
+                  the R-peak template, or None if no ECG channel
+                  was available.
     """
+    ica_log: dict = {
+        "ica_components_excluded": 0,
+        "ica_excluded": [],
+        "ica_eog_scores": {},
+        "ica_ecg_scores": None,
+    }
+
     # Require at least two EEG channels for decomposition
     picks_eeg = pick_types(raw.info, eeg=True, meg=False, exclude="bads")
     if len(picks_eeg) < 2:
         print("Not enough EEG channels for ICA.")
-        return raw, None, 0
+        return raw, None, ica_log
+
+    ica_file = None
+    if cache_folder is not None and config.cache:
+        key = combine_hashes(
+            upstream_hash, _fit_parameters(config), hash_raw_data(raw)
+        )
+        ica_file = f"{cache_folder}/{key}_ica.fif"
+
+    if ica_file is not None and isfile(ica_file):
+        print(f"Reusing cached ICA decomposition: {ica_file}")
+        ica = read_ica(ica_file)
+    else:
+        ica = _fit_ica(raw, config, picks_eeg)
+        if ica_file is not None:
+            _save_ica_atomic(ica, ica_file)
 
+    to_remove, eog_scores, ecg_scores = _classify_components(raw, ica, config)
+
+    if to_remove:
+        ica.exclude = to_remove
+        ica.apply(raw)  # applies ICA to raw in-place
+
+    ica_log["ica_components_excluded"] = len(to_remove)
+    ica_log["ica_excluded"] = to_remove
+    ica_log["ica_eog_scores"] = {ch: s.tolist() for ch, s in eog_scores.items()}
+    ica_log["ica_ecg_scores"] = None if ecg_scores is None else ecg_scores.tolist()
+
+    print("ICA cleaning applied. Excluded components:", to_remove)
+
+    return raw, ica, ica_log
+
+
+def _fit_ica(raw: RawEDF, config: StepICA, picks_eeg) -> ICA:
+    """Fit a fresh Infomax ICA on the given EEG channels."""
     ica = ICA(
         n_components=config.n_components,
-        method="infomax",
-        random_state=42,
+        method=ICA_METHOD,
+        random_state=ICA_RANDOM_STATE,
         max_iter="auto",
     )
     ica.fit(raw, picks=picks_eeg)
 
-    # find EOG components using any channels already marked as 'eog' or named EXG*
-    ch_types = raw.get_channel_types()
-    eog_chs = [ch for ch, t in zip(raw.ch_names, ch_types) if t == "eog"]
+    return ica
+
+
+def _fit_parameters(config: StepICA) -> str:
+    """Serialize the settings that determine the fitted decomposition.
 
-    eog_inds = []
+    Only what _fit_ica() uses is included; the classification
+    settings and the cache flag are not, so changing them reuses the
+    cached decomposition.
+    """
+    return dumps(
+        {
+            "enabled": config.enabled,
+            "n_components": config.n_components,
+            "method": ICA_METHOD,
+            "random_state": ICA_RANDOM_STATE,
+            "max_iter": "auto",
+        },
+        sort_keys=True,
+    )
+
+
+def _save_ica_atomic(ica: ICA, ica_file: str) -> None:
+    """Write a fitted ICA to the cache without exposing partial files.
+
+    Several worker processes may fit the same decomposition at once,
+    so the file is written under a process-specific name first and
+    then moved into place.
+    """
+    tmp_file = ica_file.replace("_ica.fif", f"-{getpid()}_ica.fif")
+    ica.save(tmp_file, overwrite=True)
+    replace(tmp_file, ica_file)
+
+
+def _classify_components(
+    raw: RawEDF, ica: ICA, config: StepICA
+) -> tuple[list[int], dict[str, np.ndarray], np.ndarray | None]:
+    """Find ocular and cardiac components via source correlations.
+
+    The ICA channels and reference channels are low-pass filtered and
+    decimated to ``config.classification_sfreq`` once. Sources are
+    then computed on the decimated data, and all components are
+    correlated with each reference in a single matrix product.
+
+    Args:
+        raw (RawEDF): Continuous data the ICA was fitted on.
+        ica (ICA): Fitted ICA object.
+        config (StepICA): Classification parameters.
+
+    Returns:
+        tuple[list[int], dict[str, np.ndarray], np.ndarray | None]:
+            A tuple of:
+            - Sorted indices of the components to exclude.
+            - Mapping of EOG channel name to per-component
+              correlations, shape (n_components,).
+            - Per-component correlations with the R-peak template,
+              or None if no ECG channel is available.
+    """
+    sfreq = raw.info["sfreq"]
+    eog_chs = [ch for ch in config.eog_channels if ch in raw.ch_names]
+    ecg_ch = _find_ecg_channel(raw, config)
+    ref_chs = eog_chs + ([ecg_ch] if ecg_ch is not None else [])
+
+    if not eog_chs:
+        print(f"No EOG channels {config.eog_channels} found for ICA classification.")
+    if ecg_ch is None:
+        print("No ECG channel found, skipping cardiac ICA classification.")
+
+    # Anti-alias and decimate the ICA and reference channels in one go
+    decim = max(1, int(sfreq // config.classification_sfreq))
+    data = raw.get_data(picks=ica.ch_names + ref_chs)
+    if decim > 1:
+        data = filter_data(
+            data,
+            sfreq,
+            l_freq=None,
+            h_freq=sfreq / decim / 2.5,
+            method="iir",
+            verbose=False,
+        )[:, ::decim]
+    sfreq_dec = sfreq / decim
+
+    n_ica = len(ica.ch_names)
+    decimated = RawArray(
+        data[:n_ica], create_info(ica.ch_names, sfreq_dec, "eeg"), verbose=False
+    )
+    sources = ica.get_sources(decimated).get_data()
+    refs = data[n_ica:]
+
+    to_remove: set[int] = set()
+
+    eog_scores: dict[str, np.ndarray] = {}
     if eog_chs:
-        try:
-            # use first available EOG/EXG channel to create EOG epochs
-            eog_epochs = create_eog_epochs(
-                raw, ch_name=eog_chs[0], reject_by_annotation=True, preload=True
-            )
-            eog_inds, scores = ica.find_bads_eog(eog_epochs)
-        except Exception:
-            eog_inds = []
-
-    try:
-        ecg_epochs = create_ecg_epochs(raw, reject_by_annotation=True, preload=True)
-        ecg_inds, ecg_scores = ica.find_bads_ecg(ecg_epochs)
-    except Exception:
-        ecg_inds = []
-
-    to_remove = sorted(set(eog_inds + ecg_inds))
-    if to_remove:
-        ica.exclude = to_remove
-        ica.apply(raw)  # applies ICA to raw in-place
+        corr = _correlate(
+            _band_pass(sources, sfreq_dec, EOG_BAND),
+            _band_pass(refs[: len(eog_chs)], sfreq_dec, EOG_BAND),
+        )
+        for i, ch in enumerate(eog_chs):
+            eog_scores[ch] = corr[:, i]
+            to_remove.update(_find_outliers(corr[:, i], config.eog_threshold))
+
+    ecg_scores = None
+    if ecg_ch is not None:
+        template_signal = _r_peak_template_signal(refs[-1], sfreq_dec)
+        if template_signal is not None:
+            ecg_scores = _correlate(
+                _band_pass(sources, sfreq_dec, ECG_BAND),
+                template_signal[np.newaxis, :],
+            )[:, 0]
+            to_remove.update(_find_outliers(ecg_scores, config.ecg_threshold))
+
+    return sorted(int(i) for i in to_remove), eog_scores, ecg_scores
+
+
+def _find_ecg_channel(raw: RawEDF, config: StepICA) -> str | None:
+    """Resolve the ECG channel from the config or the channel types."""
+    if config.ecg_channel:
+        return config.ecg_channel if config.ecg_channel in raw.ch_names else None
 
-    number_excluded_components = len(getattr(ica, "exclude", []))
-    print(
-        "ICA cleaning applied. Excluded components:",
-        getattr(ica, "exclude", []),
+    ch_types = raw.get_channel_types()
+    ecg_chs = [ch for ch, t in zip(raw.ch_names, ch_types) if t == "ecg"]
+
+    return ecg_chs[0] if ecg_chs else None
+
+
+def _band_pass(data: np.ndarray, sfreq: float, band: tuple[float, float]):
+    """Zero-phase IIR band-pass, clipping the upper edge below Nyquist."""
+    h_freq = min(band[1], sfreq / 2.0 * 0.9)
+    return filter_data(
+        data, sfreq, l_freq=band[0], h_freq=h_freq, method="iir", verbose=False
     )
 
-    return raw, ica, number_excluded_components
+
+def _correlate(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson correlation of every row of x with every row of y.
+
+    Args:
+        x (np.ndarray): Signals of shape (n_x, n_times).
+        y (np.ndarray): Signals of shape (n_y, n_times).
+
+    Returns:
+        np.ndarray: Correlation matrix of shape (n_x, n_y).
+    """
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    x_norm = np.linalg.norm(x, axis=1, keepdims=True)
+    y_norm = np.linalg.norm(y, axis=1, keepdims=True)
+    x_norm[x_norm == 0] = 1.0
+    y_norm[y_norm == 0] = 1.0
+
+    return (x / x_norm) @ (y / y_norm).T
+
+
+def _r_peak_template_signal(ecg: np.ndarray, sfreq: float) -> np.ndarray | None:
+    """Build a continuous reference signal from R-peak locations.
+
+    Detects R-peaks in the band-passed ECG, averages the ECG around
+    each peak into a QRS template, and places that template at every
+    detected peak. Returns None if fewer than two peaks are found.
+
+    Args:
+        ecg (np.ndarray): ECG time course, shape (n_times,).
+        sfreq (float): Sampling frequency in Hz.
+
+    Returns:
+        np.ndarray | None: Template signal of shape (n_times,).
+    """
+    ecg_filtered = _band_pass(ecg[np.newaxis, :], sfreq, ECG_BAND)[0]
+
+    # R-peaks may be negative depending on the electrode placement
+    if np.abs(ecg_filtered.min()) > np.abs(ecg_filtered.max()):
+        ecg_filtered = -ecg_filtered
+
+    med = np.median(ecg_filtered)
+    mad = np.median(np.abs(ecg_filtered - med))
+    # At most ~200 bpm
+    min_dist = max(1, int(round(0.3 * sfreq)))
+    peaks, _ = signal.find_peaks(
+        ecg_filtered, height=med + 5.0 * mad, distance=min_dist
+    )
+
+    half = max(1, int(round(0.1 * sfreq)))
+    peaks = peaks[(peaks >= half) & (peaks < ecg_filtered.size - half)]
+    if peaks.size < 2:
+        return None
+
+    # (n_peaks, window) index matrix around every R-peak
+    window = np.arange(-half, half + 1)
+    idx = peaks[:, np.newaxis] + window[np.newaxis, :]
+    template = ecg_filtered[idx].mean(axis=0)
+
+    reference = np.zeros_like(ecg_filtered)
+    np.add.at(reference, idx, np.broadcast_to(template, idx.shape))
+
+    return reference
+
+
+def _find_outliers(scores: np.ndarray, threshold: float, max_iter: int = 2):
+    """Find outlier scores via iterated absolute z-scoring.
+
+    Mirrors MNE's adaptive thresholding: scores whose absolute
+    z-score exceeds the threshold are masked and the remaining ones
+    are z-scored again, until no new outliers appear.
+
+    Args:
+        scores (np.ndarray): Per-component scores, shape
+            (n_components,).
+        threshold (float): Absolute z-score threshold.
+        max_iter (int): Maximum number of iterations.
+
+    Returns:
+        np.ndarray: Indices of the outlier components.
+    """
+    mask = np.zeros(len(scores), dtype=bool)
+    for _ in range(max_iter):
+        remaining = scores[~mask]
+        std = remaining.std()
+        if remaining.size < 2 or std == 0:
+            break
+        z = np.abs(scores - remaining.mean()) / std
+        local_bad = (z > threshold) & ~mask
+        if not local_bad.any():
+            break
+        mask |= local_bad
+
+    return np.flatnonzero(mask)
@@ -5,14 +5,31 @@ surrounding good channels. A standard 10-20 montage is set if no
 digitization points are present, as interpolation requires electrode
 positions. This step is placed late in the pipeline so that
 interpolation uses the cleanest possible data.
+
+The spline interpolation matrix only depends on the electrode
+positions and on which channels are good or bad, so it is cached on
+disk and reused across configs and subjects with the same bad set.
+Applying it is a single matrix multiplication.
 """
 
+from hashlib import blake2b
+from json import dumps
+from os.path import isfile
+from warnings import catch_warnings, simplefilter
+
+import numpy as np
+from mne import pick_types
+from mne.bem import fit_sphere_to_headshape
 from mne.io.edf.edf import RawEDF
+from numpy.polynomial.legendre import legval
 
+from utils.cache import save_array_atomic
 from utils.config import StepInterpolation
 
 
-def interpolate_bad_channels(raw: RawEDF, config: StepInterpolation) -> RawEDF:
+def interpolate_bad_channels(
+    raw: RawEDF, config: StepInterpolation, cache_folder: str | None = None
+) -> RawEDF:
     """Interpolate channels marked as bad in raw.info["bads"].
 
     If no channels are marked bad, this step is a no-op. If the raw
@@ -26,6 +43,9 @@ def interpolate_bad_channels(raw: RawEDF, config: StepInterpolation) -> RawEDF:
         config (StepInterpolation): Interpolation parameters
             including whether to clear the bads list after
             interpolation and the interpolation mode.
+        cache_folder (str | None): Directory holding cached
+            interpolation matrices. If None, MNE's interpolate_bads()
+            is used directly.
 
     Returns:
         RawEDF: The raw data with bad channels interpolated (same
@@ -43,10 +63,140 @@ def interpolate_bad_channels(raw: RawEDF, config: StepInterpolation) -> RawEDF:
         if not raw.info.get("dig"):
             raw.set_montage("standard_1020", on_missing="ignore")
 
-        raw.interpolate_bads(reset_bads=config.reset_bads, mode=config.mode)
+        if cache_folder is None:
+            raw.interpolate_bads(reset_bads=config.reset_bads, mode=config.mode)
+        else:
+            _interpolate_bads_cached(raw, config, cache_folder)
         print(f"Interpolated bad channels: {bad_chs}")
 
     except Exception as e:
         print(f"Interpolation failed: {e}")
 
     return raw
+
+
+def _interpolate_bads_cached(
+    raw: RawEDF, config: StepInterpolation, cache_folder: str
+) -> None:
+    """Interpolate bad EEG channels using a cached spline matrix.
+
+    Equivalent to MNE's spline interpolation for EEG: positions are
+    centered on the fitted head sphere, and the interpolation matrix
+    maps all good EEG channels onto the bad ones. The matrix is keyed
+    by the montage positions, the sphere origin, and the good and bad
+    channel sets. config.mode is not part of the key, since MNE only
+    uses it for MEG channels.
+
+    Args:
+        raw (RawEDF): Continuous EEG data with electrode positions.
+            Modified in place.
+        config (StepInterpolation): Interpolation parameters.
+        cache_folder (str): Directory holding cached matrices.
+    """
+    picks = pick_types(raw.info, meg=False, eeg=True, exclude=[])
+    names = [raw.ch_names[p] for p in picks]
+    pos = np.array([raw.info["chs"][p]["loc"][:3] for p in picks])
+    is_bad = np.array([ch in raw.info["bads"] for ch in names])
+    has_pos = np.isfinite(pos).all(axis=1) & (np.abs(pos).sum(axis=1) > 0)
+
+    if (is_bad & ~has_pos).any():
+        missing = [ch for ch, b, h in zip(names, is_bad, has_pos) if b and not h]
+        print(f"No electrode positions for {missing}, leaving them as they are.")
+
+    goods = picks[~is_bad & has_pos]
+    bads = picks[is_bad & has_pos]
+    if len(bads) == 0 or len(goods) == 0:
+        return
+
+    # MNE's interpolate_bads() fits the sphere silently as well
+    with catch_warnings():
+        simplefilter("ignore")
+        origin = fit_sphere_to_headshape(raw.info, units="m", verbose=False)[1]
+
+    h = blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(pos[has_pos]).data)
+    h.update(np.asarray(origin, dtype=float).data)
+    h.update(
+        dumps(
+            {
+                "goods": [raw.ch_names[p] for p in goods],
+                "bads": [raw.ch_names[p] for p in bads],
+            }
+        ).encode()
+    )
+    matrix_file = f"{cache_folder}/{h.hexdigest()}.npy"
+
+    if isfile(matrix_file):
+        interpolation = np.load(matrix_file)
+    else:
+        pos_by_pick = dict(zip(picks, pos))
+        interpolation = _spherical_spline_matrix(
+            np.array([pos_by_pick[p] for p in goods]) - origin,
+            np.array([pos_by_pick[p] for p in bads]) - origin,
+        )
+        save_array_atomic(matrix_file, interpolation)
+
+    raw[bads, :] = interpolation @ raw.get_data(picks=goods)
+
+    if config.reset_bads:
+        interpolated = {raw.ch_names[p] for p in bads}
+        raw.info["bads"] = [ch for ch in raw.info["bads"] if ch not in interpolated]
+
+
+def _legendre_g(cosang: np.ndarray, stiffness=4, n_legendre_terms=50):
+    """Evaluate the spherical spline g function (Perrin et al., 1989).
+
+    The defaults are those of MNE's _calc_g(), so the cached matrices
+    reproduce raw.interpolate_bads().
+
+    Args:
+        cosang (np.ndarray): Cosines of the angles between pairs of
+            points on the unit sphere.
+        stiffness (int): Spline stiffness (m in the paper).
+        n_legendre_terms (int): Number of Legendre terms to sum.
+
+    Returns:
+        np.ndarray: g evaluated element-wise, same shape as cosang.
+    """
+    n = np.arange(1, n_legendre_terms + 1, dtype=float)
+    factors = (2 * n + 1) / (n**stiffness * (n + 1) ** stiffness * 4 * np.pi)
+    return legval(cosang, np.concatenate([[0.0], factors]))
+
+
+def _spherical_spline_matrix(
+    pos_from: np.ndarray, pos_to: np.ndarray, alpha=1e-5
+) -> np.ndarray:
+    """Compute the spherical spline interpolation matrix.
+
+    Same formulation as MNE's EEG interpolation: the Legendre series
+    is evaluated between all pairs of good sensors and between bad
+    and good sensors, and the regularized spline system is inverted.
+
+    Args:
+        pos_from (np.ndarray): Good sensor positions relative to the
+            sphere origin, shape (n_good, 3).
+        pos_to (np.ndarray): Bad sensor positions relative to the
+            sphere origin, shape (n_bad, 3).
+        alpha (float): Regularization added to the diagonal.
+
+    Returns:
+        np.ndarray: Matrix of shape (n_bad, n_good) mapping good
+            channel signals onto the bad channels.
+    """
+    pos_from = pos_from / np.linalg.norm(pos_from, axis=1, keepdims=True)
+    pos_to = pos_to / np.linalg.norm(pos_to, axis=1, keepdims=True)
+    n_from = len(pos_from)
+
+    g_from = _legendre_g(pos_from @ pos_from.T)
+    g_to_from = _legendre_g(pos_to @ pos_from.T)
+    g_from.flat[:: n_from + 1] += alpha
+
+    c = np.block(
+        [
+            [g_from, np.ones((n_from, 1))],
+            [np.ones((1, n_from)), np.zeros((1, 1))],
+        ]
+    )
+    c_inv = np.linalg.pinv(c)
+
+    return np.hstack([g_to_from, np.ones((len(pos_to), 1))]) @ c_inv[:, :-1]
@@ -4,47 +4,138 @@ Loads event information from the BIDS events.tsv file, attaches
 them as annotations to the raw data, then segments the continuous
 recording into fixed-length epochs around each event. Baseline
 correction is applied to remove pre-stimulus DC offset.
+
+The events.tsv file is parsed and validated once per subject into an
+EventIndex (NumPy arrays of onsets and condition codes), which is
+cached next to the dataset and reused by every config and by the
+blink analysis.
+
+By default epochs are gathered from the continuous array in a single
+strided indexing operation into a preallocated buffer, with
+annotation-based rejection and baseline correction done on the whole
+buffer at once, and wrapped as EpochsArray. The mne.Epochs path is
+kept for comparison.
 """
 
+from dataclasses import dataclass
+from os import stat
+from os.path import basename, isfile
+
 from mne_bids import BIDSPath
-from mne import Annotations, events_from_annotations, Epochs
+from mne import Annotations, Epochs, EpochsArray, pick_types
 from mne.io.edf.edf import RawEDF
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import numpy as np
 
+from utils.cache import get_cache_folder, save_arrays_atomic
 from utils.config import StepEpoching
 
+# Parsed events.tsv contents per (path, mtime, size), shared by all
+# configs and pipeline branches running in the same process
+_parsed_events: dict[tuple[str, int, int], tuple[np.ndarray, np.ndarray]] = {}
+
+
+@dataclass
+class EventIndex:
+    """Compiled stimulus events of a single recording.
+
+    Attributes:
+        onsets (np.ndarray): Event onsets in seconds relative to the
+            first sample of the recording, sorted, shape (n_events,).
+        codes (np.ndarray): Integer condition code of each event,
+            shape (n_events,).
+        event_id (dict[str, int]): Mapping of condition label to
+            code (e.g. {"random": 1, "regular": 2}). Codes are
+            assigned in alphabetical label order, as MNE's
+            events_from_annotations() does.
+    """
+
+    onsets: np.ndarray
+    codes: np.ndarray
+    event_id: dict[str, int]
+
+    def samples(self, sfreq: float, first_samp: int = 0) -> np.ndarray:
+        """Event sample positions at the given sampling frequency."""
+        return np.round(self.onsets * sfreq).astype(np.int64) + first_samp
+
+    def events(self, sfreq: float, first_samp: int = 0) -> np.ndarray:
+        """MNE events array of shape (n_events, 3)."""
+        events = np.zeros((len(self.onsets), 3), dtype=np.int64)
+        events[:, 0] = self.samples(sfreq, first_samp)
+        events[:, 2] = self.codes
+        return events
+
+    def labels(self) -> np.ndarray:
+        """Condition label of each event, shape (n_events,)."""
+        labels_by_code = {code: label for label, code in self.event_id.items()}
+        return np.array([labels_by_code[c] for c in self.codes], dtype=object)
+
+    def annotations(self) -> Annotations:
+        """Events as zero-duration MNE Annotations."""
+        return Annotations(
+            onset=self.onsets,
+            duration=np.zeros(len(self.onsets)),
+            description=self.labels(),
+        )
+
 
 def epoch_data(
-    raw: RawEDF, bids_path: BIDSPath, config: StepEpoching
+    raw: RawEDF,
+    bids_path: BIDSPath,
+    config: StepEpoching,
+    event_index: EventIndex | None = None,
 ) -> tuple[Epochs, np.ndarray, dict]:
     """Epoch the continuous data and apply baseline correction.
 
-    Loads stimulus events from the BIDS events.tsv sidecar, attaches
-    them as annotations, extracts MNE events, creates epochs around
-    each stimulus onset, and applies mean baseline subtraction.
+    Takes stimulus events from the subject's event index, attaches
+    them as annotations next to the recording's BAD annotations,
+    creates epochs around each stimulus onset, rejecting those that
+    overlap a BAD annotation, and applies mean baseline subtraction.
 
     Args:
-        raw (RawEDF): Continuous EEG data to epoch. Annotations are
-            attached in place.
+        raw (RawEDF): Continuous EEG data to epoch. Annotations other
+            than BAD ones are replaced by the events in place.
         bids_path (BIDSPath): BIDS path used to locate the
             corresponding events.tsv file.
         config (StepEpoching): Epoching parameters including the
-            time window (tmin/tmax) and baseline correction interval.
+            time window (tmin/tmax), baseline correction interval and
+            event label mapping.
+        event_index (EventIndex | None): Precompiled events of this
+            recording. Loaded via load_event_index() if None.
 
     Returns:
         tuple[Epochs, np.ndarray, dict]: A tuple of:
             - Baseline-corrected epochs.
-            - Events array of shape (n_events, 3) as returned by
-              MNE's events_from_annotations.
+            - Events array of shape (n_events, 3).
             - Event ID dictionary mapping condition names to integer
               codes (e.g. {"random": 1, "regular": 2}).
     """
+    if event_index is None:
+        event_index = load_event_index(
+            bids_path, config, get_cache_folder(str(bids_path.root), "events")
+        )
+
+    # Replace the annotations with the events, keeping the BAD ones of
+    # the recording so that overlapping epochs are still rejected
+    annotations = raw.annotations
+    is_bad = [d.lower().startswith("bad") for d in annotations.description]
+    bad = annotations[np.flatnonzero(is_bad)]
+    raw.set_annotations(event_index.annotations())
+    raw.annotations.append(bad.onset, bad.duration, bad.description)
+    print(f"Found {len(raw.annotations)} annotations.")
+
+    events = event_index.events(raw.info["sfreq"], raw.first_samp)
+    event_dict = dict(event_index.event_id)
 
-    raw = _load_and_attach_annotations(bids_path, raw)
-    events, event_dict = events_from_annotations(raw)
+    if config.method == "vectorized":
+        generate = _generate_epochs_vectorized
+    elif config.method == "mne":
+        generate = _generate_epochs
+    else:
+        raise ValueError(f"Unknown epoching method: {config.method}")
 
-    epochs = _generate_epochs(
+    epochs = generate(
         raw,
         events,
         event_dict,
@@ -52,51 +143,148 @@ def epoch_data(
         config.epochrange_tmin,
         config.epochrange_tmax,
     )
-    epochs.apply_baseline(config.baseline)
 
     return epochs, events, event_dict
 
 
-def _load_and_attach_annotations(bids_path: BIDSPath, raw: RawEDF) -> RawEDF:
-    """Load events from BIDS *events.tsv file and attach as annotations to raw."""
-    annotations = _load_events_from_bids(bids_path)
-    raw.set_annotations(annotations)
+def load_event_index(
+    bids_path: BIDSPath, config: StepEpoching, cache_folder: str | None = None
+) -> EventIndex:
+    """Build the event index of one recording from its events.tsv file.
 
-    print(f"Found {len(raw.annotations)} annotations.")
+    The file is parsed and validated once; the parsed onsets and
+    values are cached in memory and, if a cache folder is given, as
+    an ``.npz`` file that is invalidated when events.tsv changes.
+    Values are mapped to condition labels via ``config.event_labels``.
+    Values without a label get ``config.unknown_event_label`` and are
+    reported, or are dropped if that label is empty.
+
+    Args:
+        bids_path (BIDSPath): BIDS path used to derive the
+            events.tsv file path.
+        config (StepEpoching): Epoching parameters holding the
+            value-to-label mapping.
+        cache_folder (str | None): Directory for the parsed-events
+            cache, or None to only cache in memory.
+
+    Returns:
+        EventIndex: Onsets and condition codes of all labelled events.
+
+    Raises:
+        ValueError: If events.tsv lacks the onset/value columns or
+            contains missing, negative or non-integer entries.
+    """
+    events_tsv = str(bids_path.copy().update(suffix="events", extension=".tsv").fpath)
+    onsets, values = _read_events_tsv(events_tsv, cache_folder)
+
+    label_by_value = {int(v): label for v, label in config.event_labels.items()}
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    unique_labels = [
+        label_by_value.get(int(v), config.unknown_event_label) for v in unique_values
+    ]
+
+    unknown = [int(v) for v in unique_values if int(v) not in label_by_value]
+    if unknown:
+        counts = {v: int((values == v).sum()) for v in unknown}
+        action = (
+            f'labelled "{config.unknown_event_label}"'
+            if config.unknown_event_label
+            else "dropped"
+        )
+        print(f"Events with unmapped values {counts} in {events_tsv} are {action}.")
+
+    event_id = {
+        label: code
+        for code, label in enumerate(sorted(set(unique_labels) - {""}), start=1)
+    }
+    code_by_unique = np.array([event_id.get(label, 0) for label in unique_labels])
+    codes = code_by_unique[inverse]
 
-    return raw
+    keep = codes > 0
+    present = set(np.unique(codes[keep]).tolist())
+    event_id = {label: code for label, code in event_id.items() if code in present}
 
+    return EventIndex(onsets=onsets[keep], codes=codes[keep], event_id=event_id)
 
-def _load_events_from_bids(bids_path: BIDSPath) -> Annotations:
-    """Parse the BIDS events.tsv file into MNE Annotations.
 
-    Maps integer event codes to human-readable condition labels:
-    1 → "regular", 3 → "random". Unrecognized codes are labelled
-    "event".
+def _read_events_tsv(
+    events_tsv: str, cache_folder: str | None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Parse and validate events.tsv, using the in-memory and on-disk caches.
 
     Args:
-        bids_path (BIDSPath): BIDS path used to derive the
-            events.tsv file path.
+        events_tsv (str): Path to the events.tsv file.
+        cache_folder (str | None): Directory for the ``.npz`` cache.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Sorted onsets in seconds and
+            the corresponding integer event values.
+    """
+    st = stat(events_tsv)
+    key = (events_tsv, st.st_mtime_ns, st.st_size)
+    if key in _parsed_events:
+        return _parsed_events[key]
+
+    cache_file = None
+    if cache_folder is not None:
+        cache_file = f"{cache_folder}/{basename(events_tsv).replace('.tsv', '.npz')}"
+
+    parsed = None
+    if cache_file is not None and isfile(cache_file):
+        with np.load(cache_file) as cached:
+            if (
+                int(cached["source_mtime_ns"]) == st.st_mtime_ns
+                and int(cached["source_size"]) == st.st_size
+            ):
+                parsed = (cached["onsets"], cached["values"])
+
+    if parsed is None:
+        parsed = _parse_events_tsv(events_tsv)
+        if cache_file is not None:
+            save_arrays_atomic(
+                cache_file,
+                onsets=parsed[0],
+                values=parsed[1],
+                source_mtime_ns=st.st_mtime_ns,
+                source_size=st.st_size,
+            )
+
+    _parsed_events[key] = parsed
+    return parsed
+
+
+def _parse_events_tsv(events_tsv: str) -> tuple[np.ndarray, np.ndarray]:
+    """Read the onset and value columns of a BIDS events.tsv file.
+
+    Args:
+        events_tsv (str): Path to the events.tsv file.
 
     Returns:
-        Annotations: MNE Annotations object with onset times and
-            condition labels for each stimulus event.
+        tuple[np.ndarray, np.ndarray]: Onsets in seconds (float64) and
+            event values (int64), sorted by onset.
+
+    Raises:
+        ValueError: If a column is missing or holds missing, negative
+            or non-integer entries.
     """
-    events_tsv = bids_path.copy().update(suffix="events", extension=".tsv").fpath
-    df = pd.read_csv(events_tsv, sep="\t")
+    df = pd.read_csv(events_tsv, sep="\t", usecols=lambda c: c in ("onset", "value"))
+
+    for column in ("onset", "value"):
+        if column not in df.columns:
+            raise ValueError(f"{events_tsv} has no '{column}' column")
 
     # BIDS events.tsv has onset (s), duration (s), and trial_type or value
-    onsets = df["onset"].astype(float).to_list()
-    durations = [0.0] * len(onsets)
+    onsets = pd.to_numeric(df["onset"], errors="coerce").to_numpy(dtype=float)
+    values = pd.to_numeric(df["value"], errors="coerce").to_numpy(dtype=float)
 
-    value_mapping = {1: "regular", 3: "random"}
-    values = df["value"].astype(int).to_list()
-    descriptions = []
+    if not np.isfinite(onsets).all() or (onsets < 0).any():
+        raise ValueError(f"{events_tsv} has missing or negative onsets")
+    if not np.isfinite(values).all() or (values != np.round(values)).any():
+        raise ValueError(f"{events_tsv} has missing or non-integer values")
 
-    for v in values:
-        descriptions.append(value_mapping.get(v, "event"))
+    order = np.argsort(onsets, kind="stable")
 
-    return Annotations(onset=onsets, duration=durations, description=descriptions)
+    return onsets[order], values[order].astype(np.int64)
 
 
 def _generate_epochs(raw, events, event_dict, baseline, tmin, tmax) -> Epochs:
@@ -134,3 +322,125 @@ def _generate_epochs(raw, events, event_dict, baseline, tmin, tmax) -> Epochs:
     )
 
     return epochs
+
+
+def _generate_epochs_vectorized(raw, events, event_dict, baseline, tmin, tmax):
+    """Create epochs by gathering all windows from the continuous array at once.
+
+    Produces the same epochs as _generate_epochs(): sample windows are
+    rounded the same way, epochs overlapping BAD annotations or
+    exceeding the recording are dropped with the same drop log
+    reasons, and the mean of the baseline window is subtracted from
+    all data channels. Instead of reading the raw data epoch by
+    epoch, a strided view of the continuous array is indexed once,
+    filling a single (epochs x channels x times) buffer.
+
+    Args:
+        raw (RawEDF): Continuous EEG data.
+        events (np.ndarray): Events array of shape (n_events, 3).
+        event_dict (dict): Mapping of condition names to event codes.
+        baseline (list[float]): Two-element list [start, end] in
+            seconds for baseline correction.
+        tmin (float): Start of the epoch relative to stimulus onset
+            in seconds.
+        tmax (float): End of the epoch relative to stimulus onset
+            in seconds.
+
+    Returns:
+        EpochsArray: Preloaded, baseline-corrected epochs with
+            annotation-based rejection applied.
+    """
+    sfreq = raw.info["sfreq"]
+    start_idx = int(round(tmin * sfreq))
+    times = np.arange(start_idx, int(round(tmax * sfreq)) + 1) / sfreq
+    n_times = len(times)
+
+    events = events[np.isin(events[:, 2], list(event_dict.values()))]
+    starts = events[:, 0] - raw.first_samp + start_idx
+    stops = starts + n_times
+
+    drop_reasons = np.full(len(events), "", dtype=object)
+    drop_reasons[starts < 0] = "NO_DATA"
+    drop_reasons[(starts >= 0) & (stops > raw.n_times)] = "TOO_SHORT"
+    drop_reasons = _reject_by_bad_annotations(raw, starts, stops, drop_reasons)
+
+    keep = drop_reasons == ""
+    selection = np.flatnonzero(keep)
+    drop_log = tuple(() if r == "" else (r,) for r in drop_reasons)
+
+    # Gather every kept window in one indexing operation: indexing the
+    # (windows x channels x times) strided view allocates the output
+    # buffer once and copies each window straight into it
+    data = raw.get_data()
+    windows = sliding_window_view(data, n_times, axis=1).transpose(1, 0, 2)
+    epochs_data = windows[starts[keep]]
+    del windows, data
+
+    # Baseline correction on all data channels (as mne.Epochs does)
+    imin = int(np.flatnonzero(times >= baseline[0])[0])
+    imax = int(np.flatnonzero(times <= baseline[1])[-1]) + 1
+    picks = pick_types(
+        raw.info, eeg=True, eog=True, ecg=True, emg=True, bio=True, exclude=()
+    )
+    epochs_data[:, picks] -= epochs_data[:, picks, imin:imax].mean(
+        axis=-1, keepdims=True
+    )
+
+    epochs = EpochsArray(
+        epochs_data,
+        raw.info,
+        events=events[keep],
+        tmin=times[0],
+        event_id=event_dict,
+        selection=selection,
+        drop_log=drop_log,
+        raw_sfreq=sfreq,
+    )
+    epochs.baseline = (float(times[imin]), float(times[imax - 1]))
+
+    print(f"Created {len(epochs)} epochs ({len(events) - len(epochs)} dropped).")
+
+    return epochs
+
+
+def _reject_by_bad_annotations(raw, starts, stops, drop_reasons):
+    """Mark epochs overlapping BAD annotations, vectorized over all epochs.
+
+    An epoch [start, stop) is rejected if any annotation whose
+    description starts with "bad" (case-insensitive) overlaps it. As
+    in MNE, the description of the first such annotation becomes the
+    drop reason.
+
+    Args:
+        raw (RawEDF): Continuous data carrying the annotations.
+        starts (np.ndarray): First sample of each epoch (relative to
+            the first sample of the data).
+        stops (np.ndarray): End sample (exclusive) of each epoch.
+        drop_reasons (np.ndarray): Current drop reason per epoch,
+            "" for kept epochs. Not modified.
+
+    Returns:
+        np.ndarray: Updated drop reasons.
+    """
+    annotations = raw.annotations
+    is_bad = np.array(
+        [d.lower().startswith("bad") for d in annotations.description], dtype=bool
+    )
+    if not is_bad.any():
+        return drop_reasons
+
+    sfreq = raw.info["sfreq"]
+    onsets = annotations.onset[is_bad] - raw.first_time
+    ends = onsets + annotations.duration[is_bad]
+    descriptions = annotations.description[is_bad]
+
+    # (n_epochs, n_bad_annotations) overlap matrix
+    overlaps = (onsets[np.newaxis, :] < stops[:, np.newaxis] / sfreq) & (
+        ends[np.newaxis, :] > starts[:, np.newaxis] / sfreq
+    )
+    rejected = overlaps.any(axis=1) & (drop_reasons == "")
+
+    drop_reasons = drop_reasons.copy()
+    drop_reasons[rejected] = descriptions[overlaps[rejected].argmax(axis=1)]
+
+    return drop_reasons
@@ -5,9 +5,19 @@ Rejects epochs whose peak-to-peak amplitude exceeds a threshold
 flat/disconnected channels). Rejection is applied separately for
 EEG and EOG channel types, and statistics are logged per condition
 for quality reporting.
+
+The peak-to-peak amplitude of every epoch and channel is computed
+once as an (epochs x channels) matrix; all keep masks are derived
+from it. The matrix is returned with the rejection log so other
+thresholds can be evaluated later without re-epoching.
+
+The drop log is stored as a packed boolean (epochs x labels) bitmap,
+where the labels are the channel names followed by any non-channel
+drop reasons (e.g. "BAD_" annotations or "TOO_SHORT").
 """
 
-from mne import Epochs
+from mne import Epochs, channel_indices_by_type
+import numpy as np
 
 from utils.config import StepTrialRejection
 
@@ -19,14 +29,15 @@ def reject_trials(
 ) -> tuple[Epochs, dict]:
     """Reject epochs containing amplitude-based artifacts.
 
-    Creates a copy of the epochs, applies peak-to-peak amplitude
-    thresholds and flat-signal detection, then computes rejection
-    statistics broken down by condition (random/regular).
+    Computes the peak-to-peak amplitude matrix of all epochs, applies
+    amplitude thresholds and flat-signal detection to it, drops the
+    offending epochs in place and computes rejection statistics broken
+    down by condition. Produces the same result and drop log as MNE's
+    drop_bad().
 
     Args:
-        epochs (Epochs): Epoched EEG data containing "random" and
-            "regular" conditions. Not modified; a cleaned copy is
-            returned.
+        epochs (Epochs): Preloaded epoched EEG data. Bad epochs are
+            dropped in place.
         config (StepTrialRejection): Rejection parameters including
             amplitude thresholds for EEG and EOG channels, and the
             minimum amplitude for flat channel detection.
@@ -35,7 +46,7 @@ def reject_trials(
 
     Returns:
         tuple[Epochs, dict]: A tuple of:
-            - Cleaned epochs with bad trials dropped.
+            - The same epochs with bad trials dropped.
             - Rejection log dictionary containing:
                 - n_epochs_before/after: Total epoch counts.
                 - n_epochs_regular/random_before: Per-condition counts.
@@ -43,8 +54,18 @@ def reject_trials(
                   Rejection counts overall and per condition.
                 - rejection_rate: Percentage of epochs rejected.
                 - reject_criteria, flat_criteria: Thresholds used.
-                - drop_log: MNE's per-epoch drop log (tuple of tuples
-                  listing the channels that caused each rejection).
+                - drop_log_bits (np.ndarray): MNE's per-epoch drop
+                  log as a bitmap packed along the label axis, see
+                  pack_drop_log().
+                - drop_log_labels (np.ndarray): Channel name or drop
+                  reason of each bitmap column.
+                - ptp_bads: Bad channels, which are never checked.
+                - ptp_amplitudes (np.ndarray): Peak-to-peak amplitude
+                  in Volts per epoch and channel, before rejection.
+                - ptp_channels, ptp_channel_types (np.ndarray): Name
+                  and type of each matrix column.
+                - ptp_conditions (np.ndarray): Condition label of
+                  each matrix row.
     """
     n_epochs_before = len(epochs)
 
@@ -61,32 +82,43 @@ def reject_trials(
     if "eog" in ch_types:
         reject["eog"] = config.eog_threshold
 
-    epochs_random = epochs["random"]
-    epochs_regular = epochs["regular"]
+    ptp = compute_peak_to_peak(epochs)
+    channel_type_idx = channel_indices_by_type(epochs.info)
+    offending = find_offending_channels(
+        ptp, epochs.ch_names, channel_type_idx, epochs.info["bads"], reject, flat
+    )
+    conditions = epoch_conditions(epochs)
 
-    # Apply rejection criteria
-    epochs_clean = epochs.copy()
-    epochs_clean.drop_bad(reject=reject, flat=flat)
-    epochs_random_clean = epochs_clean["random"]
-    epochs_regular_clean = epochs_clean["regular"]
+    bad = offending.any(axis=(0, 2))
+    _drop_with_reasons(epochs, bad, offending, channel_type_idx, reject, flat)
 
-    n_epochs_after = len(epochs_clean)
+    n_epochs_after = len(epochs)
     n_rejected = n_epochs_before - n_epochs_after
     rejection_rate = (n_rejected / n_epochs_before) * 100 if n_epochs_before > 0 else 0
 
-    # Convert drop_log to serializable format for JSON export
+    is_random = conditions == "random"
+    is_regular = conditions == "regular"
+
+    drop_log_bits, drop_log_labels = pack_drop_log(epochs.drop_log, epochs.ch_names)
+
     reject_log: dict = {
         "n_epochs_before": n_epochs_before,
         "n_epochs_after": n_epochs_after,
-        "n_epochs_regular_before": len(epochs_regular),
-        "n_epochs_random_before": len(epochs_random),
+        "n_epochs_regular_before": int(is_regular.sum()),
+        "n_epochs_random_before": int(is_random.sum()),
         "n_rejected": n_rejected,
-        "n_rejected_random": len(epochs_random) - len(epochs_random_clean),
-        "n_rejected_regular": len(epochs_regular) - len(epochs_regular_clean),
+        "n_rejected_random": int((bad & is_random).sum()),
+        "n_rejected_regular": int((bad & is_regular).sum()),
         "rejection_rate": rejection_rate,
         "reject_criteria": reject,
         "flat_criteria": flat,
-        "drop_log": epochs_clean.drop_log,
+        "drop_log_bits": drop_log_bits,
+        "drop_log_labels": drop_log_labels,
+        "ptp_bads": list(epochs.info["bads"]),
+        "ptp_amplitudes": ptp,
+        "ptp_channels": np.array(epochs.ch_names),
+        "ptp_channel_types": np.array(ch_types),
+        "ptp_conditions": conditions,
     }
 
     if verbose:
@@ -103,46 +135,210 @@ def reject_trials(
                 "  WARNING: High rejection rate (>30%). Consider reviewing data quality."
             )
 
-    return epochs_clean, reject_log
+    return epochs, reject_log
+
+
+def compute_peak_to_peak(epochs: Epochs) -> np.ndarray:
+    """Compute the peak-to-peak amplitude of every epoch and channel.
+
+    Args:
+        epochs (Epochs): Preloaded epoched data.
+
+    Returns:
+        np.ndarray: Peak-to-peak amplitudes, shape (n_epochs, n_channels).
+    """
+    return np.ptp(epochs.get_data(copy=False), axis=2)
+
+
+def epoch_conditions(epochs: Epochs) -> np.ndarray:
+    """Look up the condition label of every epoch.
+
+    Args:
+        epochs (Epochs): Epoched data with an event_id mapping.
+
+    Returns:
+        np.ndarray: Condition label per epoch, shape (n_epochs,).
+    """
+    labels_by_code = {code: label for label, code in epochs.event_id.items()}
+    return np.array([labels_by_code.get(c, "") for c in epochs.events[:, 2]])
+
+
+def find_offending_channels(
+    ptp: np.ndarray,
+    ch_names: list[str] | np.ndarray,
+    channel_type_idx: dict[str, list[int]],
+    bads: list[str] | np.ndarray,
+    reject: dict[str, float],
+    flat: dict[str, float],
+) -> np.ndarray:
+    """Mark the channels that cause each epoch to be rejected.
+
+    A channel offends if its peak-to-peak amplitude exceeds the
+    reject threshold or falls below the flat threshold of its type.
+    Bad channels are ignored, like in MNE's drop_bad().
+
+    Args:
+        ptp (np.ndarray): Peak-to-peak amplitudes, shape
+            (n_epochs, n_channels).
+        ch_names (list[str] | np.ndarray): Name of each column.
+        channel_type_idx (dict[str, list[int]]): Column indices per
+            channel type.
+        bads (list[str] | np.ndarray): Names of bad channels.
+        reject (dict[str, float]): Upper thresholds per channel type.
+        flat (dict[str, float]): Lower thresholds per channel type.
+
+    Returns:
+        np.ndarray: Boolean array of shape (2, n_epochs, n_channels).
+            Index 0 marks reject offences, index 1 flat offences.
+    """
+    offending = np.zeros((2,) + ptp.shape, dtype=bool)
+    for i, (thresholds, compare) in enumerate(
+        ((reject, np.greater), (flat, np.less))
+    ):
+        for ch_type, threshold in thresholds.items():
+            idx = channel_type_idx.get(ch_type, [])
+            if len(idx) > 0:
+                offending[i][:, idx] = compare(ptp[:, idx], threshold)
+
+    if len(bads) > 0:
+        offending[..., np.isin(ch_names, bads)] = False
+
+    return offending
 
 
-def get_rejection_summary(reject_log: dict) -> dict[str, list | dict[str, list[int]]]:
+def _drop_with_reasons(
+    epochs: Epochs,
+    bad: np.ndarray,
+    offending: np.ndarray,
+    channel_type_idx: dict[str, list[int]],
+    reject: dict[str, float],
+    flat: dict[str, float],
+) -> None:
+    """Drop bad epochs in place, logging the offending channels.
+
+    The reasons are listed in the order MNE's drop_bad() uses: reject
+    offences before flat offences, grouped by channel type in
+    threshold order.
+
+    Args:
+        epochs (Epochs): Epochs to drop from.
+        bad (np.ndarray): Boolean mask of epochs to drop.
+        offending (np.ndarray): Output of find_offending_channels().
+        channel_type_idx (dict[str, list[int]]): Column indices per
+            channel type.
+        reject (dict[str, float]): Upper thresholds per channel type.
+        flat (dict[str, float]): Lower thresholds per channel type.
+    """
+    checks = [
+        (kind, column)
+        for kind, thresholds in enumerate((reject, flat))
+        for ch_type in thresholds
+        for column in channel_type_idx.get(ch_type, [])
+    ]
+
+    drop_log = list(epochs.drop_log)
+    for epoch in np.flatnonzero(bad):
+        drop_log[epochs.selection[epoch]] = tuple(
+            epochs.ch_names[c] for kind, c in checks if offending[kind, epoch, c]
+        )
+
+    epochs.drop(bad)
+    epochs.drop_log = tuple(drop_log)
+
+
+def pack_drop_log(
+    drop_log: tuple[tuple[str, ...], ...], ch_names: list[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Convert an MNE drop log into a packed boolean bitmap.
+
+    Args:
+        drop_log (tuple[tuple[str, ...], ...]): MNE drop log, one
+            tuple of reasons per original epoch.
+        ch_names (list[str]): Channel names, used as the first
+            columns so the column layout is stable across subjects.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: A tuple of:
+            - Bitmap of shape (n_epochs, ceil(n_labels / 8)), uint8,
+              packed along the label axis.
+            - Labels of shape (n_labels,): the channel names followed
+              by the remaining drop reasons in sorted order.
+    """
+    other = sorted({r for reasons in drop_log for r in reasons} - set(ch_names))
+    labels = list(ch_names) + other
+    column = {label: i for i, label in enumerate(labels)}
+
+    matrix = np.zeros((len(drop_log), len(labels)), dtype=bool)
+    for epoch, reasons in enumerate(drop_log):
+        if reasons:
+            matrix[epoch, [column[r] for r in reasons]] = True
+
+    return np.packbits(matrix, axis=1), np.array(labels)
+
+
+def drop_log_matrix(reject_log: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Unpack the drop log bitmap of a rejection log.
+
+    Rejection logs written before the bitmap was introduced store the
+    drop log as tuples under "drop_log"; those are converted on the
+    fly.
+
+    Args:
+        reject_log (dict): Rejection log as returned by reject_trials()
+            or read back by read_meta().
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Boolean matrix of shape
+            (n_epochs, n_labels) and the labels of its columns.
+    """
+    if "drop_log_bits" in reject_log:
+        bits, labels = reject_log["drop_log_bits"], reject_log["drop_log_labels"]
+    else:
+        bits, labels = pack_drop_log(
+            tuple(tuple(r) for r in reject_log["drop_log"]), []
+        )
+
+    matrix = np.unpackbits(bits, axis=1, count=len(labels)).astype(bool)
+    return matrix, np.asarray(labels)
+
+
+def get_rejection_summary(reject_log: dict) -> dict[str, list | dict]:
     """Generate a detailed breakdown of rejection reasons per epoch.
 
-    Parses MNE's drop_log to categorize each epoch as kept, rejected
-    by a specific channel (with the channel name), or user-rejected.
+    Reads the drop log bitmap to categorize each epoch as kept,
+    rejected by a specific channel (with the channel name), or
+    user-rejected.
 
     Args:
         reject_log (dict): Rejection log as returned by reject_trials().
 
     Returns:
-        dict[str, list | dict[str, list[int]]]: Summary with keys:
+        dict[str, list | dict]: Summary with keys:
             - "kept" (list[int]): Indices of retained epochs.
             - "rejected_by_channel" (dict[str, list[int]]): Mapping
               of channel name to the epoch indices it caused to be
               rejected.
             - "user_rejected" (list[int]): Indices of epochs rejected
               manually by the user (if any).
+            - "rejected_count_by_channel" (dict[str, int]): Number of
+              epochs each channel caused to be rejected.
     """
-    drop_log = reject_log["drop_log"]
+    matrix, labels = drop_log_matrix(reject_log)
 
-    summary: dict[str, list | dict[str, list[int]]] = {
-        "kept": [],
-        "rejected_by_channel": {},
-        "user_rejected": [],
-    }
+    n_reasons = matrix.sum(axis=1)
+    is_user = labels == "USER"
+    user_only = (n_reasons == 1) & matrix[:, is_user].any(axis=1)
+    by_channel = matrix & ~user_only[:, None]
+    counts = by_channel.sum(axis=0)
 
-    for idx, reasons in enumerate(drop_log):
-        if len(reasons) == 0:
-            assert isinstance(summary["kept"], list)
-            summary["kept"].append(idx)
-        elif reasons == ("USER",):
-            assert isinstance(summary["user_rejected"], list)
-            summary["user_rejected"].append(idx)
-        else:
-            for channel in reasons:
-                if channel not in summary["rejected_by_channel"]:
-                    summary["rejected_by_channel"][channel] = []
-                summary["rejected_by_channel"][channel].append(idx)
-
-    return summary
+    return {
+        "kept": np.flatnonzero(n_reasons == 0).tolist(),
+        "rejected_by_channel": {
+            str(labels[c]): np.flatnonzero(by_channel[:, c]).tolist()
+            for c in np.flatnonzero(counts)
+        },
+        "user_rejected": np.flatnonzero(user_only).tolist(),
+        "rejected_count_by_channel": {
+            str(labels[c]): int(counts[c]) for c in np.flatnonzero(counts)
+        },
+    }
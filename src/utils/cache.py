@@ -0,0 +1,132 @@
+"""Content-addressed cache helpers for expensive pipeline results.
+
+Results such as fitted ICA decompositions are keyed by a hash of
+the config sections that produced their input and a fingerprint of
+the input data itself. Configs that share the same upstream steps
+therefore reuse each other's results, while any change upstream
+produces a new key.
+
+Cached files live under ``<bids_root>/cache/<kind>/``.
+"""
+
+from dataclasses import asdict
+from hashlib import blake2b
+from json import dumps
+from os import getpid, makedirs, replace
+from os.path import isdir
+
+import numpy as np
+from mne.io import BaseRaw
+
+
+def get_cache_folder(bids_root: str, kind: str) -> str:
+    """Resolve (and create) the cache directory for one kind of result.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        kind (str): Name of the cached result type (e.g. "ica").
+
+    Returns:
+        str: Path to the cache directory, e.g. ``<bids_root>/cache/ica``.
+    """
+    folder = f"{bids_root.rstrip('/')}/cache/{kind}"
+    if not isdir(folder):
+        makedirs(folder)
+    return folder
+
+
+def hash_config_sections(*sections) -> str:
+    """Hash a sequence of pipeline step configs.
+
+    Sections that have an ``enabled`` flag set to False contribute
+    only their name, so disabled steps with different (unused)
+    parameters still hash identically.
+
+    Args:
+        *sections: Step config dataclass instances (e.g.
+            StepFiltering, StepASR), in pipeline order.
+
+    Returns:
+        str: Hex digest identifying the combined configuration.
+    """
+    h = blake2b(digest_size=16)
+    for section in sections:
+        values = asdict(section)
+        if not values.get("enabled", True):
+            values = {"enabled": False}
+        h.update(type(section).__name__.encode())
+        h.update(dumps(values, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def hash_raw_data(raw: BaseRaw) -> str:
+    """Fingerprint the contents of a preloaded Raw object.
+
+    Covers the sample data as well as the channel layout, bad
+    channels and sampling rate, since all of them influence results
+    computed from the data.
+
+    Args:
+        raw (BaseRaw): Preloaded continuous data.
+
+    Returns:
+        str: Hex digest identifying the data.
+    """
+    data = np.ascontiguousarray(raw.get_data())
+
+    h = blake2b(digest_size=16)
+    header = {
+        "ch_names": raw.ch_names,
+        "ch_types": raw.get_channel_types(),
+        "bads": raw.info["bads"],
+        "sfreq": raw.info["sfreq"],
+        "shape": list(data.shape),
+    }
+    h.update(dumps(header, sort_keys=True).encode())
+    h.update(data.data)
+    return h.hexdigest()
+
+
+def combine_hashes(*hashes: str) -> str:
+    """Combine several hex digests into a single cache key.
+
+    Args:
+        *hashes (str): Digests as returned by the hash_* helpers.
+
+    Returns:
+        str: Hex digest of the combined inputs.
+    """
+    h = blake2b(digest_size=16)
+    for part in hashes:
+        h.update(part.encode())
+    return h.hexdigest()
+
+
+def save_array_atomic(path: str, array: np.ndarray) -> None:
+    """Save a NumPy array to the cache without exposing partial files.
+
+    Several worker processes may compute the same entry at once, so
+    the array is written under a process-specific name first and
+    then moved into place.
+
+    Args:
+        path (str): Target ``.npy`` file path.
+        array (np.ndarray): Array to store.
+    """
+    tmp_path = path.replace(".npy", f"-{getpid()}.npy")
+    np.save(tmp_path, array)
+    replace(tmp_path, path)
+
+
+def save_arrays_atomic(path: str, **arrays: np.ndarray) -> None:
+    """Save several NumPy arrays to the cache without exposing partial files.
+
+    The ``.npz`` counterpart of save_array_atomic().
+
+    Args:
+        path (str): Target ``.npz`` file path.
+        **arrays (np.ndarray): Arrays to store, by name.
+    """
+    tmp_path = path.replace(".npz", f"-{getpid()}.npz")
+    np.savez(tmp_path, **arrays)
+    replace(tmp_path, path)
@@ -130,10 +130,37 @@ class StepICA:
             interpreted as the fraction of variance to retain in PCA
             before ICA. Overridden at runtime by data rank when
             necessary.
+        cache (bool): Whether to reuse fitted ICA decompositions
+            from the on-disk cache. A decomposition is reused when
+            the upstream config sections and the input data are
+            identical, so only component classification is rerun.
+        eog_channels (list[str]): EOG channels whose time courses are
+            correlated with the component sources to find ocular
+            components.
+        ecg_channel (str): Channel used to detect R-peaks for the
+            cardiac template. An empty string selects the first
+            channel of type "ecg"; if there is none, cardiac
+            classification is skipped.
+        eog_threshold (float): Iterated z-score threshold on the
+            source/EOG correlations above which a component is
+            excluded.
+        ecg_threshold (float): Iterated z-score threshold on the
+            source/R-peak template correlations above which a
+            component is excluded.
+        classification_sfreq (float): Sampling frequency in Hz the
+            data is decimated to before computing correlations.
+            Must stay above twice the highest classification band
+            edge (16 Hz).
     """
 
     enabled: bool = True
     n_components: float = 0.99
+    cache: bool = True
+    eog_channels: list[str] = field(default_factory=lambda: ["EOG5", "EOG6"])
+    ecg_channel: str = ""
+    eog_threshold: float = 3.0
+    ecg_threshold: float = 3.0
+    classification_sfreq: float = 64.0
 
 
 @dataclass
@@ -166,11 +193,24 @@ class StepEpoching:
         baseline (list[float]): Time window for baseline correction in
             seconds, as [start, end]. Mean amplitude in this window is
             subtracted from the entire epoch.
+        method (str): "vectorized" gathers all epochs from the
+            continuous array in one indexing operation; "mne" builds
+            them through mne.Epochs. Both produce the same data.
+        event_labels (dict[str, str]): Mapping of events.tsv values
+            to condition labels. Keys are strings since TOML keys
+            must be.
+        unknown_event_label (str): Label given to events whose value
+            is not in event_labels. An empty string drops them.
     """
 
     epochrange_tmin: float = -0.5
     epochrange_tmax: float = 1.0
     baseline: list[float] = field(default_factory=lambda: [-0.25, 0.0])
+    method: str = "vectorized"
+    event_labels: dict[str, str] = field(
+        default_factory=lambda: {"1": "regular", "3": "random"}
+    )
+    unknown_event_label: str = "event"
 
 
 @dataclass
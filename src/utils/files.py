@@ -1,17 +1,39 @@
 """File I/O utilities for saving and loading pipeline outputs.
 
 Handles reading and writing of MNE FIF files (epochs, raw, ICA)
-and JSON metadata produced by the preprocessing pipeline.
+and JSON metadata produced by the preprocessing pipeline. NumPy
+arrays in the metadata (e.g. the peak-to-peak matrix from trial
+rejection) are stored next to it in an ``.npz`` file.
+
+Run statistics of all subjects of a config are kept in a single
+columnar table, ``<config folder>/run_stats.parquet``, with one row
+per subject. The Welch PSD of each subject's final continuous data
+is stored as ``sub-<id>_psd.npz``.
 """
 
 from glob import glob
 from json import dumps, loads
+from os import getpid, remove, replace
 from os.path import isdir, isfile
 
 from mne import Epochs, read_epochs
 from mne.io import read_raw_fif, Raw
 from mne.io.edf.edf import RawEDF
 from mne.preprocessing import ICA, read_ica
+import numpy as np
+import pandas as pd
+
+# Rejection log entries copied into the run statistics table
+REJECTION_STAT_KEYS = (
+    "n_epochs_before",
+    "n_epochs_after",
+    "n_epochs_regular_before",
+    "n_epochs_random_before",
+    "n_rejected",
+    "n_rejected_random",
+    "n_rejected_regular",
+    "rejection_rate",
+)
 
 
 def save_data(
@@ -38,7 +60,10 @@ def save_data(
         ica (ICA | None): Fitted ICA object, or None if ICA was
             skipped or failed.
         pipeline_stats (dict | None): Rejection statistics and
-            metadata, or None if trial rejection was skipped.
+            metadata, or None if trial rejection was skipped. Values
+            that are NumPy arrays go to sub-<id>_meta.npz (removed if
+            there are none), everything else to sub-<id>_meta.txt as
+            JSON.
     """
     epochs.save(f"{output_folder}/sub-{subject_id}_epo.fif", overwrite=True)
     raw.save(f"{output_folder}/sub-{subject_id}_raw.fif", overwrite=True)
@@ -46,8 +71,16 @@ def save_data(
         ica.save(f"{output_folder}/sub-{subject_id}_ica.fif", overwrite=True)
 
     if pipeline_stats is not None:
+        arrays = {k: v for k, v in pipeline_stats.items() if isinstance(v, np.ndarray)}
+        values = {k: v for k, v in pipeline_stats.items() if k not in arrays}
         with open(f"{output_folder}/sub-{subject_id}_meta.txt", "w") as f:
-            f.write(dumps(pipeline_stats))
+            f.write(dumps(values))
+        arrays_path = f"{output_folder}/sub-{subject_id}_meta.npz"
+        if arrays:
+            np.savez(arrays_path, **arrays)
+        elif isfile(arrays_path):
+            # Left by an earlier run, read_data() would merge it in
+            remove(arrays_path)
 
 
 def read_data(
@@ -70,6 +103,7 @@ def read_data(
         tuple[Epochs | None, Raw | None, ICA | None, dict | None]:
             A tuple of (epochs, raw, ica, pipeline_stats), where each
             element is None if the corresponding file was not found.
+            pipeline_stats includes the arrays from sub-<id>_meta.npz.
 
     Raises:
         FileNotFoundError: If the config subdirectory does not exist.
@@ -90,12 +124,111 @@ def read_data(
     if isfile(f"{path}/sub-{subject_id}_ica.fif"):
         ica = read_ica(f"{path}/sub-{subject_id}_ica.fif")
     if isfile(f"{path}/sub-{subject_id}_meta.txt"):
-        with open(f"{path}/sub-{subject_id}_meta.txt", "r") as f:
-            pipeline_stats = loads(f.read())
+        pipeline_stats = read_meta(path, subject_id)
 
     return epochs, raw, ica, pipeline_stats
 
 
+def save_psd(
+    output_folder: str,
+    subject_id: str,
+    freqs: np.ndarray,
+    psd: np.ndarray,
+    ch_names: list[str],
+) -> None:
+    """Save a subject's power spectral density.
+
+    Args:
+        output_folder (str): Config output directory.
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        freqs (np.ndarray): Frequencies in Hz, shape (n_freqs,).
+        psd (np.ndarray): PSD in V²/Hz, shape (n_channels, n_freqs).
+        ch_names (list[str]): Channel names of the PSD rows.
+    """
+    np.savez(
+        artifact_path(output_folder, subject_id, "psd"),
+        freqs=freqs,
+        psd=psd.astype(np.float32),
+        ch_names=np.array(ch_names),
+    )
+
+
+def read_artifact(
+    output_folder: str, subject_id: str, kind: str
+) -> Epochs | Raw | ICA | dict[str, np.ndarray] | None:
+    """Load a single pipeline output of a subject.
+
+    Args:
+        output_folder (str): Config output directory (e.g.
+            "data/processed/1").
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        kind (str): "epo", "raw", "ica" or "psd".
+
+    Returns:
+        Epochs | Raw | ICA | dict[str, np.ndarray] | None: The loaded
+            object, or None if the file does not exist. A PSD is
+            returned as a dict with "freqs", "psd" and "ch_names".
+
+    Raises:
+        NotImplementedError: If kind is not one of the above.
+    """
+    path = artifact_path(output_folder, subject_id, kind)
+    if not isfile(path):
+        return None
+    if kind == "epo":
+        return read_epochs(path, preload=True)
+    if kind == "raw":
+        return read_raw_fif(path, preload=True)
+    if kind == "psd":
+        with np.load(path) as stored:
+            return {k: stored[k] for k in stored.files}
+    return read_ica(path)
+
+
+def artifact_path(output_folder: str, subject_id: str, kind: str) -> str:
+    """Build the file path of a subject's pipeline output.
+
+    Args:
+        output_folder (str): Config output directory.
+        subject_id (str): Zero-padded subject identifier.
+        kind (str): "epo", "raw", "ica" or "psd".
+
+    Returns:
+        str: Path like ``<output_folder>/sub-001_epo.fif``. PSDs are
+            stored as ``.npz``.
+
+    Raises:
+        NotImplementedError: If kind is not one of the above.
+    """
+    if kind == "psd":
+        return f"{output_folder}/sub-{subject_id}_psd.npz"
+    if kind not in ("epo", "raw", "ica"):
+        raise NotImplementedError(f"File type {kind} not implemented")
+    return f"{output_folder}/sub-{subject_id}_{kind}.fif"
+
+
+def read_meta(path: str, subject_id: str, arrays: bool = True) -> dict:
+    """Load the pipeline statistics of a single subject.
+
+    Args:
+        path (str): Config output directory (e.g. "data/processed/1").
+        subject_id (str): Zero-padded subject identifier (e.g. "001").
+        arrays (bool): Whether to also load the NumPy arrays from
+            sub-<id>_meta.npz, if present.
+
+    Returns:
+        dict: The JSON statistics, merged with the stored arrays.
+    """
+    with open(f"{path}/sub-{subject_id}_meta.txt", "r") as f:
+        pipeline_stats = loads(f.read())
+
+    if arrays and isfile(f"{path}/sub-{subject_id}_meta.npz"):
+        with np.load(f"{path}/sub-{subject_id}_meta.npz") as stored:
+            pipeline_stats.update({k: stored[k] for k in stored.files})
+
+    return pipeline_stats
+
+
 def read_all_files_per_type(
     data_folder: str, config_id: int, file_type: str
 ) -> dict[str, Epochs]:
@@ -140,3 +273,90 @@ def read_all_files_per_type(
 
     else:
         raise NotImplementedError(f"File type {file_type} not implemented")
+
+
+def update_run_stats(output_folder: str, rows: list[dict]) -> None:
+    """Add or replace subject rows in a config's run statistics table.
+
+    Rows of subjects that are already present are replaced, so
+    rerunning a subject never duplicates it. A config folder
+    processed before the table existed is converted from its
+    sub-*_meta.txt files first, so its other subjects are kept. The
+    table is written under a temporary name and moved into place.
+
+    Args:
+        output_folder (str): Config output directory (e.g.
+            "data/processed/1").
+        rows (list[dict]): Run statistics as returned by
+            run_pipeline(), each with at least a "subject" key.
+    """
+    path = f"{output_folder}/run_stats.parquet"
+    new = pd.DataFrame(rows)
+    old = pd.read_parquet(path) if isfile(path) else _legacy_run_stats(output_folder)
+    if not old.empty:
+        new = pd.concat(
+            [old[~old["subject"].isin(new["subject"])], new], ignore_index=True
+        )
+
+    new = new.sort_values("subject", ignore_index=True)
+    tmp_path = path.replace(".parquet", f"-{getpid()}.parquet")
+    new.to_parquet(tmp_path, index=False)
+    replace(tmp_path, path)
+
+
+def read_run_stats(data_folder: str, config_ids: list[int]) -> pd.DataFrame:
+    """Load the run statistics tables of several configs.
+
+    Config folders without a table (processed before it existed) are
+    read from their sub-*_meta.txt files instead, without writing a
+    table; those rows lack step timings and bad channels.
+
+    Args:
+        data_folder (str): Root directory containing per-config
+            subdirectories (e.g. "data/processed").
+        config_ids (list[int]): Numeric config identifiers to load.
+            Configs without outputs are skipped.
+
+    Returns:
+        pd.DataFrame: One row per config and subject, with a "config"
+            column identifying the config.
+    """
+    tables = []
+    for config_id in config_ids:
+        path = f"{data_folder}/{config_id}"
+        if isfile(f"{path}/run_stats.parquet"):
+            table = pd.read_parquet(f"{path}/run_stats.parquet")
+        else:
+            table = _legacy_run_stats(path)
+            if table.empty:
+                continue
+        table["config"] = config_id
+        tables.append(table)
+
+    if not tables:
+        return pd.DataFrame(columns=["config", "subject"])
+    return pd.concat(tables, ignore_index=True)
+
+
+def _legacy_run_stats(output_folder: str) -> pd.DataFrame:
+    """Build run statistics rows from a config's sub-*_meta.txt files.
+
+    Used for config folders processed before the run statistics table
+    existed. Only reads the files.
+
+    Args:
+        output_folder (str): Config output directory.
+
+    Returns:
+        pd.DataFrame: One row per subject with the rejection counts
+            and ICA components excluded, empty if there are no
+            metadata files.
+    """
+    rows = []
+    for file in sorted(glob(f"{output_folder}/sub-*_meta.txt")):
+        subject_id = file.split("sub-")[-1].split("_meta")[0]
+        meta = read_meta(output_folder, subject_id, arrays=False)
+        row = {k: meta[k] for k in REJECTION_STAT_KEYS if k in meta}
+        row["ica_components_excluded"] = meta.get("ica_components_excluded")
+        rows.append({"subject": subject_id, **row})
+    return pd.DataFrame(rows)
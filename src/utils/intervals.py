@@ -0,0 +1,107 @@
+"""Overlap of time windows with artifact intervals.
+
+Counts, for many time windows (e.g. epochs), how many intervals of an
+artifact source (blinks, ASR-corrected segments, bad annotations)
+overlap each window and how much of the window they cover. Both are
+computed with binary searches over the sorted intervals, in
+O((n_windows + n_intervals) log n_intervals), instead of testing
+every window against every interval.
+
+Typical usage:
+    counts, overlap = interval_overlap(epoch_windows, blink_intervals)
+    has_blink = counts > 0
+"""
+
+from typing import Callable
+
+import numpy as np
+
+
+def interval_overlap(
+    windows: np.ndarray, intervals: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Count and measure the intervals overlapping each window.
+
+    A window [s, e] and an interval [a, b] overlap if a < e and b > s,
+    so intervals that only touch a window edge do not count.
+
+    Args:
+        windows (np.ndarray): Window (start, end) times, shape
+            (n_windows, 2). Windows may overlap each other.
+        intervals (np.ndarray): Interval (start, end) times in the
+            same unit, shape (n_intervals, 2), in any order. Intervals
+            may overlap each other.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: A tuple of:
+            - Number of intervals overlapping each window, shape
+              (n_windows,).
+            - Time within each window covered by at least one
+              interval, shape (n_windows,). Overlapping intervals
+              are not counted twice.
+    """
+    windows = np.asarray(windows, dtype=float).reshape(-1, 2)
+    intervals = np.asarray(intervals, dtype=float).reshape(-1, 2)
+    starts, ends = windows[:, 0], windows[:, 1]
+
+    # Intervals starting before the window end, minus those that
+    # already ended at its start (which also start before its end)
+    counts = np.searchsorted(np.sort(intervals[:, 0]), ends, side="left")
+    counts -= np.searchsorted(np.sort(intervals[:, 1]), starts, side="right")
+
+    covered = _covered_time(merge_intervals(intervals))
+    overlap = covered(ends) - covered(starts)
+    return counts, np.maximum(overlap, 0.0)
+
+
+def merge_intervals(intervals: np.ndarray, gap: float = 0.0) -> np.ndarray:
+    """Merge overlapping intervals into disjoint, sorted ones.
+
+    Args:
+        intervals (np.ndarray): Interval (start, end) pairs, shape
+            (n_intervals, 2), in any order.
+        gap (float): Intervals separated by at most this gap are
+            merged as well.
+
+    Returns:
+        np.ndarray: Disjoint intervals sorted by start, shape
+            (n_merged, 2).
+    """
+    intervals = np.asarray(intervals, dtype=float).reshape(-1, 2)
+    if len(intervals) == 0:
+        return intervals
+    intervals = intervals[np.argsort(intervals[:, 0], kind="stable")]
+
+    # An interval starts a new group if it begins after the furthest
+    # end of all intervals before it (plus the gap)
+    reach = np.maximum.accumulate(intervals[:, 1])
+    new_group = np.concatenate(([True], intervals[1:, 0] > reach[:-1] + gap))
+    group_starts = np.flatnonzero(new_group)
+    group_ends = np.append(group_starts[1:], len(intervals)) - 1
+    return np.column_stack((intervals[group_starts, 0], reach[group_ends]))
+
+
+def _covered_time(merged: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    """Build the cumulative covered time function of disjoint intervals.
+
+    Args:
+        merged (np.ndarray): Disjoint intervals sorted by start, as
+            returned by merge_intervals().
+
+    Returns:
+        Callable[[np.ndarray], np.ndarray]: Maps times t to the total
+            length of the intervals before t.
+    """
+    lengths = np.concatenate(([0.0], np.cumsum(merged[:, 1] - merged[:, 0])))
+
+    def covered(t: np.ndarray) -> np.ndarray:
+        if len(merged) == 0:
+            return np.zeros_like(t)
+        # Number of intervals starting before t; the last of them may
+        # extend past t
+        k = np.searchsorted(merged[:, 0], t, side="right")
+        last = np.maximum(k - 1, 0)
+        uncovered = np.where(k > 0, np.maximum(merged[last, 1] - t, 0.0), 0.0)
+        return lengths[k] - uncovered
+
+    return covered
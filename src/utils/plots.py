@@ -1,40 +1,78 @@
 """Plotting utilities for EEG pipeline visualization.
 
 Provides functions for generating ERP plots, PSD plots, ICA
-topography maps, butterfly plots, topomaps, and before/after
-comparisons of preprocessing steps.
+topography maps, butterfly plots, topomaps, before/after
+comparisons of preprocessing steps, trial rejection threshold
+sweeps, and cross-config comparisons.
+
+Figures are built on the object-oriented Agg API (see utils.render)
+and closed as soon as they are saved, so these functions can run
+headless in worker processes.
 """
 
 from typing import Any
 
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
 from matplotlib.figure import Figure
 from mne import Evoked
 import mne
 import numpy as np
+import pandas as pd
 from mne.io import Raw
 
+from utils.render import new_figure, save_figure
 from utils.utils import evoke_channels
 
 
-def power_spectral_density_plot(output_file, raw, fmin, fmax) -> None:
-    """Plot sensor-level power spectral density using Welch's method.
+def power_spectral_density_plot(output_file, freqs, psd, fmin, fmax) -> None:
+    """Plot the sensor-level power spectral density averaged over channels.
 
-    Computes and saves an average PSD across all EEG channels in the
-    specified frequency range.
+    Draws the mean PSD in dB across all EEG channels with a ±1 SD band,
+    like MNE's averaged spectrum plot, from a precomputed Welch PSD.
 
     Args:
         output_file (str): File path to save the plot to.
-        raw (mne.io.Raw): Continuous EEG data.
+        freqs (np.ndarray): Frequencies in Hz, shape (n_freqs,).
+        psd (np.ndarray): PSD in V²/Hz, shape (n_channels, n_freqs).
         fmin (float): Lower frequency bound in Hz.
         fmax (float): Upper frequency bound in Hz.
     """
-    # Sensor-level PSD (Welch) — full-band and zoomed alpha/beta
-    fig_psd = raw.compute_psd(method="welch", fmin=fmin, fmax=fmax, n_fft=2048).plot(
-        average=True, picks="eeg", show=False
-    )
-    fig_psd.suptitle(f"Sensor PSD ({fmin}-{fmax} Hz)")
-    plt.savefig(output_file, bbox_inches="tight")
+    in_range = (freqs >= fmin) & (freqs <= fmax)
+    psd_db = 10 * np.log10(np.maximum(psd[:, in_range], 1e-30) * 1e12)
+    mean, std = psd_db.mean(axis=0), psd_db.std(axis=0)
+
+    fig = new_figure(figsize=(8, 4))
+    ax = fig.add_subplot()
+    ax.plot(freqs[in_range], mean, color="k", linewidth=1)
+    ax.fill_between(freqs[in_range], mean - std, mean + std, color="k", alpha=0.2)
+    ax.set_xlim(fmin, fmax)
+    ax.set_xlabel("Frequency (Hz)")
+    ax.set_ylabel("µV²/Hz (dB)")
+    ax.set_title(f"Sensor PSD ({fmin}-{fmax} Hz)")
+    save_figure(fig, output_file)
+
+
+def psd_comparison_plot(output_file, config_psds: dict) -> None:
+    """Plot the grand average PSD of several configs on one axis.
+
+    Args:
+        output_file (str): File path to save the plot to.
+        config_psds (dict): Per config ID, a tuple of frequencies in
+            Hz and the subjects' channel-averaged PSDs in V²/Hz, shape
+            (n_subjects, n_freqs).
+    """
+    fig = new_figure(figsize=(8, 5))
+    ax = fig.add_subplot()
+    for config_id, (freqs, psds) in config_psds.items():
+        psds_db = 10 * np.log10(np.maximum(psds, 1e-30) * 1e12)
+        ax.plot(
+            freqs, psds_db.mean(axis=0), label=f"Config {config_id} (n={len(psds)})"
+        )
+    ax.set_xlabel("Frequency (Hz)")
+    ax.set_ylabel("µV²/Hz (dB)")
+    ax.set_title("Grand average PSD per config")
+    ax.legend(fontsize="small")
+    save_figure(fig, output_file)
 
 
 def ica_topography_plot(output_file, ica, raw) -> None:
@@ -67,12 +105,12 @@ def ica_topography_plot(output_file, ica, raw) -> None:
     )
     if isinstance(figures, list):
         for index, fig in enumerate(figures):
-            fig.savefig(output_file + str(index) + ".png", bbox_inches="tight")
+            save_figure(fig, output_file + str(index) + ".png")
     if isinstance(figures, Figure):
-        figures.savefig(output_file + ".png", bbox_inches="tight")
+        save_figure(figures, output_file + ".png")
 
 
-def one_channel_erp_plot(output_file, raw, epochs, baseline) -> None:
+def one_channel_erp_plot(output_file, epochs, baseline) -> None:
     """Plot single-channel ERP comparing random vs regular conditions.
 
     Selects PO7 by default, falling back to other posterior channels
@@ -81,8 +119,6 @@ def one_channel_erp_plot(output_file, raw, epochs, baseline) -> None:
 
     Args:
         output_file (str): File path to save the plot to.
-        raw (mne.io.Raw): Continuous EEG data (used to check channel
-            availability).
         epochs (mne.Epochs): Epoched data containing "random" and
             "regular" conditions.
         baseline (list[float]): Two-element list [start, end] in
@@ -93,32 +129,33 @@ def one_channel_erp_plot(output_file, raw, epochs, baseline) -> None:
 
     # choose channel
     preferred = "PO7"
-    if preferred not in raw.ch_names:
+    if preferred not in epochs.ch_names:
         # pick a posterior channel if available
         for ch in ["POz", "Oz", "P3", "P4", "O1", "O2"]:
-            if ch in raw.ch_names:
+            if ch in epochs.ch_names:
                 preferred = ch
                 break
     # get single-channel evoked (random vs regular)
     evoked_ch_random = evoked_random.copy().pick([preferred])
     evoked_ch_regular = evoked_regular.copy().pick([preferred])
-    plt.figure()
-    plt.plot(
+    fig = new_figure()
+    ax = fig.add_subplot()
+    ax.plot(
         evoked_ch_random.times,
         evoked_ch_random.data.T * 1e6,
         label=f"Random — {preferred}",
     )
-    plt.plot(
+    ax.plot(
         evoked_ch_regular.times,
         evoked_ch_regular.data.T * 1e6,
         label=f"Regular — {preferred}",
     )
-    plt.axvspan(baseline[0], baseline[1], color="gray", alpha=0.2)
-    plt.xlabel("Time (s)")
-    plt.ylabel("Amplitude (µV)")
-    plt.title(f"ERP at {preferred}")
-    plt.legend()
-    plt.savefig(output_file, bbox_inches="tight")
+    ax.axvspan(baseline[0], baseline[1], color="gray", alpha=0.2)
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Amplitude (µV)")
+    ax.set_title(f"ERP at {preferred}")
+    ax.legend()
+    save_figure(fig, output_file)
 
 
 def all_channel_erp_plot(output_file, epochs, baseline) -> None:
@@ -149,28 +186,47 @@ def all_channel_erp_plot(output_file, epochs, baseline) -> None:
     mean_random = evoked_random.data.mean(axis=0)
     mean_regular = evoked_regular.data.mean(axis=0)
 
-    plt.plot(times, mean_random * 1e6, label="Random")  # convert to µV if data in V
-    plt.plot(times, mean_regular * 1e6, label="Regular")
-    plt.axvspan(baseline[0], baseline[1], color="gray", alpha=0.2)
-    plt.xlabel("Time (s)")
-    plt.ylabel("Amplitude (µV)")
-    plt.legend()
-    plt.title("Mean across channels — Random vs Regular")
-    plt.savefig(output_file, bbox_inches="tight")
-
-
-def unprocessed_vs_processed_plot(raw_unprocessed: Raw, raw: Raw) -> None:
-    """Plot normalized overlay of unprocessed vs processed EEG traces.
-
-    Selects up to 10 channels and plots 10 consecutive time windows,
-    each 10 seconds long, starting at t=100s. Unprocessed data is
-    shown in black, processed in red. Each channel is normalized
-    to unit range for visual comparison.
+    fig = new_figure()
+    ax = fig.add_subplot()
+    ax.plot(times, mean_random * 1e6, label="Random")  # convert to µV if data in V
+    ax.plot(times, mean_regular * 1e6, label="Regular")
+    ax.axvspan(baseline[0], baseline[1], color="gray", alpha=0.2)
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Amplitude (µV)")
+    ax.legend()
+    ax.set_title("Mean across channels — Random vs Regular")
+    save_figure(fig, output_file)
+
+
+def unprocessed_vs_processed_plot(
+    output_file: str,
+    raw_unprocessed: Raw,
+    raw: Raw,
+    tstart: float = 100.0,
+    duration: float = 10.0,
+    n_windows: int = 10,
+) -> None:
+    """Plot normalized overlays of unprocessed vs processed EEG traces.
+
+    Selects up to 10 channels and plots n_windows consecutive time
+    windows of the given duration, starting at tstart, one page per
+    window in a multi-page PDF. Unprocessed data is shown in black,
+    processed in red. Each channel is normalized to unit range for
+    visual comparison.
+
+    Only the picked channels of each window are read, so
+    raw_unprocessed does not need to be preloaded. Windows past the
+    end of the recording are skipped.
 
     Args:
+        output_file (str): PDF file path to save the pages to.
         raw_unprocessed (mne.io.Raw): Original continuous data before
-            any preprocessing.
+            any preprocessing, preloaded or not.
         raw (mne.io.Raw): Continuous data after the full pipeline.
+            May have a different sampling frequency.
+        tstart (float): Start of the first window in seconds.
+        duration (float): Length of each window in seconds.
+        n_windows (int): Number of windows (pages).
     """
     # select up to 10 channels (change list if desired)
     candidates = ["Fp1", "Fp2", "AF7", "AF8", "Fz", "Cz", "Pz", "Oz", "O1", "O2"]
@@ -182,10 +238,7 @@ def unprocessed_vs_processed_plot(raw_unprocessed: Raw, raw: Raw) -> None:
                 picked.append(ch)
             if len(picked) == 10:
                 break
-    picked = picked[:10]
-
-    # time window (s)
-    tstart, duration = 100.0, 10.0
+    picked = [ch for ch in picked[:10] if ch in raw_unprocessed.ch_names]
 
     # compute demeaned, unit-range signals per channel
     def norm(x):
@@ -194,40 +247,38 @@ def unprocessed_vs_processed_plot(raw_unprocessed: Raw, raw: Raw) -> None:
         rng[rng == 0] = 1.0
         return x / rng
 
-    for i in range(10):
-        tmin = tstart + i * duration
-        sf = raw.info["sfreq"]
+    def window(data_raw, tmin):
+        """Normalized traces and times of the picked channels in a window."""
+        sf = data_raw.info["sfreq"]
         start_idx = int(tmin * sf)
         stop_idx = int((tmin + duration) * sf)
-        times = np.linspace(tmin, tmin + duration, stop_idx - start_idx)
-
-        # get data (channels x times)
-        data_un = (
-            raw_unprocessed.copy().pick(picked).get_data(start=start_idx, stop=stop_idx)
-        )
-
-        data_proc = raw.copy().pick(picked).get_data(start=start_idx, stop=stop_idx)
-
-        # scale to µV
-        data_un_uV = data_un * 1e6
-        data_proc_uV = data_proc * 1e6
+        data = data_raw.get_data(picks=picked, start=start_idx, stop=stop_idx)
+        return np.arange(start_idx, start_idx + data.shape[1]) / sf, norm(data)
 
-        un = norm(data_un_uV)
-        pr = norm(data_proc_uV)
+    spacing = 1.5  # small spacing after normalization
+    offsets = np.arange(len(picked))[::-1] * spacing
+    end = min(raw.times[-1], raw_unprocessed.times[-1])
 
-        spacing = 1.5  # small spacing after normalization
-        offsets = np.arange(len(picked))[::-1] * spacing
-
-        plt.figure(figsize=(12, 6))
-        for j, ch in enumerate(picked):
-            off = offsets[i]
-            plt.plot(times, un[j] + off, color="k", linewidth=0.6)
-            plt.plot(times, pr[j] + off, color="r", linewidth=0.8)
-            plt.text(times[0] - duration * 0.01, off, ch, va="center", fontsize=9)
-        plt.yticks([])
-        plt.xlabel("Time (s)")
-        plt.title("Normalized: unprocessed (black) vs processed (red)")
-        plt.show()
+    with PdfPages(output_file) as pdf:
+        for i in range(n_windows):
+            tmin = tstart + i * duration
+            if tmin + duration > end:
+                break
+            times_un, un = window(raw_unprocessed, tmin)
+            times_pr, pr = window(raw, tmin)
+
+            fig = new_figure(figsize=(12, 6))
+            ax = fig.add_subplot()
+            for j, ch in enumerate(picked):
+                ax.plot(times_un, un[j] + offsets[j], color="k", linewidth=0.6)
+                ax.plot(times_pr, pr[j] + offsets[j], color="r", linewidth=0.8)
+            ax.set_yticks(offsets, picked)
+            ax.set_xlabel("Time (s)")
+            ax.set_title(
+                f"Normalized: unprocessed (black) vs processed (red), "
+                f"{tmin:.0f}-{tmin + duration:.0f} s"
+            )
+            pdf.savefig(fig, bbox_inches="tight")
 
 
 def butterfly_plot(output_file, epochs) -> None:
@@ -251,7 +302,7 @@ def butterfly_plot(output_file, epochs) -> None:
         time_unit="s",
         titles=f"Butterfly — Random",
     )
-    figure.savefig(output_file + "_random.png", bbox_inches="tight")
+    save_figure(figure, output_file + "_random.png")
     # Alternatively plot difference
     evoked_diff = mne.combine_evoked([evoked_random, evoked_regular], weights=[1, -1])
     figure2: Figure = evoked_diff.plot(
@@ -260,7 +311,7 @@ def butterfly_plot(output_file, epochs) -> None:
         time_unit="s",
         titles=f"Butterfly — Random-Regular diff",
     )
-    figure2.savefig(output_file + "_combined.png", bbox_inches="tight")
+    save_figure(figure2, output_file + "_combined.png")
 
 
 def plot_channel(
@@ -289,18 +340,19 @@ def plot_channel(
         n_subjects (int): Number of subjects included in the grand
             average, shown in the plot title.
     """
-    plt.figure(figsize=(10, 5))
-    plt.plot(times * 1000, data_random, "r-", linewidth=2, label="Random")
-    plt.plot(times * 1000, data_regular, "b-", linewidth=2, label="Regular")
-    plt.axhline(0, color="k", linestyle="--", linewidth=0.5)
-    plt.axvline(0, color="k", linestyle="--", linewidth=0.5)
-    plt.yticks([-7, -6, -5, -4, -3, -2, -1, 0, 1, 2, 3, 4, 5, 6, 7])
-    plt.xlabel("Time (ms)")
-    plt.ylabel("Amplitude (µV)")
-    plt.title(f"Grand Average ERP at {channel} (n={n_subjects} subjects)")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file, bbox_inches="tight")
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.add_subplot()
+    ax.plot(times * 1000, data_random, "r-", linewidth=2, label="Random")
+    ax.plot(times * 1000, data_regular, "b-", linewidth=2, label="Regular")
+    ax.axhline(0, color="k", linestyle="--", linewidth=0.5)
+    ax.axvline(0, color="k", linestyle="--", linewidth=0.5)
+    ax.set_yticks([-7, -6, -5, -4, -3, -2, -1, 0, 1, 2, 3, 4, 5, 6, 7])
+    ax.set_xlabel("Time (ms)")
+    ax.set_ylabel("Amplitude (µV)")
+    ax.set_title(f"Grand Average ERP at {channel} (n={n_subjects} subjects)")
+    ax.legend()
+    fig.tight_layout()
+    save_figure(fig, output_file)
 
 
 def plot_topomap(output_file, evoked_diff: Evoked) -> None:
@@ -319,7 +371,8 @@ def plot_topomap(output_file, evoked_diff: Evoked) -> None:
         [c for c in evoked_diff.ch_names if c.startswith("EXG")]
     )  # pyright: ignore[reportAssignmentType]
 
-    fig, axes = plt.subplots(1, 3, figsize=(12, 4), constrained_layout=True)
+    fig = new_figure(figsize=(12, 4), layout="constrained")
+    axes = fig.subplots(1, 3)
 
     time_windows = {
         "100–130 ms": (0.100, 0.130),
@@ -340,4 +393,141 @@ def plot_topomap(output_file, evoked_diff: Evoked) -> None:
         ax.set_title(title)
 
     fig.colorbar(axes[-1].images[0], ax=axes, shrink=0.6, label="µV")
-    plt.savefig(output_file, bbox_inches="tight")
+    save_figure(fig, output_file)
+
+
+def rejection_sweep_plot(output_file, sweep: pd.DataFrame, flat_threshold) -> None:
+    """Plot rejection rates over a grid of EEG and EOG thresholds.
+
+    Draws one panel per condition with the rejection rate across all
+    subjects against the EEG threshold, one line per EOG threshold,
+    at the flat threshold of the grid closest to flat_threshold.
+
+    Args:
+        output_file (str): File path to save the plot to.
+        sweep (pd.DataFrame): Result of rejection_threshold_sweep().
+        flat_threshold (float): Flat threshold in Volts to show.
+    """
+    flat_values = sweep["flat_threshold"].unique()
+    flat = flat_values[np.argmin(np.abs(flat_values - flat_threshold))]
+    totals = (
+        sweep[sweep["flat_threshold"] == flat]
+        .groupby(["condition", "eog_threshold", "eeg_threshold"])[
+            ["n_rejected", "n_epochs"]
+        ]
+        .sum()
+    )
+    conditions = totals.index.get_level_values("condition").unique()
+
+    fig = new_figure(figsize=(6 * len(conditions), 4))
+    axes = fig.subplots(1, len(conditions), squeeze=False)
+    for ax, condition in zip(axes[0], conditions):
+        for eog, rows in totals.loc[condition].groupby(level="eog_threshold"):
+            eeg = rows.index.get_level_values("eeg_threshold")
+            rate = rows["n_rejected"] / rows["n_epochs"] * 100
+            ax.plot(eeg * 1e6, rate, marker="o", label=f"EOG {eog * 1e6:.0f} µV")
+        ax.set_xlabel("EEG threshold (µV)")
+        ax.set_ylabel("Rejected trials (%)")
+        ax.set_title(f"{condition or 'unlabelled'} (flat < {flat * 1e6:.1f} µV)")
+        ax.legend(fontsize="small")
+    fig.tight_layout()
+    save_figure(fig, output_file)
+
+
+def config_comparison_plot(output_file, summary: pd.DataFrame) -> None:
+    """Plot run statistics of several configs side by side.
+
+    Shows rejection rates per condition, mean ICA components excluded,
+    mean bad channels, and the mean runtime of each pipeline step as a
+    stacked bar per config. Missing statistics leave their panel empty.
+
+    Args:
+        output_file (str): File path to save the plot to.
+        summary (pd.DataFrame): Per-config summary as returned by
+            build_comparison_report(), indexed by config.
+    """
+    labels = [str(c) for c in summary.index]
+    x = np.arange(len(labels))
+
+    fig = new_figure(figsize=(12, 8))
+    axes = fig.subplots(2, 2)
+
+    ax = axes[0, 0]
+    rates = [c for c in ("rejected_random_%", "rejected_regular_%") if c in summary]
+    for i, column in enumerate(rates):
+        ax.bar(x + (i - 0.5) * 0.4, summary[column], width=0.4, label=column[9:-2])
+    ax.set_ylabel("Rejected trials (%)")
+    ax.set_title("Trial rejection")
+    if rates:
+        ax.legend()
+
+    for ax, column, title in (
+        (axes[0, 1], "ica_components_excluded", "ICA components excluded"),
+        (axes[1, 0], "n_bad_channels", "Bad channels"),
+    ):
+        if column in summary:
+            ax.bar(x, summary[column])
+        ax.set_ylabel("Mean per subject")
+        ax.set_title(title)
+
+    ax = axes[1, 1]
+    bottom = np.zeros(len(labels))
+    for column in [c for c in summary.columns if c.startswith("time_")]:
+        if column == "time_total":
+            continue
+        values = summary[column].fillna(0).to_numpy()
+        ax.bar(x, values, bottom=bottom, label=column[5:])
+        bottom += values
+    ax.set_ylabel("Mean runtime per subject (s)")
+    ax.set_title("Step timings")
+    if bottom.any():
+        ax.legend(fontsize="small")
+
+    for ax in axes.flat:
+        ax.set_xticks(x, labels)
+        ax.set_xlabel("Config")
+    fig.tight_layout()
+    save_figure(fig, output_file)
+
+
+def config_erp_comparison_plot(output_file, grand_averages: dict, spn_window) -> None:
+    """Plot the grand average ERPs of several configs in a grid.
+
+    Each panel shows random and regular grand averages at PO7+PO8
+    (or the single available channel) for one config, with the SPN
+    window shaded. All panels share the same axes.
+
+    Args:
+        output_file (str): File path to save the plot to.
+        grand_averages (dict): Per-config grand averages as built by
+            build_comparison_report().
+        spn_window (tuple[float, float]): SPN window in seconds.
+    """
+    n_configs = len(grand_averages)
+    if n_configs == 0:
+        return
+    n_cols = min(3, n_configs)
+    n_rows = -(-n_configs // n_cols)
+
+    fig = new_figure(figsize=(5 * n_cols, 3.5 * n_rows))
+    axes = fig.subplots(n_rows, n_cols, sharex=True, sharey=True, squeeze=False)
+    for ax, (config_id, ga) in zip(axes.flat, grand_averages.items()):
+        channel = next((c for c in ("PO7+PO8", "PO7", "PO8") if c in ga), None)
+        ax.set_title(f"Config {config_id} (n={ga['n_subjects']})")
+        if channel is None:
+            continue
+        times = ga["times"] * 1000
+        ax.plot(times, ga[channel]["random"], "r-", label=f"Random {channel}")
+        ax.plot(times, ga[channel]["regular"], "b-", label=f"Regular {channel}")
+        ax.axvspan(spn_window[0] * 1000, spn_window[1] * 1000, color="gray", alpha=0.2)
+        ax.axhline(0, color="k", linestyle="--", linewidth=0.5)
+        ax.axvline(0, color="k", linestyle="--", linewidth=0.5)
+        ax.legend(fontsize="small")
+    for ax in axes.flat[n_configs:]:
+        ax.set_visible(False)
+    for ax in axes[-1]:
+        ax.set_xlabel("Time (ms)")
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Amplitude (µV)")
+    fig.tight_layout()
+    save_figure(fig, output_file)
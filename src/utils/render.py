@@ -0,0 +1,108 @@
+"""Headless figure rendering and parallel plot job execution.
+
+Figures are created directly on the object-oriented Agg API
+(matplotlib.figure.Figure with an Agg canvas), so they are never
+registered with pyplot and are freed as soon as they are saved.
+Plot jobs, i.e. (function, args) pairs, are fanned out over a
+process pool whose size is controlled by the MAX_WORKERS
+environment variable, like the pipeline runs.
+
+Typical usage:
+    jobs = [(butterfly_plot, (path, epochs)), (plot_topomap, (path, evoked))]
+    render_jobs(jobs)
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import getenv
+from typing import Any, Callable
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# A plot job: a module-level plotting function and its arguments
+PlotJob = tuple[Callable[..., Any], tuple]
+
+
+def new_figure(**kwargs) -> Figure:
+    """Create a figure rendered by Agg, outside of pyplot.
+
+    Args:
+        **kwargs: Passed to matplotlib.figure.Figure (e.g. figsize).
+
+    Returns:
+        Figure: A figure attached to an Agg canvas.
+    """
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def save_figure(fig: Figure, output_file: str) -> None:
+    """Save a figure and release its resources.
+
+    Works for figures from new_figure() as well as figures MNE
+    creates through pyplot, which are closed explicitly.
+
+    Args:
+        fig (Figure): Figure to save.
+        output_file (str): File path to save the figure to.
+    """
+    fig.savefig(output_file, bbox_inches="tight")
+    plt.close(fig)
+
+
+def render_jobs(jobs: list[PlotJob], max_workers: int | None = None) -> None:
+    """Run plot jobs, in parallel worker processes if possible.
+
+    Each job runs in a worker using the Agg backend, and any pyplot
+    figure left open by a job is closed after it finishes. With a
+    single worker or a single job, jobs run in the current process.
+    Failing jobs are reported and do not stop the others.
+
+    Args:
+        jobs (list[PlotJob]): (function, args) pairs. Functions and
+            arguments must be picklable.
+        max_workers (int | None): Number of worker processes. Defaults
+            to the MAX_WORKERS environment variable (default: 2).
+    """
+    if max_workers is None:
+        max_workers = int(getenv("MAX_WORKERS", 2))
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        for func, args in jobs:
+            _report(func, _run_job(func, args))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=matplotlib.use, initargs=("Agg",)
+    ) as executor:
+        futures = {executor.submit(_run_job, func, args): func for func, args in jobs}
+        for future in as_completed(futures):
+            _report(futures[future], future.result())
+
+
+def _run_job(func: Callable[..., Any], args: tuple) -> str | None:
+    """Run one plot job and close the figures it left open.
+
+    Args:
+        func (Callable[..., Any]): Plotting function.
+        args (tuple): Positional arguments for func.
+
+    Returns:
+        str | None: Error message, or None on success.
+    """
+    try:
+        func(*args)
+        return None
+    except Exception as e:
+        return str(e)
+    finally:
+        plt.close("all")
+
+
+def _report(func: Callable[..., Any], error: str | None) -> None:
+    """Print the outcome of a failed plot job."""
+    if error:
+        print(f"FAILED plot {func.__name__}: {error}")
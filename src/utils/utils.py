@@ -1,10 +1,11 @@
 """Utility functions for the EEG processing pipeline.
 
 Provides helpers for discovering subjects and configs, computing
-grand averages across subjects, and printing pipeline statistics.
+grand averages across subjects, printing pipeline statistics,
+sweeping trial rejection thresholds over stored statistics, and
+computing the per-subject PSDs stored by the pipeline.
 """
 
-import json
 from glob import glob
 from math import inf
 from os import listdir
@@ -13,7 +14,11 @@ from os.path import exists, join
 import mne
 import mne_bids
 import numpy as np
+import pandas as pd
 from mne import Epochs, Evoked
+from mne.io import BaseRaw
+
+from utils.files import read_meta, read_run_stats
 
 
 def get_subject_list(bids_root) -> list[str]:
@@ -217,12 +222,36 @@ def pairwise_average(
     return np.array(result, dtype=np.float32)
 
 
+def welch_psd(
+    raw: BaseRaw, fmin: float = 0.0, fmax: float = 64.0
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Compute the Welch power spectral density of all good EEG channels.
+
+    Uses the same settings as the PSD plots (2048-point FFT), so the
+    pipeline can store the result while the data is in memory.
+
+    Args:
+        raw (BaseRaw): Preloaded continuous data.
+        fmin (float): Lower frequency bound in Hz.
+        fmax (float): Upper frequency bound in Hz.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, list[str]]: Frequencies in Hz,
+            shape (n_freqs,), PSD in V²/Hz, shape (n_channels,
+            n_freqs), and the channel names.
+    """
+    spectrum = raw.compute_psd(
+        method="welch", fmin=fmin, fmax=fmax, n_fft=2048, picks="eeg", verbose=False
+    )
+    return spectrum.freqs, spectrum.get_data(), spectrum.ch_names
+
+
 def pipeline_statistics(bids_root: str, config: int) -> None:
     """Print summary statistics for a completed pipeline run.
 
-    Reads all per-subject metadata files and reports trial rejection
-    counts (overall, random, regular) and ICA component removal
-    statistics across all subjects.
+    Reads the config's run statistics table and reports trial
+    rejection counts (overall, random, regular) and ICA component
+    removal statistics across all subjects.
 
     Args:
         bids_root (str): Root directory of the BIDS dataset. The
@@ -231,79 +260,183 @@ def pipeline_statistics(bids_root: str, config: int) -> None:
         config (int): Numeric config identifier used to locate the
             output subdirectory.
     """
-    processed_dir = f"{bids_root.rstrip('/')}/processed/{config}/"
-    meta_files = sorted(glob(f"{processed_dir}sub-*_meta.txt"))
+    processed_dir = f"{bids_root.rstrip('/')}/processed"
+    stats = read_run_stats(processed_dir, [config])
 
-    if not meta_files:
-        print(f"No meta files found in {processed_dir}")
-
-    raw_data = []
-    for file in meta_files:
-        with open(file, "r") as f:
-            raw_data.append(json.loads(f.read()))
-
-    trial_rejection_regular_min = inf
-    trial_rejection_regular_max = -1
-    trial_rejection_regular_sum = 0
-    trial_rejection_random_min = inf
-    trial_rejection_random_max = -1
-    trial_rejection_random_sum = 0
-    trial_rejection_overall_min = inf
-    trial_rejection_overall_max = -1
-    trial_rejection_overall_sum = 0
-    number_of_trials = 0
-    number_of_trials_regular = 0
-    number_of_trials_random = 0
-    ica_removed_components_min = inf
-    ica_removed_components_max = -1
-    ica_removed_components_sum = 0
-    participants = len(raw_data)
-
-    for data in raw_data:
-        trial_rejection_regular_min = min(
-            trial_rejection_regular_min, data["n_rejected_regular"]
-        )
-        trial_rejection_regular_max = max(
-            trial_rejection_regular_max, data["n_rejected_regular"]
-        )
-        trial_rejection_regular_sum += data["n_rejected_regular"]
-        trial_rejection_random_min = min(
-            trial_rejection_random_min, data["n_rejected_random"]
-        )
-        trial_rejection_random_max = max(
-            trial_rejection_random_max, data["n_rejected_random"]
-        )
-        trial_rejection_random_sum += data["n_rejected_random"]
-        trial_rejection_overall_min = min(
-            trial_rejection_overall_min, data["n_rejected"]
-        )
-        trial_rejection_overall_max = max(
-            trial_rejection_overall_max, data["n_rejected"]
-        )
-        trial_rejection_overall_sum += data["n_rejected"]
-        number_of_trials += data["n_epochs_before"]
-        number_of_trials_regular += data["n_epochs_regular_before"]
-        number_of_trials_random += data["n_epochs_random_before"]
-        ica_removed_components_min = min(
-            ica_removed_components_min, data["ica_components_excluded"]
-        )
-        ica_removed_components_max = max(
-            ica_removed_components_max, data["ica_components_excluded"]
-        )
-        ica_removed_components_sum += data["ica_components_excluded"]
+    if stats.empty or "n_rejected" not in stats:
+        print(f"No run statistics found in {processed_dir}/{config}/")
+        return
 
-    print(
-        f"Number of trials: {number_of_trials}  |  Random: {number_of_trials_random}, Regular: {number_of_trials_regular}"
+    rejected = stats[["n_rejected", "n_rejected_random", "n_rejected_regular"]].agg(
+        ["sum", "min", "max"]
     )
+    number_of_trials = stats["n_epochs_before"].sum()
+    ica = stats["ica_components_excluded"].astype("Int64")
+
     print(
-        f"Number of trials removed: {trial_rejection_overall_sum} -> {round((trial_rejection_overall_sum/number_of_trials)*100, 2)} %  | Min: {trial_rejection_overall_min}, Max: {trial_rejection_overall_max}"
+        f"Number of trials: {number_of_trials}  |  Random: {stats["n_epochs_random_before"].sum()}, Regular: {stats["n_epochs_regular_before"].sum()}"
     )
+    for column, label in (
+        ("n_rejected", "trials"),
+        ("n_rejected_random", "random trials"),
+        ("n_rejected_regular", "regular trials"),
+    ):
+        total, low, high = rejected[column]
+        print(
+            f"Number of {label} removed: {total} -> {round((total/number_of_trials)*100, 2)} %  | Min: {low}, Max: {high}"
+        )
     print(
-        f"Number of random trials removed: {trial_rejection_random_sum} -> {round((trial_rejection_random_sum/number_of_trials)*100, 2)} %  | Min: {trial_rejection_random_min}, Max: {trial_rejection_random_max}"
+        f"Ica components removed: Overall {ica.sum()}, average per participant {round(ica.mean(), 2)}, min {ica.min()}, max {ica.max()}"
     )
-    print(
-        f"Number of regular trials removed: {trial_rejection_regular_sum} -> {round((trial_rejection_regular_sum/number_of_trials)*100, 2)} %  | Min: {trial_rejection_regular_min}, Max: {trial_rejection_regular_max}"
+
+
+def compare_run_statistics(bids_root: str, configs: list[int]) -> pd.DataFrame:
+    """Summarize run statistics per config for cross-config comparison.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset.
+        configs (list[int]): Numeric config identifiers to compare.
+
+    Returns:
+        pd.DataFrame: One row per config with the number of subjects,
+            trials, rejection rates per condition, mean bad channels
+            and ICA components excluded, and the mean runtime of each
+            pipeline step in seconds.
+    """
+    stats = read_run_stats(f"{bids_root.rstrip('/')}/processed", configs)
+    if stats.empty:
+        return pd.DataFrame()
+
+    grouped = stats.groupby("config")
+    summary = pd.DataFrame({"subjects": grouped["subject"].count()})
+    if "n_rejected" in stats:
+        sums = grouped[
+            [
+                "n_epochs_before",
+                "n_epochs_random_before",
+                "n_epochs_regular_before",
+                "n_rejected",
+                "n_rejected_random",
+                "n_rejected_regular",
+            ]
+        ].sum()
+        summary["trials"] = sums["n_epochs_before"]
+        summary["rejected_%"] = sums["n_rejected"] / sums["n_epochs_before"] * 100
+        summary["rejected_random_%"] = (
+            sums["n_rejected_random"] / sums["n_epochs_random_before"] * 100
+        )
+        summary["rejected_regular_%"] = (
+            sums["n_rejected_regular"] / sums["n_epochs_regular_before"] * 100
+        )
+
+    means = [
+        c
+        for c in ("n_bad_channels", "ica_components_excluded")
+        + tuple(c for c in stats.columns if c.startswith("time_"))
+        if c in stats
+    ]
+    return summary.join(grouped[means].mean())
+
+
+def rejection_threshold_sweep(
+    bids_root: str,
+    config: int,
+    eeg_thresholds: np.ndarray,
+    eog_thresholds: np.ndarray,
+    flat_thresholds: np.ndarray,
+) -> pd.DataFrame:
+    """Count rejected trials for a grid of rejection thresholds.
+
+    Uses the per-epoch peak-to-peak matrices stored by trial
+    rejection, so no data has to be reloaded or re-epoched. Each epoch
+    is reduced to its largest EEG and EOG and smallest EEG
+    peak-to-peak amplitude (ignoring bad channels), which are compared
+    against the whole grid at once. Counts per subject and condition
+    come out of a single matrix product.
+
+    Args:
+        bids_root (str): Root directory of the BIDS dataset. The
+            processed outputs are expected under
+            ``<bids_root>/processed/<config>/``.
+        config (int): Numeric config identifier used to locate the
+            output subdirectory.
+        eeg_thresholds (np.ndarray): EEG peak-to-peak thresholds in
+            Volts.
+        eog_thresholds (np.ndarray): EOG peak-to-peak thresholds in
+            Volts.
+        flat_thresholds (np.ndarray): EEG flat thresholds in Volts.
+
+    Returns:
+        pd.DataFrame: One row per subject, condition and threshold
+            combination with columns subject, condition,
+            eeg_threshold, eog_threshold, flat_threshold, n_epochs,
+            n_rejected and rejection_rate (in percent).
+
+    Raises:
+        FileNotFoundError: If no stored peak-to-peak statistics exist
+            for the config.
+    """
+    processed_dir = f"{bids_root.rstrip('/')}/processed/{config}"
+    meta_files = sorted(glob(f"{processed_dir}/sub-*_meta.npz"))
+
+    if not meta_files:
+        raise FileNotFoundError(
+            f"No peak-to-peak statistics found in {processed_dir}, "
+            "rerun the config with trial rejection enabled"
+        )
+
+    max_eeg, max_eog, min_eeg, subjects, conditions = [], [], [], [], []
+    for file in meta_files:
+        subject_id = file.split("sub-")[-1].split("_meta")[0]
+        data = read_meta(processed_dir, subject_id)
+
+        ptp = data["ptp_amplitudes"]
+        types = data["ptp_channel_types"]
+        checkable = ~np.isin(data["ptp_channels"], data["ptp_bads"])
+
+        eeg = ptp[:, (types == "eeg") & checkable]
+        eog = ptp[:, (types == "eog") & checkable]
+        # Without checkable channels of a type nothing can be rejected
+        max_eeg.append(eeg.max(axis=1) if eeg.size else np.full(len(ptp), -inf))
+        max_eog.append(eog.max(axis=1) if eog.size else np.full(len(ptp), -inf))
+        min_eeg.append(eeg.min(axis=1) if eeg.size else np.full(len(ptp), inf))
+        subjects.extend([subject_id] * len(ptp))
+        conditions.extend(data["ptp_conditions"].tolist())
+
+    max_eeg = np.concatenate(max_eeg)
+    max_eog = np.concatenate(max_eog)
+    min_eeg = np.concatenate(min_eeg)
+
+    # rejected[epoch, eeg, eog, flat]
+    eeg_grid = np.asarray(eeg_thresholds, dtype=float)
+    eog_grid = np.asarray(eog_thresholds, dtype=float)
+    flat_grid = np.asarray(flat_thresholds, dtype=float)
+    rejected = (
+        (max_eeg[:, None, None, None] > eeg_grid[None, :, None, None])
+        | (max_eog[:, None, None, None] > eog_grid[None, None, :, None])
+        | (min_eeg[:, None, None, None] < flat_grid[None, None, None, :])
+    ).reshape(len(max_eeg), -1)
+
+    groups, group_keys = pd.MultiIndex.from_arrays([subjects, conditions]).factorize()
+    membership = np.zeros((len(group_keys), len(max_eeg)))
+    membership[groups, np.arange(len(max_eeg))] = 1
+    n_rejected = (membership @ rejected).astype(int)
+    n_epochs = membership.sum(axis=1).astype(int)
+
+    eeg_values, eog_values, flat_values = (
+        grid.ravel() for grid in np.meshgrid(eeg_grid, eog_grid, flat_grid, indexing="ij")
     )
-    print(
-        f"Ica components removed: Overall {ica_removed_components_sum}, average per participant {round(ica_removed_components_sum/participants, 2)}, min {ica_removed_components_min}, max {ica_removed_components_max}"
+    n_groups, n_combinations = n_rejected.shape
+
+    return pd.DataFrame(
+        {
+            "subject": np.repeat(group_keys.get_level_values(0), n_combinations),
+            "condition": np.repeat(group_keys.get_level_values(1), n_combinations),
+            "eeg_threshold": np.tile(eeg_values, n_groups),
+            "eog_threshold": np.tile(eog_values, n_groups),
+            "flat_threshold": np.tile(flat_values, n_groups),
+            "n_epochs": np.repeat(n_epochs, n_combinations),
+            "n_rejected": n_rejected.ravel(),
+            "rejection_rate": (n_rejected / n_epochs[:, None]).ravel() * 100,
+        }
     )
@@ -0,0 +1,10 @@
+"""Shared test setup.
+
+The pipeline is run as scripts from src/ (see README), so its
+packages are made importable the same way here.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
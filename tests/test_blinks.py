@@ -0,0 +1,30 @@
+"""Tests for the blink detection helpers against brute-force references."""
+
+import numpy as np
+import pytest
+
+# blinks.blinks runs the pipeline steps, including ASR
+pytest.importorskip("asrpy")
+
+from blinks.blinks import expand_peaks
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_expand_peaks_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    env = rng.random(200)
+    peaks = np.sort(rng.choice(200, 20, replace=False))
+    baseline = 0.3
+
+    expected = []
+    for peak in peaks:
+        start, end = peak, peak
+        while start > 0 and env[start] > baseline:
+            start -= 1
+        while end < len(env) - 1 and env[end] > baseline:
+            end += 1
+        expected.append((start, end))
+
+    np.testing.assert_array_equal(
+        expand_peaks(env, peaks, baseline), np.array(expected).reshape(-1, 2)
+    )
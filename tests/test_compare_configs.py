@@ -0,0 +1,18 @@
+"""Tests for the cross-config comparison report."""
+
+import numpy as np
+import pytest
+
+from pipeline.compare_configs import _erp_peaks
+
+
+def test_erp_peaks_outside_epoch_are_nan():
+    # Epochs ending at 120 ms cover the P1 window only partly and miss N1
+    times = np.arange(-0.1, 0.121, 0.01)
+    erp = times * 10
+    peaks = _erp_peaks({1: {"times": times, "PO7": {"regular": erp}}})
+    peaks = peaks.set_index("component")
+
+    assert peaks.loc["P1", "latency_ms"] == pytest.approx(120)
+    assert peaks.loc["P1", "amplitude_uV"] == erp[-1]
+    assert peaks.loc["N1", ["amplitude_uV", "latency_ms"]].isna().all()
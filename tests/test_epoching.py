@@ -0,0 +1,70 @@
+"""Tests for the event index and epoch rejection of step 09."""
+
+from dataclasses import replace
+
+from mne import Annotations, create_info
+from mne.io import RawArray
+import numpy as np
+import pytest
+
+from pipeline import step09_epoching
+from pipeline.step09_epoching import EventIndex, epoch_data
+from utils.config import StepEpoching
+
+
+def _make_raw() -> RawArray:
+    """20 s of noise starting at sample 1000, with a BAD annotation at 5-6 s."""
+    info = create_info(["Cz", "Pz"], 100.0, "eeg")
+    data = np.random.default_rng(0).normal(size=(2, 2000)) * 1e-5
+    raw = RawArray(data, info, first_samp=1000, verbose=False)
+    raw.set_annotations(
+        Annotations(
+            onset=[5.0, 12.0],
+            duration=[1.0, 0.0],
+            description=["BAD_manual", "stimulus"],
+        )
+    )
+    return raw
+
+
+@pytest.mark.parametrize("method", ["vectorized", "mne"])
+def test_bad_annotations_reject_epochs(method):
+    event_index = EventIndex(
+        onsets=np.array([3.0, 6.2, 9.0, 14.0]),
+        codes=np.array([1, 2, 1, 2]),
+        event_id={"random": 1, "regular": 2},
+    )
+    raw = _make_raw()
+    config = replace(StepEpoching(), method=method)
+    epochs, _, _ = epoch_data(raw, None, config, event_index)
+
+    assert [d[0] if d else None for d in epochs.drop_log] == [
+        None,
+        "BAD_manual",
+        None,
+        None,
+    ]
+    assert sorted(raw.annotations.description) == [
+        "BAD_manual",
+        "random",
+        "random",
+        "regular",
+        "regular",
+    ]
+
+
+def test_events_cache_round_trip(tmp_path):
+    events_tsv = tmp_path / "sub-001_task-jacobsen_events.tsv"
+    events_tsv.write_text("onset\tduration\tvalue\n2.5\t0\t3\n1.0\t0\t1\n")
+    cache_folder = tmp_path / "cache"
+    cache_folder.mkdir()
+
+    parsed = step09_epoching._read_events_tsv(str(events_tsv), str(cache_folder))
+    step09_epoching._parsed_events.clear()
+    cached = step09_epoching._read_events_tsv(str(events_tsv), str(cache_folder))
+
+    assert [f.name for f in cache_folder.iterdir()] == [
+        "sub-001_task-jacobsen_events.npz"
+    ]
+    np.testing.assert_array_equal(cached[0], parsed[0])
+    np.testing.assert_array_equal(cached[1], [1, 3])
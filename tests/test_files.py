@@ -0,0 +1,21 @@
+"""Tests for saving and loading the pipeline outputs."""
+
+from mne import EpochsArray, create_info
+from mne.io import RawArray
+import numpy as np
+
+from utils.files import read_meta, save_data
+
+
+def test_save_data_removes_stale_arrays(tmp_path):
+    info = create_info(["Cz", "Pz"], 100.0, "eeg")
+    raw = RawArray(np.zeros((2, 500)), info, verbose=False)
+    epochs = EpochsArray(np.zeros((3, 2, 50)), info, verbose=False)
+
+    stats = {"n_epochs_before": 3, "ptp": np.ones((3, 2))}
+    save_data(str(tmp_path), "001", epochs, raw, None, stats)
+    assert "ptp" in read_meta(str(tmp_path), "001")
+
+    save_data(str(tmp_path), "001", epochs, raw, None, {"n_epochs_before": 3})
+    assert not (tmp_path / "sub-001_meta.npz").exists()
+    assert read_meta(str(tmp_path), "001") == {"n_epochs_before": 3}
@@ -0,0 +1,41 @@
+"""Tests for the ICA decomposition cache of step 07."""
+
+from dataclasses import replace
+
+from mne import create_info
+from mne.io import RawArray
+import numpy as np
+
+from pipeline.step07_ica import run_ica
+from utils.config import StepICA
+
+
+def _make_raw() -> RawArray:
+    """Mixed non-Gaussian sources on 8 EEG and 2 EOG channels."""
+    rng = np.random.default_rng(0)
+    sfreq = 128.0
+    sources = rng.laplace(size=(10, int(60 * sfreq)))
+    data = rng.normal(size=(10, 10)) @ sources * 1e-5
+    info = create_info(
+        [f"EEG{i}" for i in range(8)] + ["EOG5", "EOG6"],
+        sfreq,
+        ["eeg"] * 8 + ["eog"] * 2,
+    )
+    return RawArray(data, info, verbose=False)
+
+
+def test_classification_settings_reuse_decomposition(tmp_path):
+    config = StepICA(n_components=5)
+    run_ica(_make_raw(), config, str(tmp_path))
+    reclassified = replace(
+        config, eog_threshold=2.0, ecg_threshold=4.0, classification_sfreq=48.0
+    )
+    run_ica(_make_raw(), reclassified, str(tmp_path))
+    assert len(list(tmp_path.glob("*_ica.fif"))) == 1
+
+
+def test_fit_settings_refit_decomposition(tmp_path):
+    config = StepICA(n_components=5)
+    run_ica(_make_raw(), config, str(tmp_path))
+    run_ica(_make_raw(), replace(config, n_components=4), str(tmp_path))
+    assert len(list(tmp_path.glob("*_ica.fif"))) == 2
@@ -0,0 +1,37 @@
+"""Tests for the cached bad channel interpolation of step 08."""
+
+from dataclasses import replace
+
+from mne import create_info
+from mne.channels import make_standard_montage
+from mne.io import RawArray
+import numpy as np
+
+from pipeline.step08_interpolation import interpolate_bad_channels
+from utils.config import StepInterpolation
+
+BADS = ["Fp1", "Cz", "PO7"]
+
+
+def _make_raw() -> RawArray:
+    """Random data on the 64 BioSemi channels with three bad channels."""
+    montage = make_standard_montage("biosemi64")
+    info = create_info(montage.ch_names, 256.0, "eeg")
+    data = np.random.default_rng(0).normal(size=(64, 2560)) * 1e-5
+    raw = RawArray(data, info, verbose=False)
+    raw.set_montage(montage)
+    raw.info["bads"] = list(BADS)
+    return raw
+
+
+def test_cached_matrix_matches_mne(tmp_path):
+    expected = _make_raw().interpolate_bads(reset_bads=False, verbose=False)
+    raw = interpolate_bad_channels(_make_raw(), StepInterpolation(), str(tmp_path))
+    np.testing.assert_allclose(raw.get_data(), expected.get_data(), rtol=0, atol=1e-12)
+
+
+def test_mode_does_not_change_matrix(tmp_path):
+    config = StepInterpolation()
+    interpolate_bad_channels(_make_raw(), config, str(tmp_path))
+    interpolate_bad_channels(_make_raw(), replace(config, mode="fast"), str(tmp_path))
+    assert len(list(tmp_path.glob("*.npy"))) == 1
@@ -0,0 +1,88 @@
+"""Tests for the interval helpers against brute-force references."""
+
+import numpy as np
+import pytest
+
+from utils.intervals import interval_overlap, merge_intervals
+
+
+def _random_intervals(rng, n: int) -> np.ndarray:
+    """Intervals with integer edges in [0, 40], so many edges touch."""
+    starts = rng.integers(0, 36, n)
+    return np.column_stack((starts, starts + rng.integers(0, 6, n))).astype(float)
+
+
+def _brute_force_overlap(windows, intervals):
+    """Test every window against every interval, coverage per unit cell."""
+    counts = np.array(
+        [sum(a < e and b > s for a, b in intervals) for s, e in windows], dtype=int
+    )
+    cells = np.arange(0, 50) + 0.5
+    covered = np.array([any(a < t < b for a, b in intervals) for t in cells])
+    overlap = np.array([covered[(cells > s) & (cells < e)].sum() for s, e in windows])
+    return counts, overlap.astype(float)
+
+
+def _brute_force_merge(intervals, gap):
+    """Merge pairs of intervals until no two are closer than the gap."""
+    merged = [list(i) for i in intervals]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                (a, b), (c, d) = merged[i], merged[j]
+                if c <= b + gap and a <= d + gap:
+                    merged[i] = [min(a, c), max(b, d)]
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return np.array(sorted(merged), dtype=float).reshape(-1, 2)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_interval_overlap_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    windows = _random_intervals(rng, 15)
+    intervals = _random_intervals(rng, int(rng.integers(0, 10)))
+
+    counts, overlap = interval_overlap(windows, intervals)
+    expected_counts, expected_overlap = _brute_force_overlap(windows, intervals)
+    np.testing.assert_array_equal(counts, expected_counts)
+    np.testing.assert_allclose(overlap, expected_overlap)
+
+
+def test_interval_overlap_edge_cases():
+    windows = np.array([[0.0, 10.0], [10.0, 20.0], [2.0, 3.0]])
+    # Touching the first window's end, nested in it, and enclosing it
+    intervals = np.array([[10.0, 12.0], [4.0, 6.0], [-1.0, 11.0]])
+    counts, overlap = interval_overlap(windows, intervals)
+    np.testing.assert_array_equal(counts, [2, 2, 1])
+    np.testing.assert_allclose(overlap, [10.0, 2.0, 1.0])
+
+    counts, overlap = interval_overlap(windows, np.empty((0, 2)))
+    np.testing.assert_array_equal(counts, [0, 0, 0])
+    np.testing.assert_array_equal(overlap, [0.0, 0.0, 0.0])
+
+    counts, overlap = interval_overlap(np.empty((0, 2)), intervals)
+    assert counts.shape == overlap.shape == (0,)
+
+
+@pytest.mark.parametrize("gap", [0.0, 1.0, 2.5])
+@pytest.mark.parametrize("seed", range(10))
+def test_merge_intervals_matches_brute_force(seed, gap):
+    intervals = _random_intervals(np.random.default_rng(seed), 12)
+    np.testing.assert_array_equal(
+        merge_intervals(intervals, gap=gap), _brute_force_merge(intervals, gap)
+    )
+
+
+def test_merge_intervals_edge_cases():
+    assert merge_intervals(np.empty((0, 2))).shape == (0, 2)
+    # Touching and nested intervals merge, separated ones only within the gap
+    intervals = np.array([[5.0, 6.0], [0.0, 2.0], [2.0, 4.0], [0.5, 1.0]])
+    np.testing.assert_array_equal(merge_intervals(intervals), [[0, 4], [5, 6]])
+    np.testing.assert_array_equal(merge_intervals(intervals, gap=1.0), [[0, 6]])
+
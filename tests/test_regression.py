@@ -0,0 +1,35 @@
+"""Tests for the regression checks between two pipeline versions."""
+
+import numpy as np
+
+from benchmarks.regression import REGRESSION_TOLERANCES, compare_summaries
+
+
+def _summary(bad_channels: list[str] | None) -> dict:
+    """Summary of one subject as returned by summarize_outputs()."""
+    return {
+        "n_epochs": {"regular": 2},
+        "drop_log": ((), ()),
+        "bad_channels": bad_channels,
+        "ica_exclude": None,
+        "evoked": {("regular", "PO7"): np.zeros(5)},
+        "times": np.arange(5) / 100,
+    }
+
+
+def _bad_channels_row(reference: dict, candidate: dict) -> dict:
+    rows = compare_summaries(reference, candidate, REGRESSION_TOLERANCES)
+    return next(row for row in rows if row["check"] == "bad_channels")
+
+
+def test_bad_channels_compared_with_run_stats():
+    row = _bad_channels_row(_summary(["Cz"]), _summary(["Cz", "Pz"]))
+    assert not row["passed"]
+    assert _bad_channels_row(_summary([]), _summary([]))["passed"]
+
+
+def test_bad_channels_unknown_without_run_stats():
+    row = _bad_channels_row(_summary(None), _summary(["Cz"]))
+    assert row["passed"]
+    assert (row["reference"], row["candidate"]) == ("unknown", "['Cz']")
+    assert _bad_channels_row(_summary([]), _summary(None))["reference"] == "[]"
@@ -0,0 +1,59 @@
+"""Tests for the streaming blink detector."""
+
+from mne import create_info
+from mne.io import RawArray
+import numpy as np
+import pytest
+
+from blinks.streaming import detect_blinks_streaming
+from utils.intervals import merge_intervals
+
+SFREQ = 128.0
+
+
+def _make_eog() -> np.ndarray:
+    """120 s of two EOG channels with a blink about every 3.5 s."""
+    rng = np.random.default_rng(0)
+    times = np.arange(int(120 * SFREQ)) / SFREQ
+    data = rng.normal(0, 5e-6, (2, len(times)))
+    onsets = np.arange(3, 117, 3.5) + rng.uniform(-0.5, 0.5, 33)
+    for onset in onsets:
+        blink = np.exp(-0.5 * ((times - onset) / 0.1) ** 2) * rng.uniform(1e-4, 2e-4)
+        data += np.array([[1.0], [0.8]]) * blink
+    return data
+
+
+def _chunks(data: np.ndarray, sizes: list[int]):
+    """Split data into consecutive chunks, cycling through the sizes."""
+    start, i = 0, 0
+    while start < data.shape[1]:
+        size = sizes[i % len(sizes)]
+        yield data[:, start : start + size]
+        start, i = start + size, i + 1
+
+
+@pytest.mark.parametrize("sizes", [[128], [47], [933], [1, 5, 300, 17]])
+def test_blinks_do_not_depend_on_chunk_size(sizes):
+    # 933 samples is longer than threshold_update_s, 1 sample shorter
+    # than the smoothing window
+    data = _make_eog()
+    whole = list(detect_blinks_streaming([data], SFREQ))
+    assert len(whole) > 30
+    assert list(detect_blinks_streaming(_chunks(data, sizes), SFREQ)) == whole
+
+
+def test_blinks_match_offline_detector():
+    pytest.importorskip("asrpy")
+    from blinks.blinks import detect_blinks_on_raw
+
+    data = _make_eog()
+    raw = RawArray(data, create_info(["EOG5", "EOG6"], SFREQ, "eog"), verbose=False)
+    offline, _ = detect_blinks_on_raw(raw, ["EOG5", "EOG6"])
+    streaming = list(detect_blinks_streaming(_chunks(data, [128]), SFREQ))
+
+    # The causal filter delays and widens the blinks and may split
+    # them, so nearby parts are merged and the edges compared loosely
+    offline = merge_intervals(np.array(offline), gap=0.5)
+    streaming = merge_intervals(np.array(streaming), gap=0.5)
+    assert len(streaming) == len(offline) == 33
+    assert np.abs(streaming - offline).max() < 0.75
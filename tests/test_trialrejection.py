@@ -0,0 +1,34 @@
+"""Tests for the packed drop log of step 10."""
+
+import numpy as np
+
+from pipeline.step10_trialrejection import drop_log_matrix, pack_drop_log
+
+
+def test_drop_log_round_trip():
+    ch_names = ["Fp1", "Cz", "PO7", "PO8", "O1", "O2", "Oz", "Pz", "EOG5"]
+    drop_log = (
+        (),
+        ("Cz",),
+        ("BAD_manual",),
+        ("PO7", "EOG5"),
+        ("TOO_SHORT",),
+        (),
+        ("Fp1", "Cz", "PO7", "PO8", "O1", "O2", "Oz", "Pz", "EOG5"),
+    )
+    bits, labels = pack_drop_log(drop_log, ch_names)
+    matrix, labels = drop_log_matrix({"drop_log_bits": bits, "drop_log_labels": labels})
+
+    assert list(labels) == ch_names + ["BAD_manual", "TOO_SHORT"]
+    assert matrix.shape == (len(drop_log), len(labels))
+    assert tuple(tuple(sorted(labels[row])) for row in matrix) == tuple(
+        tuple(sorted(reasons)) for reasons in drop_log
+    )
+
+
+def test_legacy_drop_log_is_converted():
+    drop_log = [[], ["Cz"], ["USER"], ["Cz", "PO7"]]
+    matrix, labels = drop_log_matrix({"drop_log": drop_log})
+
+    assert list(labels) == ["Cz", "PO7", "USER"]
+    np.testing.assert_array_equal(matrix, [[0, 0, 0], [1, 0, 0], [0, 0, 1], [1, 1, 0]])